@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# copyright (C) Team Kingslayer, University of Zurich, 2017.
+"""
+@author: Te Tan, Yves Steiner, Victoria Barth, Lihua Cao
+"""
+
+import ctypes
+import math
+import multiprocessing
+import time
+from queue import Empty
+import numpy as np
+from helpers import *
+from qtable import QTable, DEALER_CARDS, PLAYER_SUMS, ACTIONS, actionindex
+from runner import TrainingResult
+from sweep import seed_streams
+
+SHAPE = (DEALER_CARDS, PLAYER_SUMS, len(ACTIONS))
+
+# per actor counters in shared memory
+ACTOR_COUNTERS = ('episodes', 'discarded', 'steps', 'explorations', 'epsilon', 'refreshes', 'seconds', 'seconds_blocked')
+
+
+def _shared_table(values, visited):
+    """
+    QTable whose arrays live in shared memory
+    :param values: RawArray of doubles
+    :param visited: RawArray of bools
+    :return: QTable
+    """
+    return QTable(np.frombuffer(values, dtype=np.float64).reshape(SHAPE),
+                  np.frombuffer(visited, dtype=np.bool_).reshape(SHAPE))
+
+
+def _actor(robot, index, seed, n, batch_episodes, max_staleness, queue, values, visited, version, counters):
+    """
+    Plays episodes with a snapshot of the shared Q table and sends them to the learner until it
+    has learned n episodes, this is what every actor process runs
+    :param robot: Robot, provides the exploration parameters and rewards
+    :param index: number of the actor
+    :param seed: numpy SeedSequence of the actor's random streams
+    :param n: number of episodes the learner has to learn
+    :param batch_episodes: number of episodes sent to the learner at once
+    :param max_staleness: episodes played with a snapshot more than this many learned episodes old are
+                          not sent, the snapshot is refreshed once it is half as old
+    :param queue: bounded queue to the learner, receives lists of (snapshot version, episode) and finally the actor's index
+    :param values: RawArray, Q values of the learner
+    :param visited: RawArray, visited entries of the learner
+    :param version: RawValue, number of episodes the learner has learned
+    :param counters: RawArray with one row of ACTOR_COUNTERS per actor
+    """
+    start = time.perf_counter()
+    counters = np.frombuffer(counters, dtype=np.float64).reshape(-1, len(ACTOR_COUNTERS))[index]
+    robot.environment = seed_streams(seed)
+    shared = _shared_table(values, visited)
+    robot.q = QTable()
+    robot.reset()
+    explorations = robot.explorations
+    snapshot = None
+    batch = []
+    steps = 0
+    while version.value < n:
+        if snapshot is None or version.value - snapshot > max_staleness // 2:
+            # the learner keeps writing while we copy, single entries may be one update apart
+            snapshot = version.value
+            robot.q.values[...] = shared.values
+            robot.q.visited[...] = shared.visited
+            counters[ACTOR_COUNTERS.index('refreshes')] += 1
+
+        # an episode is the dealer's card, the robot's sums, the action indices and the rewards
+        sums = [robot.state.robot_sum]
+        actions = []
+        rewards = []
+        terminate = False
+        while not terminate:
+            action = robot.doAction()
+            new_state, reward, terminate, dealer_final = robot.environment.doStep(robot, action)
+            robot.state = new_state
+            sums.append(new_state.robot_sum)
+            actions.append(actionindex(action))
+            rewards.append(reward)
+        batch.append((snapshot, (robot.state.dealer_card.value, sums, actions, rewards)))
+        steps += len(actions)
+        robot.reset()
+
+        if len(batch) == batch_episodes:
+            # the learner would drop episodes which are already too stale, they are not sent at all
+            sent = [episode for episode in batch if version.value - episode[0] <= max_staleness]
+            counters[ACTOR_COUNTERS.index('discarded')] += len(batch) - len(sent)
+            if sent:
+                blocked = time.perf_counter()
+                queue.put(sent)
+                counters[ACTOR_COUNTERS.index('seconds_blocked')] += time.perf_counter() - blocked
+            counters[ACTOR_COUNTERS.index('episodes')] += len(batch)
+            counters[ACTOR_COUNTERS.index('steps')] = steps
+            counters[ACTOR_COUNTERS.index('explorations')] = robot.explorations - explorations
+            counters[ACTOR_COUNTERS.index('epsilon')] = robot.epsilon
+            batch = []
+    # the learner has all its episodes, the rest of the batch is not needed
+    counters[ACTOR_COUNTERS.index('episodes')] += len(batch)
+    counters[ACTOR_COUNTERS.index('discarded')] += len(batch)
+    counters[ACTOR_COUNTERS.index('steps')] = steps
+    counters[ACTOR_COUNTERS.index('explorations')] = robot.explorations - explorations
+    counters[ACTOR_COUNTERS.index('epsilon')] = robot.epsilon
+    counters[ACTOR_COUNTERS.index('seconds')] = time.perf_counter() - start
+    queue.put(index)
+
+
+def learnEpisode(robot, dealer_value, sums, actions, rewards):
+    """
+    Applies the Q value updates of one recorded episode, in the same order as runner.train
+    :param robot: Robot whose Q values are updated, its state and trajectory are overwritten
+    :param dealer_value: dealer's initial card
+    :param sums: robot's sums, from the first one to the one after the last action
+    :param actions: action indices, 0 is hit and 1 is stick
+    :param rewards: reward of every action
+    :return: number of calls of updateQ which updated a Q value
+    """
+    dealer_card = Card(Card.COLOR.Black, dealer_value)
+    robot.previous_states.clear()
+    robot.resetTraces()
+    robot.state = State(dealer_card, sums[0])
+    T = len(actions)
+    updates = 0
+    t = 0
+    while True:
+        if t < T:
+            robot.update(new_state=State(dealer_card, sums[t + 1]), action=ACTIONS[actions[t]], reward=rewards[t])
+            action = ACTIONS[actions[min(t + 1, T - 1)]]
+        updated_step = t - robot.multi_step + 1
+        robot.updateQ(target_step=updated_step, T=T if t >= T - 1 else math.inf, new_action=action)
+        if updated_step >= 0:
+            updates += 1
+        if updated_step == T - 1:
+            return updates
+        t += 1
+
+
+def train_actor_learner(robot, n, actors=None, max_staleness=50, batch_episodes=None, queue_size=4, seed=2016,
+                        poll_seconds=1.0, keep_rewards=True):
+    """
+    Trains a robot with several actor processes which play episodes and stream them through a
+    bounded queue to this process, the learner, which applies the Q-learning or TD updates
+    to a Q table in shared memory.
+    No episode is learned with Q values more than max_staleness learned episodes older than the
+    learner's: actors do not send episodes which are already older and the learner drops those that
+    aged beyond the bound in the queue, the actors play on until n episodes have been learned.
+    Episodes wait behind up to (queue_size + actors) * batch_episodes others, to keep the dropped
+    share small that should stay well below max_staleness, the default batch size sees to that.
+    :param robot: Robot to train, its Q values are replaced by the learned ones
+    :param n: number of episodes to learn
+    :param actors: number of actor processes, all cores but one if None
+    :param max_staleness: number of episodes the learner may have learned since the snapshot of the Q table
+                          an episode was played with, actors refresh their snapshot at half of it
+    :param batch_episodes: number of episodes per message of the queue, by default
+                           max_staleness // (2 * (queue_size + actors)) but between 1 and 32
+    :param queue_size: number of messages the queue holds before actors have to wait
+    :param seed: seed of the actors' random streams
+    :param poll_seconds: how long the learner waits for a message before it checks that the actors are alive
+    :param keep_rewards: keep the final reward of every episode in the result
+    :return: TrainingResult, dictionary with the throughput counters of actors and learner
+    :raise RuntimeError: if an actor fails or exits before the learner had all its episodes, the others are terminated
+    """
+    if not isinstance(robot.q, QTable):
+        raise ValueError("the actor-learner mode needs a robot with a Q table")
+    actors = actors or max(1, multiprocessing.cpu_count() - 1)
+    if batch_episodes is None:
+        batch_episodes = min(32, max(1, max_staleness // (2 * (queue_size + actors))))
+    values = multiprocessing.RawArray(ctypes.c_double, robot.q.values.size)
+    visited = multiprocessing.RawArray(ctypes.c_bool, robot.q.values.size)
+    version = multiprocessing.RawValue(ctypes.c_longlong, 0)
+    counters = multiprocessing.RawArray(ctypes.c_double, actors * len(ACTOR_COUNTERS))
+    queue = multiprocessing.Queue(queue_size)
+
+    shared = _shared_table(values, visited)
+    shared.values[...] = robot.q.values
+    shared.visited[...] = robot.q.visited
+    robot.q = shared
+
+    processes = []
+    for i, sequence in enumerate(np.random.SeedSequence(seed).spawn(actors)):
+        process = multiprocessing.Process(target=_actor, args=(
+            robot, i, sequence, n, batch_episodes, max_staleness, queue,
+            values, visited, version, counters))
+        process.start()
+        processes.append(process)
+
+    result = TrainingResult(keep_rewards)
+    start = time.perf_counter()
+    waiting = 0
+    updates = 0
+    dropped = 0
+    staleness = []
+    finished = set()    # actors whose sentinel arrived
+    dead = set()        # actors which had exited without their sentinel at the last poll
+    try:
+        while len(finished) < actors:
+            waited = time.perf_counter()
+            try:
+                message = queue.get(timeout=poll_seconds)
+            except Empty:
+                # an actor which died, or exited without its sentinel, would leave us waiting forever;
+                # one that is still gone a poll later had nothing left in the queue
+                for i in dead - finished:
+                    raise RuntimeError("actor %d exited with code %s before it finished" % (i, processes[i].exitcode))
+                dead = set(i for i, process in enumerate(processes) if not process.is_alive())
+                continue
+            finally:
+                waiting += time.perf_counter() - waited
+            if isinstance(message, int):
+                finished.add(message)
+                continue
+            for snapshot, (dealer_value, sums, actions, rewards) in message:
+                if result.episodes == n or result.episodes - snapshot > max_staleness:
+                    # the actors play on until we have learned n episodes within the bound
+                    dropped += 1
+                    continue
+                staleness.append(result.episodes - snapshot)
+                updates += learnEpisode(robot, dealer_value, sums, actions, rewards)
+                result.addEpisode(rewards[-1], len(actions))
+                version.value = result.episodes
+    finally:
+        for process in processes:
+            if process.is_alive() and len(finished) < actors:
+                process.terminate()
+        for process in processes:
+            process.join()
+    failed = [(i, process.exitcode) for i, process in enumerate(processes) if process.exitcode]
+    if failed:
+        raise RuntimeError("actors exited with non-zero codes: %s" % failed)
+    seconds = time.perf_counter() - start
+
+    # continue with a private copy of the shared Q table
+    robot.q = QTable(shared.values.copy(), shared.visited.copy())
+    robot.reset()
+
+    totals = np.frombuffer(counters, dtype=np.float64).reshape(actors, -1)
+    robot.explorations += int(totals[:, ACTOR_COUNTERS.index('explorations')].sum())
+    robot.epsilon = float(totals[:, ACTOR_COUNTERS.index('epsilon')].min())
+    actor_stats = dict((name, float(totals[:, i].sum())) for i, name in enumerate(ACTOR_COUNTERS))
+    actor_stats['epsilon'] = robot.epsilon
+    actor_stats['seconds'] = float(totals[:, ACTOR_COUNTERS.index('seconds')].max())
+    actor_stats['episodes_per_second'] = actor_stats['episodes'] / actor_stats['seconds'] if actor_stats['seconds'] else 0
+    stats = {
+        'actors': actors,
+        'actor': actor_stats,
+        'learner': {
+            'episodes': result.episodes,
+            'steps': result.steps,
+            'q_updates': updates,
+            'dropped': dropped,
+            'seconds': seconds,
+            'seconds_waiting': waiting,
+            'episodes_per_second': result.episodes / seconds if seconds else 0,
+            'mean_staleness': float(np.mean(staleness)) if staleness else 0,
+            'max_staleness': int(max(staleness)) if staleness else 0,
+        },
+    }
+    return result, stats
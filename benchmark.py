@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# copyright (C) Team Kingslayer, University of Zurich, 2017.
+"""
+@author: Te Tan, Yves Steiner, Victoria Barth, Lihua Cao
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import numpy as np
+from helpers import *
+from robot import Robot
+from runner import train
+
+SEED = 2016
+
+# seconds a short training-only run of runner.py may take from process start to exit
+COLD_START_BUDGET = 0.5
+
+
+def measure(fn, samples, warmup, calls=1):
+    """
+    Times a function and summarises the timings
+    :param fn: function without arguments, one call is one operation
+    :param samples: number of timed samples
+    :param warmup: number of untimed samples before the timed ones
+    :param calls: calls per sample, the time of a sample is divided by it
+    :return: dictionary with mean, min, percentiles (seconds per call) and calls per second
+    """
+    for _ in range(warmup):
+        for _ in range(calls):
+            fn()
+    timings = np.empty(samples)
+    clock = time.perf_counter
+    for i in range(samples):
+        start = clock()
+        for _ in range(calls):
+            fn()
+        timings[i] = (clock() - start) / calls
+    p50, p90, p99 = np.percentile(timings, (50, 90, 99))
+    return {
+        'samples': samples,
+        'warmup': warmup,
+        'calls_per_sample': calls,
+        'mean': float(timings.mean()),
+        'min': float(timings.min()),
+        'p50': float(p50),
+        'p90': float(p90),
+        'p99': float(p99),
+        'per_second': float(1 / timings.mean()),
+    }
+
+
+def _fresh_robot(algo=1, multi_step=1):
+    random.seed(SEED)
+    return Robot(algo=algo, multi_step=multi_step)
+
+
+def _filled_robot(size):
+    """
+    robot whose Q table has entries for the first size state action pairs
+    :param size: number of Q table entries, at most 420
+    :return: Robot
+    """
+    robot = _fresh_robot()
+    for index in range(size):
+        state = State.fromIndex(index // 2)
+        robot.q[(state, (ACTION.hit, ACTION.stick)[index % 2])] = random.uniform(-1, 1)
+    return robot
+
+
+def bench_dostep(scale):
+    """steps per second of Environment.doStep for hit and for stick"""
+    robot = _fresh_robot()
+    robot.state = State(Card(Card.COLOR.Black, 5), 11)
+    results = {}
+    for action in (ACTION.hit, ACTION.stick):
+        random.seed(SEED)
+        results[action.name] = measure(lambda: robot.environment.doStep(robot, action), 50 * scale, 5, 200)
+    return results
+
+
+def bench_doaction(scale):
+    """latency of Robot.doAction as a function of the Q table size"""
+    results = {}
+    for size in (0, 42, 105, 210, 420):
+        robot = _filled_robot(size)
+        robot.state = State(Card(Card.COLOR.Black, 10), 21)
+        robot.epsilon = 0.5
+        robot.exploration_threshold = float('inf')  # keep epsilon fixed while timing
+        results[str(size)] = measure(robot.doAction, 50 * scale, 5, 200)
+    return results
+
+
+def bench_updateq(scale):
+    """cost of one Robot.updateQ for Q-learning, SARSA, multi-step TD and the eligibility trace algorithms"""
+    results = {}
+    state = State(Card(Card.COLOR.Black, 5), 11)
+    for name, algo, multi_step in (('q_learning', 1, 1), ('sarsa', 2, 1), ('multi_step_5', 2, 5),
+                                   ('multi_step_20', 2, 20), ('sarsa_lambda', 3, 1), ('q_lambda', 4, 1)):
+        robot = _filled_robot(420)
+        robot.algo = algo
+        robot.multi_step = multi_step
+        robot.reset()
+        if algo in (3, 4):
+            # the same pair is updated over and over, its trace grows to 1 / (1 - lambda)
+            robot.alpha = 0.05
+        # keep multi_step - 1 transitions stored, each timed call adds one and updates the oldest
+        for _ in range(multi_step - 1):
+            robot.update(new_state=state, action=ACTION.hit, reward=0)
+
+        def step():
+            robot.update(new_state=state, action=ACTION.hit, reward=1)
+            robot.updateQ(target_step=0, T=float('inf'), new_action=ACTION.stick)
+
+        results[name] = measure(step, 50 * scale, 5, 200)
+    return results
+
+
+def bench_episodes(scale):
+    """episodes per second of the training loop of runner.main"""
+    episodes = 100
+    robot = _fresh_robot(algo=2, multi_step=5)
+    result = measure(lambda: train(robot, episodes, log_last=0), 10 * scale, 2, 1)
+    result['episodes_per_call'] = episodes
+    result['episodes_per_second'] = result['per_second'] * episodes
+    return result
+
+
+def bench_evaluate_robot(scale):
+    """wall time of Robot.evaluate_robot"""
+    robot = _fresh_robot(algo=2, multi_step=5)
+    train(robot, 3000, log_last=0)
+
+    def evaluate():
+        with contextlib.redirect_stdout(io.StringIO()):
+            robot.evaluate_robot()
+
+    return measure(evaluate, max(1, scale), 1, 1)
+
+
+def bench_cold_start(scale):
+    """wall time of a short training-only run of runner.py in a fresh process, and whether it imports matplotlib"""
+    directory = os.path.dirname(os.path.abspath(__file__))
+    command = [sys.executable, os.path.join(directory, 'runner.py'), '--train-only', '--trials', '100']
+
+    def run_once():
+        subprocess.check_call(command, cwd=directory, stdout=subprocess.DEVNULL)
+
+    result = measure(run_once, 5 * scale, 1, 1)
+    imported = subprocess.check_output([sys.executable, '-c', "import sys, runner; print(sorted(set("
+                                        "m.split('.')[0] for m in sys.modules) & {'matplotlib', 'mpl_toolkits'}))"],
+                                       cwd=directory).decode().strip()
+    result['command'] = ' '.join(command[1:])
+    result['plotting_modules_imported'] = imported
+    result['budget'] = COLD_START_BUDGET
+    result['within_budget'] = result['p90'] <= COLD_START_BUDGET and imported == '[]'
+    return result
+
+
+BENCHMARKS = {
+    'environment_dostep': bench_dostep,
+    'robot_doaction': bench_doaction,
+    'robot_updateq': bench_updateq,
+    'training_episodes': bench_episodes,
+    'evaluate_robot': bench_evaluate_robot,
+    'cold_start': bench_cold_start,
+}
+
+
+def _commit():
+    """git commit of the benchmarked code, None outside of a git checkout"""
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)),
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(names=None, scale=1):
+    """
+    Runs benchmarks
+    :param names: names of the benchmarks to run, all of BENCHMARKS if None
+    :param scale: multiplies the number of samples
+    :return: dictionary ready to be dumped as JSON
+    """
+    report = {
+        'commit': _commit(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'seed': SEED,
+        'benchmarks': {},
+    }
+    for name in names or BENCHMARKS:
+        report['benchmarks'][name] = BENCHMARKS[name](scale)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="benchmark the training and evaluation hot paths")
+    parser.add_argument('benchmarks', nargs='*', metavar='BENCHMARK',
+                        help="benchmarks to run, all if none given: %s" % ', '.join(BENCHMARKS))
+    parser.add_argument('--scale', type=int, default=1, help="multiplies the number of samples")
+    parser.add_argument('--output', help="write the JSON report to this file instead of stdout")
+    args = parser.parse_args()
+    unknown = set(args.benchmarks) - set(BENCHMARKS)
+    if unknown:
+        parser.error("unknown benchmarks: %s" % ', '.join(sorted(unknown)))
+
+    report = run(args.benchmarks, args.scale)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# copyright (C) Team Kingslayer, University of Zurich, 2017.
+"""
+@author: Te Tan, Yves Steiner, Victoria Barth, Lihua Cao
+"""
+
+import os
+import random
+import struct
+import zipfile
+import numpy as np
+from helpers import *
+from environment import CardStream, Environment
+from qtable import QTable
+from robot import Robot
+
+# robot attributes stored as scalars in a checkpoint
+SCALARS = ('algo', 'multi_step', 'alpha', 'gamma', 'epsilon', 'explorations', 'exploration_threshold',
+           'bust_penalty_below', 'bust_penalty_above', 'dealer_bust_reward', 'trace_decay',
+           'epsilon_decrement')
+
+
+def save_checkpoint(robot, path):
+    """
+    Stores the Q values, counters, parameters and state of a robot together with the state
+    of python's random number generator and of the robot's card stream, if it has one,
+    in an uncompressed .npz file
+    :param robot: Robot
+    :param path: file name, .npz is appended if it does not end with it, like np.savez does
+    :return: str, name of the file written
+    """
+    path = checkpoint_path(path)
+    version, words, gauss_next = random.getstate()
+    arrays = {
+        'q': robot.q.values,
+        'visited': robot.q.visited,
+        'state': np.array([robot.state.dealer_card.value, robot.state.robot_sum]),
+        'rng_version': np.array(version),
+        'rng_words': np.array(words, dtype=np.uint32),
+        'rng_gauss_next': np.array(np.nan if gauss_next is None else gauss_next),
+    }
+    for name in SCALARS:
+        arrays[name] = np.array(getattr(robot, name))
+    stream = robot.environment.card_stream
+    if stream is not None:
+        for name, array in stream.getState().items():
+            arrays['card_stream_' + name] = array
+    # written next to the file and renamed, a robot loaded from the old file keeps its memory map of it
+    temporary = path + '.tmp'
+    try:
+        with open(temporary, 'wb') as f:
+            np.savez(f, **arrays)
+        os.replace(temporary, path)
+    finally:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+    return path
+
+
+def checkpoint_path(path):
+    """
+    :param path: file name of a checkpoint, with or without .npz
+    :return: str, the file name np.savez writes to, ending with .npz
+    """
+    path = str(path)
+    return path if path.endswith('.npz') else path + '.npz'
+
+
+def load_arrays(path, mmap=True):
+    """
+    Opens every array of an .npz file. The members of uncompressed files (as written by
+    np.savez) are memory-mapped copy-on-write, so opening takes the same time for any file size
+    and writes to the arrays never reach the file.
+    :param path: .npz file
+    :param mmap: if False, the arrays are read into memory
+    :return: dictionary {name: array}
+    """
+    if not mmap:
+        with np.load(path) as data:
+            return {name: data[name] for name in data.files}
+
+    arrays = {}
+    with zipfile.ZipFile(path) as archive, open(path, 'rb') as f:
+        for info in archive.infolist():
+            name = info.filename[:-4] if info.filename.endswith('.npy') else info.filename
+            if info.compress_type != zipfile.ZIP_STORED:
+                with archive.open(info) as member:
+                    arrays[name] = np.lib.format.read_array(member)
+                continue
+            # the array data starts behind the local file header and the .npy header
+            f.seek(info.header_offset + 26)
+            name_length, extra_length = struct.unpack('<HH', f.read(4))
+            f.seek(info.header_offset + 30 + name_length + extra_length)
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+            if dtype.hasobject or 0 in shape:
+                f.seek(info.header_offset + 30 + name_length + extra_length)
+                arrays[name] = np.lib.format.read_array(f)
+                continue
+            arrays[name] = np.memmap(path, dtype=dtype, mode='c', offset=f.tell(), shape=shape,
+                                     order='F' if fortran_order else 'C')
+    return arrays
+
+
+def load_checkpoint(path, mmap=True, restore_rng=True):
+    """
+    Recreates a robot from a checkpoint, training can continue where it stopped
+    :param path: .npz file written by save_checkpoint, the name given to it also without .npz,
+                 or a bare Q table as .npy file (e.g. of hogwild.train_hogwild) which gets a robot
+                 with default parameters
+    :param mmap: memory-map the Q values instead of reading them, see load_arrays
+    :param restore_rng: also restore the state of python's random number generator,
+                        which is not used otherwise
+    :return: Robot, it plays with the stored card stream or, without one, with python's random module
+    """
+    path = str(path)
+    if path.endswith('.npy'):
+        # only the Q values are stored, entries which are still 0 count as not visited;
+        # the robot starts in a fixed state instead of a dealt one, reset deals a game
+        values = np.load(path, mmap_mode='c' if mmap else None)
+        robot = Robot(state=State.fromIndex(0))
+        robot.q = QTable(values, np.asarray(values != 0))
+        return robot
+
+    arrays = load_arrays(checkpoint_path(path), mmap)
+    # older checkpoints lack the scalars added later, those keep the robot's defaults
+    scalars = dict((name, arrays[name].item()) for name in SCALARS if name in arrays)
+    environment = Environment()
+    if 'card_stream_generator' in arrays:
+        environment = Environment(CardStream.fromState(dict(
+            (name[len('card_stream_'):], array) for name, array in arrays.items() if name.startswith('card_stream_'))))
+    dealer_value, robot_sum = arrays['state'].tolist()
+    robot = Robot(algo=scalars['algo'], multi_step=scalars['multi_step'], environment=environment,
+                  state=State(Card(Card.COLOR.Black, dealer_value), robot_sum))
+    for name in scalars:
+        setattr(robot, name, scalars[name])
+    robot.resetEpisode()    # start over with the stored discount factor, without dealing
+    robot.q = QTable(arrays['q'], arrays['visited'])
+
+    if restore_rng:
+        gauss_next = arrays['rng_gauss_next'].item()
+        random.setstate((arrays['rng_version'].item(), tuple(arrays['rng_words'].tolist()),
+                         None if np.isnan(gauss_next) else gauss_next))
+    return robot
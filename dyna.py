@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# copyright (C) Team Kingslayer, University of Zurich, 2017.
+"""
+@author: Te Tan, Yves Steiner, Victoria Barth, Lihua Cao
+"""
+
+import argparse
+import math
+import numpy as np
+from helpers import *
+from environment import Environment
+from qtable import DEALER_CARDS, PLAYER_SUMS, ACTIONS, actionindex
+from robot import Robot
+import evaluator
+
+STATES = DEALER_CARDS * PLAYER_SUMS
+
+
+class Model(object):
+    """
+    Tabular model of Easy21 over the 10x21 state space: where hit leads, what hit and stick
+    pay on average. It is either computed from the card distribution of Environment.drawOneCard
+    or learned by counting the transitions the robot sees.
+    State action pairs are numbered like stateActionIndex.
+    """
+
+    def __init__(self):
+        self.transitions = np.zeros((STATES * len(ACTIONS), STATES))  # [pair, s'] hits which did not bust
+        self.count = np.zeros(STATES * len(ACTIONS))                   # times every pair was taken
+        self.reward_sum = np.zeros(STATES * len(ACTIONS))              # rewards of every pair
+
+    @staticmethod
+    def fromCards(bust_penalty_below, bust_penalty_above, dealer_bust_reward):
+        """
+        exact model, every state action pair counts as taken once with its expected outcome
+        :param bust_penalty_below: penalty of bust below 1
+        :param bust_penalty_above: penalty of bust above 21
+        :param dealer_bust_reward: reward of dealer bust
+        :return: Model
+        """
+        model = Model()
+        hit, stick = actionindex(ACTION.hit), actionindex(ACTION.stick)
+        for index in range(STATES):
+            dealer, robot_sum = index // PLAYER_SUMS + 1, index % PLAYER_SUMS + 1
+            for value, p in Environment.cardDistribution():
+                new_sum = robot_sum + value
+                if new_sum < 1:
+                    model.reward_sum[index * 2 + hit] += p * bust_penalty_below
+                elif new_sum > 21:
+                    model.reward_sum[index * 2 + hit] += p * bust_penalty_above
+                else:
+                    model.transitions[index * 2 + hit, (dealer - 1) * PLAYER_SUMS + new_sum - 1] += p
+        model.count[:] = 1
+        model.reward_sum[stick::2] = Environment.stickRewardTable(dealer_bust_reward).reshape(-1)
+        return model
+
+    def observe(self, pair, reward, next_state_index):
+        """
+        counts a real transition
+        :param pair: stateActionIndex of the state and the action taken in it
+        :param reward: reward of the action
+        :param next_state_index: State.index of the state after the action, -1 if the episode ended
+        """
+        self.count[pair] += 1
+        self.reward_sum[pair] += reward
+        if next_state_index >= 0:
+            self.transitions[pair, next_state_index] += 1
+
+    def expectedTargets(self, pairs, next_values, gamma):
+        """
+        expected Q-learning targets of a batch of state action pairs
+        :param pairs: int array of stateActionIndex, all taken at least once
+        :param next_values: float array of length 210, value of every state
+        :param gamma: discount factor
+        :return: float array, expected reward plus discounted value of the next state
+        """
+        return (self.reward_sum[pairs] + gamma * self.transitions[pairs].dot(next_values)) / self.count[pairs]
+
+
+class DynaRobot(Robot):
+    """
+    Q-learning robot which follows every real step with planning steps: expected Q-learning
+    backups of state action pairs it has already seen, computed from a model of the game.
+    The planning steps of one real step are done together as one batch.
+    """
+
+    def __init__(self, algo=1, multi_step=1, planning_steps=50, model='known', seed=None, environment=None):
+        """
+        :param algo: must be 1, Q-learning
+        :param multi_step: must be 1
+        :param planning_steps: number of backups after every real step
+        :param model: 'known' uses the card distribution, 'learned' counts the real transitions
+                      and stays behind plain Q-learning
+        :param seed: seed of the random number generator which picks the pairs to plan with
+        :param environment: Environment the robot plays in, see Robot
+        """
+        if algo != 1 or multi_step != 1:
+            raise ValueError("Dyna is only implemented for Q-learning (algo 1, multi_step 1)")
+        if model not in ('learned', 'known'):
+            raise ValueError("unknown model: %s" % model)
+        super(DynaRobot, self).__init__(algo=algo, multi_step=multi_step, environment=environment)
+        self.alpha = 0.1    # planning repeats every update many times
+        self.planning_steps = planning_steps
+        self.learn_model = model == 'learned'
+        self.rng = np.random.default_rng(seed)
+        self.model = Model() if self.learn_model else None
+        self._candidates = None     # pairs to plan with, recomputed when a new pair is visited
+        self._uniform = np.zeros(0)     # random numbers drawn in advance
+        self._next_uniform = 0
+
+    def updateQ(self, target_step, T, new_action):
+        """
+        Q-learning update of the last real step, then planning.
+        Unlike plain Q-learning, the value of the state after the last action of an episode is 0.
+        """
+        state, action, reward = self.previous_states.pop()
+        done = T != math.inf
+        next_q = 0 if done else self.q.maxValue(self.state)
+        current_q = self.q.get((state, action))
+        if current_q is None:
+            current_q = 0
+            self._candidates = None
+        self.q[(state, action)] = current_q + self.alpha * (reward + self.gamma * next_q - current_q)
+
+        if self.model is None:
+            self.model = Model.fromCards(self.bust_penalty_below, self.bust_penalty_above, self.dealer_bust_reward)
+        if self.learn_model:
+            self.model.observe(stateActionIndex(state, action), reward, -1 if done else self.state.index)
+        if self.planning_steps:
+            self.plan(self.planning_steps)
+
+    def plan(self, steps):
+        """
+        expected backups of randomly drawn state action pairs which were visited and
+        which the model knows, all at once
+        :param steps: number of backups
+        """
+        values = self.q.values.reshape(-1)
+        if self._candidates is None:
+            self._candidates = np.flatnonzero(self.q.visited.reshape(-1) & (self.model.count > 0))
+        if not self._candidates.size:
+            return
+        if self._next_uniform + steps > self._uniform.size:
+            self._uniform = self.rng.random(max(steps, 4096) * 16)
+            self._next_uniform = 0
+        u = self._uniform[self._next_uniform:self._next_uniform + steps]
+        self._next_uniform += steps
+        pairs = self._candidates[(u * self._candidates.size).astype(np.intp)]
+
+        # value of every state, unvisited q values count as 0
+        next_values = np.maximum(values[0::2], values[1::2])
+        targets = self.model.expectedTargets(pairs, next_values, self.gamma)
+        # pairs drawn more than once add up their updates
+        np.add.at(values, pairs, self.alpha * (targets - values[pairs]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="compare Q-learning with and without Dyna planning")
+    parser.add_argument('--episodes', type=int, nargs='+', default=[200, 500, 1000, 2000, 5000],
+                        help="real training episodes after which the robots are compared")
+    parser.add_argument('--planning-steps', type=int, default=50)
+    parser.add_argument('--evaluation-episodes', type=int, default=200000)
+    args = parser.parse_args()
+
+    robots = (('q-learning', lambda: Robot()),
+              ('dyna, known model', lambda: DynaRobot(planning_steps=args.planning_steps, seed=2016)),
+              ('dyna, learned model', lambda: DynaRobot(planning_steps=args.planning_steps, model='learned', seed=2016)))
+    evaluator.compare_training(robots, args.episodes, args.evaluation_episodes)
+
+
+if __name__ == '__main__':
+    main()
@@ -7,21 +7,236 @@
 """
 
 from helpers import *
+import bisect
+import json
 import random
+import numpy as np
+
+# range of the dealer's final sum: a dealer at 1 who draws a red 10 ends at -9,
+# a dealer at 16 who draws a black 10 ends at 26
+DEALER_FINAL_MIN = -9
+DEALER_FINAL_MAX = 26
+
+
+class CardStream(object):
+    """
+    Cards pre-generated in blocks by a numpy random number generator and handed out one by one.
+    Every stream is independent of python's random module and of the other streams,
+    the same seed gives the same cards.
+    """
+
+    def __init__(self, seed=None, block_size=65536):
+        """
+        :param seed: int, numpy SeedSequence or None for a fresh random stream
+        :param block_size: number of cards generated at once
+        """
+        self.seed_sequence = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+        self.block_size = block_size
+        self.rng = np.random.default_rng(self.seed_sequence)
+        # blocks as python lists, indexing them is much faster than indexing numpy arrays
+        self._cards = []
+        self._next_card = 0
+        self._black = []
+        self._next_black = 0
+        self._uniform = []
+        self._next_uniform = 0
+
+    def spawn(self, n):
+        """
+        creates independent child streams, e.g. one per worker process
+        :param n: number of streams
+        :return: list of CardStream
+        """
+        return [CardStream(sequence, self.block_size) for sequence in self.seed_sequence.spawn(n)]
+
+    def _cardBlock(self):
+        """
+        :return: int array of the next block of cards, negative values are red cards
+        """
+        values = self.rng.integers(1, 11, self.block_size)
+        red = self.rng.integers(0, 3, self.block_size) == 0
+        return np.where(red, -values, values)
+
+    def _blackBlock(self):
+        """
+        :return: int array of the next block of black cards
+        """
+        return self.rng.integers(1, 11, self.block_size)
+
+    def _uniformBlock(self):
+        """
+        :return: float array of the next block of numbers uniformly distributed in [0, 1)
+        """
+        return self.rng.random(self.block_size)
+
+    def draw(self):
+        """
+        draws a card, red with probability 1/3 like Environment.drawOneCard
+        :return: int, value of the card, negative if the card is red
+        """
+        i = self._next_card
+        if i >= len(self._cards):
+            self._cards = self._cardBlock().tolist()
+            i = 0
+        self._next_card = i + 1
+        return self._cards[i]
+
+    def drawBlack(self):
+        """
+        draws a black card directly instead of rejecting red ones
+        :return: int, value of the card
+        """
+        i = self._next_black
+        if i >= len(self._black):
+            self._black = self._blackBlock().tolist()
+            i = 0
+        self._next_black = i + 1
+        return self._black[i]
+
+    def uniform(self):
+        """
+        :return: float, uniformly distributed in [0, 1)
+        """
+        i = self._next_uniform
+        if i >= len(self._uniform):
+            self._uniform = self._uniformBlock().tolist()
+            i = 0
+        self._next_uniform = i + 1
+        return self._uniform[i]
+
+    def getState(self):
+        """
+        state of the stream, the cards drawn after fromState continue exactly where this stream is
+        :return: dictionary {name: array}, the seed and generator state as JSON and the cards not handed out yet
+        """
+        sequence = self.seed_sequence
+        generator = {
+            'entropy': sequence.entropy,
+            'spawn_key': list(sequence.spawn_key),
+            'pool_size': sequence.pool_size,
+            'n_children_spawned': sequence.n_children_spawned,
+            'block_size': self.block_size,
+            'bit_generator': self.rng.bit_generator.state,
+        }
+        return {
+            'generator': np.array(json.dumps(generator)),
+            'cards': np.array(self._cards[self._next_card:], dtype=np.int64),
+            'black': np.array(self._black[self._next_black:], dtype=np.int64),
+            'uniform': np.array(self._uniform[self._next_uniform:], dtype=np.float64),
+        }
+
+    @classmethod
+    def fromState(cls, state):
+        """
+        :param state: dictionary {name: array} of getState
+        :return: CardStream
+        """
+        generator = json.loads(state['generator'].item())
+        sequence = np.random.SeedSequence(generator['entropy'], spawn_key=generator['spawn_key'],
+                                          pool_size=generator['pool_size'],
+                                          n_children_spawned=generator['n_children_spawned'])
+        stream = cls(sequence, generator['block_size'])
+        stream.rng.bit_generator.state = generator['bit_generator']
+        stream._cards = state['cards'].tolist()
+        stream._black = state['black'].tolist()
+        stream._uniform = state['uniform'].tolist()
+        return stream
+
+
+class CardStreams(object):
+    """
+    Many card streams drawn from together: every call hands out the next element of each of
+    the given streams. Stream i hands out exactly what CardStream(seeds[i], block_size) would,
+    its blocks are generated by such a stream whenever it runs out.
+    """
+
+    # kinds of elements, each with its own blocks like in CardStream
+    KINDS = ('card', 'black', 'uniform')
+
+    def __init__(self, seeds, block_size=1024):
+        """
+        :param seeds: list of int, numpy SeedSequence or None, one per stream
+        :param block_size: number of elements of every kind generated at once per stream
+        """
+        self.streams = [CardStream(seed, block_size) for seed in seeds]
+        self.block_size = block_size
+        n = len(self.streams)
+        self._blocks = {
+            'card': np.zeros((n, block_size), dtype=np.int64),
+            'black': np.zeros((n, block_size), dtype=np.int64),
+            'uniform': np.zeros((n, block_size)),
+        }
+        # next position in the block of every stream, all blocks start out used up
+        self._positions = dict((kind, np.full(n, block_size, dtype=np.int64)) for kind in self.KINDS)
+
+    def __len__(self):
+        return len(self.streams)
+
+    def _next(self, kind, games):
+        """
+        :param kind: one of KINDS
+        :param games: int array of distinct stream numbers
+        :return: array, the next element of each of the streams
+        """
+        blocks, positions = self._blocks[kind], self._positions[kind]
+        at = positions[games]
+        empty = at >= self.block_size
+        if empty.any():
+            for i in games[empty]:
+                blocks[i] = getattr(self.streams[i], '_%sBlock' % kind)()
+            at[empty] = 0
+        positions[games] = at + 1
+        return blocks[games, at]
+
+    def draw(self, games):
+        """
+        :param games: int array of distinct stream numbers
+        :return: int array, the next card of each of the streams, negative values are red cards
+        """
+        return self._next('card', games)
+
+    def drawBlack(self, games):
+        """
+        :param games: int array of distinct stream numbers
+        :return: int array, the next black card of each of the streams
+        """
+        return self._next('black', games)
+
+    def uniform(self, games):
+        """
+        :param games: int array of distinct stream numbers
+        :return: float array, the next number of each of the streams, uniformly distributed in [0, 1)
+        """
+        return self._next('uniform', games)
 
 
 class Environment(object):
     """Environment"""
 
-    def __init__(self):
-        pass
+    _dealer_outcomes = None     # cached result of dealerOutcomes
+    _dealer_cumulative = None   # cumulative probabilities of _dealer_outcomes, one list per dealer card
 
-    @staticmethod
-    def drawOneCard():
+    def __init__(self, card_stream=None, dealer_from_table=False):
+        """
+        :param card_stream: CardStream the cards are drawn from, a seed to create one from,
+                            or None to draw them with python's random module
+        :param dealer_from_table: sample the outcome of stick from the precomputed dealer outcome table
+                                  instead of letting the dealer draw card by card
+        """
+        if card_stream is not None and not isinstance(card_stream, CardStream):
+            card_stream = CardStream(card_stream)
+        self.card_stream = card_stream
+        self.dealer_from_table = dealer_from_table
+        self.last_dealer_draws = 0  # number of cards the dealer drew in the last stick, for instrumentation
+
+    def drawOneCard(self):
         """
         randomly generate a card
         :return: Card
         """
+        if self.card_stream is not None:
+            value = self.card_stream.draw()
+            return Card(Card.COLOR.Red, -value) if value < 0 else Card(Card.COLOR.Black, value)
         color_int = random.randint(1, 3)
         value_int = random.randint(1, 10)
         if color_int == 1:
@@ -30,20 +245,31 @@ class Environment(object):
             return Card(Card.COLOR.Black, value_int)
 
     @staticmethod
-    def dealCards():
+    def cardDistribution():
+        """
+        exact distribution of the cards drawOneCard generates, red with probability 1/3
+        :return: list of (int, float), value of the card (negative if red) and its probability
+        """
+        return [(sign * value, (2 if sign > 0 else 1) / 30) for sign in (1, -1) for value in range(1, 11)]
+
+    def dealCards(self):
         """
         start the game, give two black cards to dealer and robot respectively
         :return: Card, Card
         """
+        if self.card_stream is not None:
+            stream = self.card_stream
+            return Card(Card.COLOR.Black, stream.drawBlack()), Card(Card.COLOR.Black, stream.drawBlack())
+
         # generate a black card for dealer
         while True:
-            dealer_card = Environment.drawOneCard()
+            dealer_card = self.drawOneCard()
             if dealer_card.color == Card.COLOR.Black:
                 break
 
         # generate a black card for robot
         while True:
-            robot_card = Environment.drawOneCard()
+            robot_card = self.drawOneCard()
             if robot_card.color == Card.COLOR.Black:
                 break
 
@@ -65,25 +291,95 @@ class Environment(object):
             return 0
 
     @staticmethod
-    def doStep(robot, action):
+    def dealerOutcomes():
+        """
+        exact distribution of the dealer's final sum for every initial card,
+        computed once by solving the absorbing markov chain of the dealer's draws
+        :return: float array of shape (10, 36), entry [d - 1, f - DEALER_FINAL_MIN] is the
+                 probability that a dealer starting with d ends with sum f
+        """
+        if Environment._dealer_outcomes is None:
+            finals = np.arange(DEALER_FINAL_MIN, DEALER_FINAL_MAX + 1)
+            transient = np.zeros((16, 16))          # dealer keeps drawing at sums 1 to 16
+            absorbing = np.zeros((16, finals.size))  # dealer stops at 17 to 21 or is bust
+            for s in range(1, 17):
+                for value, p in Environment.cardDistribution():
+                    new_sum = s + value
+                    if 1 <= new_sum < 17:
+                        transient[s - 1, new_sum - 1] += p
+                    else:
+                        absorbing[s - 1, new_sum - DEALER_FINAL_MIN] += p
+            outcomes = np.linalg.solve(np.eye(16) - transient, absorbing)[:10]
+            outcomes.setflags(write=False)
+            Environment._dealer_outcomes = outcomes
+            Environment._dealer_cumulative = [np.cumsum(row).tolist() for row in outcomes]
+        return Environment._dealer_outcomes
+
+    @staticmethod
+    def dealerBustProbabilities():
+        """
+        probability that the dealer goes bust for every initial card
+        :return: float array of shape (10,)
+        """
+        outcomes = Environment.dealerOutcomes()
+        return 1 - outcomes[:, 17 - DEALER_FINAL_MIN:22 - DEALER_FINAL_MIN].sum(axis=1)
+
+    @staticmethod
+    def stickRewardTable(dealer_bust_reward):
+        """
+        exact expected reward of sticking in every state
+        :param dealer_bust_reward: reward of dealer bust
+        :return: float array of shape (10, 21), entry [d - 1, s - 1] is the expected reward
+                 of sticking with sum s against dealer's initial card d
+        """
+        final = Environment.dealerOutcomes()[:, 17 - DEALER_FINAL_MIN:22 - DEALER_FINAL_MIN]   # sums 17 to 21
+        # sign of robot's sum minus dealer's final sum, for robot sums 1 to 21 and dealer sums 17 to 21
+        signs = np.sign(np.arange(1, 22)[:, None] - np.arange(17, 22)[None, :])
+        return final.dot(signs.T) + (dealer_bust_reward * Environment.dealerBustProbabilities())[:, None]
+
+    @staticmethod
+    def expectedStickReward(robot, state=None):
+        """
+        exact expected reward if the robot sticks
+        :param robot: Robot, provides the state and the dealer bust reward
+        :param state: State to evaluate, robot's current state if None
+        :return: float
+        """
+        state = robot.state if state is None else state
+        final = Environment.dealerOutcomes()[state.dealer_card.value - 1]
+        signs = np.sign(state.robot_sum - np.arange(17, 22))
+        return final[17 - DEALER_FINAL_MIN:22 - DEALER_FINAL_MIN].dot(signs) + \
+            robot.dealer_bust_reward * Environment.dealerBustProbabilities()[state.dealer_card.value - 1]
+
+    def sampleDealerFinal(self, dealer_card_value):
+        """
+        draws the dealer's final sum from the precomputed dealer outcome table
+        :param dealer_card_value: dealer's initial card value
+        :return: int, dealer's final sum
+        """
+        Environment.dealerOutcomes()
+        cumulative = Environment._dealer_cumulative[dealer_card_value - 1]
+        u = random.random() if self.card_stream is None else self.card_stream.uniform()
+        index = bisect.bisect_right(cumulative, u)
+        return DEALER_FINAL_MIN + min(index, len(cumulative) - 1)
+
+    def doStep(self, robot, action):
         """
         Performs the action of the player in the environment
         :param robot: dealer's first card number + player's current sum
         :param action: hits or stick, the player intend to do
         :return: newState: State, reward: int, terminate: boolean, dealer_sum: int
         """
-        newState = State(robot.state.dealer_card, robot.state.robot_sum)
+        newState = robot.state    # states are immutable, a new one is looked up if the sum changes
         reward = 0
         terminate = False
         dealer_final = robot.state.dealer_card.value    # dealer's final sum
+        stream = self.card_stream
 
         # if robot choose to hit, draw another card
         if action == ACTION.hit:
-            card = Environment.drawOneCard()
-            if card.color == Card.COLOR.Red:
-                newState.robot_sum -= card.value
-            else:
-                newState.robot_sum += card.value
+            value = self.drawOneCard().signed_value if stream is None else stream.draw()
+            newState = State(newState.dealer_card, newState.robot_sum + value)
             # check if robot is bust(if is, below 1 or above 21)
             if Environment._is_bust(newState.robot_sum) == -1:
                 reward = robot.bust_penalty_below
@@ -101,16 +397,19 @@ class Environment(object):
             dealer_sum = dealer_final
             dealer_bust = False
 
-            while dealer_sum < 17:
-                card = Environment.drawOneCard()
-                if card.color == Card.COLOR.Red:
-                    dealer_sum -= card.value
-                else:
-                    dealer_sum += card.value
+            if self.dealer_from_table:
+                dealer_sum = self.sampleDealerFinal(dealer_final)
+                dealer_bust = Environment._is_bust(dealer_sum) != 0
+
+            draws = 0
+            while dealer_sum < 17 and not dealer_bust:
+                dealer_sum += self.drawOneCard().signed_value if stream is None else stream.draw()
+                draws += 1
                 # if dealer is bust, robot wins with reward
                 if Environment._is_bust(dealer_sum) != 0:
                     dealer_bust = True
                     break
+            self.last_dealer_draws = draws
 
             if dealer_bust:
                 reward = robot.dealer_bust_reward
@@ -124,3 +423,264 @@ class Environment(object):
 
             return newState, reward, terminate, dealer_sum
 
+
+class BatchEnvironment(object):
+    """
+    Plays n games of Easy21 in lockstep.
+    The games are kept as arrays of the dealer's initial card and the robot's sum,
+    actions are given as an array of action indices, 0 is hit and 1 is stick
+    (the last axis of the QTable).
+    """
+
+    def __init__(self, n, bust_penalty_below=-10, bust_penalty_above=-1, dealer_bust_reward=10, seed=None,
+                 dealer_from_table=False):
+        """
+        :param n: number of games played at the same time
+        :param bust_penalty_below: penalty of bust below 1, a number or an array with one entry per game
+        :param bust_penalty_above: penalty of bust above 21, a number or an array with one entry per game
+        :param dealer_bust_reward: reward of dealer bust, a number or an array with one entry per game
+        :param seed: seed of the random number generator
+        :param dealer_from_table: sample the outcome of stick from the dealer outcome table
+        """
+        self.n = n
+        self.dealer_from_table = dealer_from_table
+        self.rng = np.random.default_rng(seed)
+        self.bust_penalty_below = np.broadcast_to(np.asarray(bust_penalty_below, dtype=float), (n,))
+        self.bust_penalty_above = np.broadcast_to(np.asarray(bust_penalty_above, dtype=float), (n,))
+        self.dealer_bust_reward = np.broadcast_to(np.asarray(dealer_bust_reward, dtype=float), (n,))
+
+        self.dealer_cards = np.zeros(n, dtype=np.int64)  # dealer's initial card of every game
+        self.robot_sums = np.zeros(n, dtype=np.int64)    # robot's current sum of every game
+        self.terminated = np.ones(n, dtype=bool)         # whether a game is over
+        self.reset()
+
+    @classmethod
+    def forRobot(cls, robot, n, seed=None, dealer_from_table=False):
+        """
+        creates a batch environment which uses the reward parameters of a robot
+        :param robot: Robot
+        :param n: number of games played at the same time
+        :param seed: seed of the random number generator
+        :param dealer_from_table: sample the outcome of stick from the dealer outcome table
+        :return: BatchEnvironment
+        """
+        return cls(n, robot.bust_penalty_below, robot.bust_penalty_above, robot.dealer_bust_reward, seed,
+                   dealer_from_table)
+
+    def _drawCards(self, count):
+        """
+        randomly generate cards, a third of them red
+        :param count: number of cards
+        :return: int array, value of each card, negative if the card is red
+        """
+        values = self.rng.integers(1, 11, count)
+        red = self.rng.random(count) < 1 / 3
+        return np.where(red, -values, values)
+
+    def _dealBlackCards(self, games):
+        """
+        a black card for each of the given games
+        :param games: int array, numbers of the games
+        :return: int array, value of each card
+        """
+        return self.rng.integers(1, 11, games.size)
+
+    def _drawRobotCards(self, games):
+        """
+        the next card of the robot in each of the given games
+        :param games: int array, numbers of the games
+        :return: int array, value of each card, negative if the card is red
+        """
+        return self._drawCards(games.size)
+
+    def _drawDealerCards(self, games):
+        """
+        the next card of the dealer in each of the given games
+        :param games: int array, numbers of the games
+        :return: int array, value of each card, negative if the card is red
+        """
+        return self._drawCards(games.size)
+
+    def _uniform(self, games):
+        """
+        a random number for each of the given games
+        :param games: int array, numbers of the games
+        :return: float array, uniformly distributed in [0, 1)
+        """
+        return self.rng.random(games.size)
+
+    def _sampleDealerFinals(self, games):
+        """
+        draws the dealer's final sums from the precomputed dealer outcome table
+        :param games: int array, numbers of the games
+        :return: int array, dealer's final sums
+        """
+        cumulative = np.cumsum(Environment.dealerOutcomes(), axis=1)[self.dealer_cards[games] - 1]
+        u = self._uniform(games)
+        index = np.minimum((u[:, None] >= cumulative).sum(axis=1), cumulative.shape[1] - 1)
+        return DEALER_FINAL_MIN + index
+
+    def reset(self, mask=None):
+        """
+        starts new games, dealer and robot both get a black card
+        :param mask: bool array selecting the games to restart, all games if None
+        :return: dealer_cards: int array, robot_sums: int array
+        """
+        if mask is None:
+            mask = np.ones(self.n, dtype=bool)
+        games = np.flatnonzero(mask)
+        self.dealer_cards[games] = self._dealBlackCards(games)
+        self.robot_sums[games] = self._dealBlackCards(games)
+        self.terminated[mask] = False
+        return self.dealer_cards.copy(), self.robot_sums.copy()
+
+    def doStep(self, actions):
+        """
+        Performs one action in every running game, finished games are left untouched
+        :param actions: int array, 0 to hit and 1 to stick
+        :return: dealer_cards: int array, robot_sums: int array, rewards: float array,
+                 terminate: bool array, dealer_sums: int array (dealer's final sum of the games that stuck)
+        """
+        actions = np.asarray(actions)
+        rewards = np.zeros(self.n)
+        dealer_sums = self.dealer_cards.copy()
+        running = ~self.terminated
+
+        # robots who hit draw another card and may go bust
+        hits = running & (actions == 0)
+        self.robot_sums[hits] += self._drawRobotCards(np.flatnonzero(hits))
+        below = hits & (self.robot_sums < 1)
+        above = hits & (self.robot_sums > 21)
+        rewards[below] = self.bust_penalty_below[below]
+        rewards[above] = self.bust_penalty_above[above]
+        self.terminated |= below | above
+
+        # for the robots who stick the dealers draw until 17 or bust, all at the same time
+        sticks = np.flatnonzero(running & (actions == 1))
+        if sticks.size:
+            dealer = dealer_sums[sticks]
+            drawing = np.arange(sticks.size)
+            if self.dealer_from_table:
+                dealer = self._sampleDealerFinals(sticks)
+                drawing = drawing[:0]
+            while drawing.size:
+                dealer[drawing] += self._drawDealerCards(sticks[drawing])
+                current = dealer[drawing]
+                drawing = drawing[(current >= 1) & (current < 17)]
+            dealer_bust = (dealer < 1) | (dealer > 21)
+            robot = self.robot_sums[sticks]
+            rewards[sticks] = np.where(dealer_bust, self.dealer_bust_reward[sticks], np.sign(robot - dealer))
+            dealer_sums[sticks] = dealer
+            self.terminated[sticks] = True
+
+        return self.dealer_cards.copy(), self.robot_sums.copy(), rewards, self.terminated.copy(), dealer_sums
+
+
+class StreamsEnvironment(BatchEnvironment):
+    """
+    Batch environment whose i-th game is dealt from the i-th of several card streams, so it sees
+    the same cards as an Environment drawing from CardStream(seeds[i], block_size), whatever
+    the other games do
+    """
+
+    def __init__(self, seeds, bust_penalty_below=-10, bust_penalty_above=-1, dealer_bust_reward=10,
+                 dealer_from_table=False, block_size=1024):
+        """
+        :param seeds: list of int, numpy SeedSequence or None, the seed of every game's card stream
+        :param bust_penalty_below: penalty of bust below 1, a number or an array with one entry per game
+        :param bust_penalty_above: penalty of bust above 21, a number or an array with one entry per game
+        :param dealer_bust_reward: reward of dealer bust, a number or an array with one entry per game
+        :param dealer_from_table: sample the outcome of stick from the dealer outcome table
+        :param block_size: number of cards per stream generated at once
+        """
+        self.streams = CardStreams(seeds, block_size)
+        super(StreamsEnvironment, self).__init__(len(self.streams), bust_penalty_below, bust_penalty_above,
+                                                 dealer_bust_reward, dealer_from_table=dealer_from_table)
+
+    def _dealBlackCards(self, games):
+        return self.streams.drawBlack(games)
+
+    def _drawRobotCards(self, games):
+        return self.streams.draw(games)
+
+    def _drawDealerCards(self, games):
+        return self.streams.draw(games)
+
+    def _uniform(self, games):
+        return self.streams.uniform(games)
+
+
+class CommonCardsEnvironment(BatchEnvironment):
+    """
+    Batch environment whose games are dealt from card sequences fixed in advance: the k-th
+    card the robot or the dealer draws in the i-th game of the j-th reset is the same whatever
+    was played before, so policies played on environments with the same seed, number of games
+    and block size see the same cards
+    (common random numbers). The sequences are generated in blocks of columns, a block only
+    depends on the seed, the reset and its position, so they extend deterministically.
+    """
+
+    def __init__(self, n, bust_penalty_below=-10, bust_penalty_above=-1, dealer_bust_reward=10, seed=None,
+                 block_size=8):
+        """
+        :param n: number of games played at the same time
+        :param bust_penalty_below: penalty of bust below 1, a number or an array with one entry per game
+        :param bust_penalty_above: penalty of bust above 21, a number or an array with one entry per game
+        :param dealer_bust_reward: reward of dealer bust, a number or an array with one entry per game
+        :param seed: int seed of the card sequences, a random one if None
+        :param block_size: number of cards per game generated at once
+        """
+        self.seed = np.random.SeedSequence(seed).entropy
+        self.block_size = block_size
+        self.resets = 0     # number of the current set of games
+        self.cards = None   # cards of the robot and of the dealer drawn so far, one row per game
+        self.drawn = None   # number of cards the robot and the dealer drew in every game
+        super(CommonCardsEnvironment, self).__init__(n, bust_penalty_below, bust_penalty_above, dealer_bust_reward)
+
+    def _block(self, who, block):
+        """
+        cards of one block of columns of the current set of games
+        :param who: 0 for the robot's cards, 1 for the dealer's
+        :param block: position of the block
+        :return: int array of shape (n, block_size), negative values are red cards
+        """
+        rng = np.random.default_rng([self.seed, self.resets, who, block])
+        values = rng.integers(1, 11, (self.n, self.block_size))
+        red = rng.random((self.n, self.block_size)) < 1 / 3
+        return np.where(red, -values, values)
+
+    def _next(self, who, games):
+        """
+        the next card of robot or dealer in each of the given games
+        """
+        cards, drawn = self.cards[who], self.drawn[who]
+        positions = drawn[games]
+        if positions.size and positions.max() >= cards.shape[1]:
+            blocks = [self._block(who, b) for b in range(cards.shape[1] // self.block_size,
+                                                          positions.max() // self.block_size + 1)]
+            cards = self.cards[who] = np.concatenate([cards] + blocks, axis=1)
+        drawn[games] += 1
+        return cards[games, positions]
+
+    def _drawRobotCards(self, games):
+        return self._next(0, games)
+
+    def _drawDealerCards(self, games):
+        return self._next(1, games)
+
+    def reset(self, mask=None):
+        """
+        starts the next set of games, dealer and robot both get a black card
+        :param mask: must be None, all games are restarted
+        :return: dealer_cards: int array, robot_sums: int array
+        """
+        if mask is not None:
+            raise ValueError("the games of a common cards environment can only be restarted all together")
+        self.resets += 1
+        rng = np.random.default_rng([self.seed, self.resets])
+        self.dealer_cards[:] = rng.integers(1, 11, self.n)
+        self.robot_sums[:] = rng.integers(1, 11, self.n)
+        self.terminated[:] = False
+        self.cards = [np.zeros((self.n, 0), dtype=np.int64), np.zeros((self.n, 0), dtype=np.int64)]
+        self.drawn = [np.zeros(self.n, dtype=np.int64), np.zeros(self.n, dtype=np.int64)]
+        return self.dealer_cards.copy(), self.robot_sums.copy()
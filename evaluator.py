@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# copyright (C) Team Kingslayer, University of Zurich, 2017.
+"""
+@author: Te Tan, Yves Steiner, Victoria Barth, Lihua Cao
+"""
+
+import argparse
+import math
+import random
+from statistics import NormalDist
+import numpy as np
+from environment import BatchEnvironment, CommonCardsEnvironment
+from qtable import QTable, DEALER_CARDS, PLAYER_SUMS
+import checkpoint
+import solver
+
+# fewest games evaluate_policy plays between two checks of the confidence interval
+MIN_ROUND = 1000
+
+
+class EvaluationResult(object):
+    """
+    outcome rates and mean reward of a policy, each with the half-width of its confidence interval
+    """
+
+    def __init__(self, episodes, wins, draws, reward_sum, reward_square_sum, confidence):
+        self.episodes = episodes
+        self.confidence = confidence
+        z = NormalDist().inv_cdf(0.5 + confidence / 2)
+
+        self.win_rate = wins / episodes
+        self.draw_rate = draws / episodes
+        self.loss_rate = 1 - self.win_rate - self.draw_rate
+        self.win_rate_ci = z * math.sqrt(self.win_rate * (1 - self.win_rate) / episodes)
+        self.draw_rate_ci = z * math.sqrt(self.draw_rate * (1 - self.draw_rate) / episodes)
+        self.loss_rate_ci = z * math.sqrt(self.loss_rate * (1 - self.loss_rate) / episodes)
+
+        self.mean_reward = reward_sum / episodes
+        variance = max(reward_square_sum / episodes - self.mean_reward ** 2, 0) * episodes / max(episodes - 1, 1)
+        self.mean_reward_ci = z * math.sqrt(variance / episodes)
+
+    def __repr__(self):
+        return ("%s (%d episodes, %d%% confidence): win %.4f +- %.4f, draw %.4f +- %.4f, loss %.4f +- %.4f, "
+                "mean reward %.4f +- %.4f" % (self.__class__.__name__, self.episodes, round(self.confidence * 100),
+                                              self.win_rate, self.win_rate_ci, self.draw_rate, self.draw_rate_ci,
+                                              self.loss_rate, self.loss_rate_ci, self.mean_reward, self.mean_reward_ci))
+
+
+class PairedDifference(object):
+    """
+    difference of the win rate or mean reward of two policies which played the same games,
+    with the variance of the difference per game and the half-width of its confidence interval
+    """
+
+    def __init__(self, episodes, difference_sum, difference_square_sum, independent_variance, confidence):
+        """
+        :param episodes: number of games each policy played
+        :param difference_sum: sum over the games of the first policy's outcome minus the second's
+        :param difference_square_sum: sum of the squares of these differences
+        :param independent_variance: sum of the variances of both policies' outcomes per game,
+                                     the variance of the difference if they had played different games
+        :param confidence: confidence level of the interval
+        """
+        self.episodes = episodes
+        self.confidence = confidence
+        z = NormalDist().inv_cdf(0.5 + confidence / 2)
+        self.mean = difference_sum / episodes
+        self.variance = (max(difference_square_sum / episodes - self.mean ** 2, 0)
+                         * episodes / max(episodes - 1, 1))
+        self.ci = z * math.sqrt(self.variance / episodes)
+        self.independent_variance = independent_variance
+        # how many times more games the same comparison would need without common cards
+        self.variance_reduction = independent_variance / self.variance if self.variance else math.inf
+
+    def significant(self):
+        """
+        :return: True if the confidence interval excludes 0
+        """
+        return abs(self.mean) > self.ci
+
+    def __repr__(self):
+        return ("%s (%d episodes, %d%% confidence): %.4f +- %.4f, variance %.4f, %.1fx fewer games than unpaired"
+                % (self.__class__.__name__, self.episodes, round(self.confidence * 100), self.mean, self.ci,
+                   self.variance, self.variance_reduction))
+
+
+class PairedComparison(object):
+    """
+    outcome of several policies which played the same games, see compare_policies
+    """
+
+    def __init__(self, names, episodes, outcome_sums, outcome_products, results, confidence):
+        """
+        :param names: name of every policy
+        :param episodes: number of games each policy played
+        :param outcome_sums: {'reward' or 'win': float array, sum over the games of every policy's outcome}
+        :param outcome_products: {'reward' or 'win': float array, entry [i, j] is the sum over the games of
+                                 the outcome of policy i times the one of policy j}
+        :param results: EvaluationResult of every policy
+        :param confidence: confidence level of the intervals
+        """
+        self.names = list(names)
+        self.episodes = episodes
+        self.outcome_sums = outcome_sums
+        self.outcome_products = outcome_products
+        self.results = results
+        self.confidence = confidence
+
+    def difference(self, i, j, measure='reward'):
+        """
+        :param i: index of the first policy
+        :param j: index of the second policy
+        :param measure: 'reward' compares the mean rewards, 'win' the win rates
+        :return: PairedDifference of policy i minus policy j
+        """
+        sums, products = self.outcome_sums[measure], self.outcome_products[measure]
+        n = self.episodes
+        variances = (np.diag(products) / n - (sums / n) ** 2) * n / max(n - 1, 1)
+        return PairedDifference(n, sums[i] - sums[j], products[i, i] + products[j, j] - 2 * products[i, j],
+                                variances[i] + variances[j], self.confidence)
+
+    def ranking(self, measure='reward'):
+        """
+        :param measure: 'reward' ranks by mean reward, 'win' by win rate
+        :return: list of policy indices, the best first
+        """
+        return sorted(range(len(self.names)), key=lambda i: -self.outcome_sums[measure][i])
+
+
+def greedy_policy(q):
+    """
+    Freezes the greedy policy of Q values
+    :param q: Robot, QTable or float array of shape (10, 21, 2)
+    :return: int array of shape (10, 21), 0 is hit and 1 is stick
+    """
+    q = getattr(q, 'q', q)
+    if isinstance(q, QTable):
+        return q.greedyPolicy()
+    return np.argmax(q, axis=2)
+
+
+def play(policy, env):
+    """
+    Plays one game in each slot of a batch environment until all of them are over
+    :param policy: int array of shape (10, 21), 0 is hit and 1 is stick
+    :param env: BatchEnvironment
+    :return: float array, reward of every game
+    """
+    env.reset()
+    rewards = np.zeros(env.n)
+    terminated = np.zeros(env.n, dtype=bool)
+    while not terminated.all():
+        # finished games may hold a bust sum, their action is ignored anyway
+        sums = np.clip(env.robot_sums, 1, PLAYER_SUMS)
+        actions = policy[env.dealer_cards - 1, sums - 1]
+        dealer_cards, robot_sums, step_rewards, terminated, dealer_sums = env.doStep(actions)
+        rewards += step_rewards
+    return rewards
+
+
+def evaluate_policy(policy, episodes=1000000, batch_size=100000, confidence=0.95, target_half_width=None,
+                    bust_penalty_below=-10, bust_penalty_above=-1, dealer_bust_reward=10, seed=None):
+    """
+    Plays the greedy policy in batches and reports win, draw and loss rates and the mean reward.
+    A game counts as won if its reward is at least 1, like in Robot.evaluate_robot.
+    :param policy: int array of shape (10, 21), 0 is hit and 1 is stick, see greedy_policy
+    :param episodes: number of games to play, upper bound if target_half_width is given
+    :param batch_size: number of games played at the same time, at most
+    :param confidence: confidence level of the intervals
+    :param target_half_width: stop early once the confidence interval of the win rate is this narrow,
+                              the games are then played in rounds of about as many as the interval still needs
+    :param bust_penalty_below: penalty of bust below 1
+    :param bust_penalty_above: penalty of bust above 21
+    :param dealer_bust_reward: reward of dealer bust
+    :param seed: seed of the card generator
+    :return: EvaluationResult
+    """
+    policy = np.asarray(policy)
+    if policy.shape != (DEALER_CARDS, PLAYER_SUMS):
+        raise ValueError("policy must have shape (%d, %d), got %s" % (DEALER_CARDS, PLAYER_SUMS, policy.shape))
+    rng = np.random.default_rng(seed)     # shared by the environments of all rounds
+    env = None
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+
+    played = wins = draws = 0
+    reward_sum = reward_square_sum = 0.0
+    win_rate = 0.5     # estimate of the win rate, the widest interval until games are played
+    while played < episodes:
+        size = batch_size
+        if target_half_width is not None:
+            # games the interval needs at the estimated win rate, the next round plays the ones missing
+            needed = math.ceil(z * z * win_rate * (1 - win_rate) / target_half_width ** 2)
+            size = min(batch_size, episodes - played, max(needed - played, MIN_ROUND))
+        if env is None or size != env.n:
+            env = BatchEnvironment(size, bust_penalty_below, bust_penalty_above, dealer_bust_reward, rng)
+        rewards = play(policy, env)[:episodes - played]
+        played += rewards.size
+        wins += np.count_nonzero(rewards >= 1)
+        draws += np.count_nonzero(rewards == 0)
+        reward_sum += rewards.sum()
+        reward_square_sum += np.square(rewards).sum()
+        if target_half_width is not None:
+            result = EvaluationResult(played, wins, draws, reward_sum, reward_square_sum, confidence)
+            if result.win_rate_ci <= target_half_width:
+                return result
+            win_rate = result.win_rate
+    return EvaluationResult(played, wins, draws, reward_sum, reward_square_sum, confidence)
+
+
+def evaluate_robot(robot, **kwargs):
+    """
+    Evaluates the greedy policy of a robot with its reward parameters, the robot is not changed
+    :param robot: Robot
+    :param kwargs: further arguments of evaluate_policy
+    :return: EvaluationResult
+    """
+    return evaluate_policy(greedy_policy(robot), bust_penalty_below=robot.bust_penalty_below,
+                           bust_penalty_above=robot.bust_penalty_above,
+                           dealer_bust_reward=robot.dealer_bust_reward, **kwargs)
+
+
+def compare_policies(policies, names=None, episodes=100000, batch_size=100000, confidence=0.95,
+                     bust_penalty_below=-10, bust_penalty_above=-1, dealer_bust_reward=10, seed=None):
+    """
+    Plays every policy on the same games: each game's cards, the ones drawn by the robot
+    and by the dealer, are the same for all policies (common random numbers). The differences
+    between the policies are then free of most of the luck of the cards and need far fewer
+    games to tell apart than separate evaluations.
+    :param policies: list of int arrays of shape (10, 21), 0 is hit and 1 is stick, see greedy_policy
+    :param names: optional name of every policy
+    :param episodes: number of games every policy plays
+    :param batch_size: number of games played at the same time
+    :param confidence: confidence level of the intervals
+    :param bust_penalty_below: penalty of bust below 1
+    :param bust_penalty_above: penalty of bust above 21
+    :param dealer_bust_reward: reward of dealer bust
+    :param seed: seed of the card sequences
+    :return: PairedComparison
+    """
+    policies = [np.asarray(policy) for policy in policies]
+    for policy in policies:
+        if policy.shape != (DEALER_CARDS, PLAYER_SUMS):
+            raise ValueError("policy must have shape (%d, %d), got %s" % (DEALER_CARDS, PLAYER_SUMS, policy.shape))
+    names = names or ['policy %d' % i for i in range(len(policies))]
+    seed = np.random.SeedSequence(seed).entropy     # the same cards for every policy, also if seed is None
+    envs = [CommonCardsEnvironment(batch_size, bust_penalty_below, bust_penalty_above, dealer_bust_reward, seed)
+            for policy in policies]
+
+    played = 0
+    sums = dict((measure, np.zeros(len(policies))) for measure in ('reward', 'win'))
+    products = dict((measure, np.zeros((len(policies), len(policies)))) for measure in ('reward', 'win'))
+    draws = np.zeros(len(policies))
+    while played < episodes:
+        rewards = np.stack([play(policy, env) for policy, env in zip(policies, envs)])[:, :episodes - played]
+        played += rewards.shape[1]
+        for measure, outcomes in (('reward', rewards), ('win', (rewards >= 1).astype(float))):
+            sums[measure] += outcomes.sum(axis=1)
+            products[measure] += outcomes.dot(outcomes.T)
+        draws += np.count_nonzero(rewards == 0, axis=1)
+
+    results = [EvaluationResult(played, sums['win'][i], draws[i], sums['reward'][i], products['reward'][i, i],
+                                confidence) for i in range(len(policies))]
+    return PairedComparison(names, played, sums, products, results, confidence)
+
+
+def rank(paths, measure='reward', **kwargs):
+    """
+    Ranks the greedy policies of saved robots by playing them on the same games,
+    with the reward parameters of the first robot
+    :param paths: checkpoints (.npz) or Q tables (.npy), see checkpoint.load_checkpoint
+    :param measure: 'reward' ranks by mean reward, 'win' by win rate
+    :param kwargs: further arguments of compare_policies
+    :return: PairedComparison, list of policy indices from the best to the worst
+    """
+    robots = [checkpoint.load_checkpoint(path, restore_rng=False) for path in paths]
+    rewards = [(robot.bust_penalty_below, robot.bust_penalty_above, robot.dealer_bust_reward) for robot in robots]
+    if len(set(rewards)) > 1:
+        raise ValueError("the robots were trained with different rewards: %s" % rewards)
+    comparison = compare_policies([greedy_policy(robot) for robot in robots], list(paths),
+                                  bust_penalty_below=rewards[0][0], bust_penalty_above=rewards[0][1],
+                                  dealer_bust_reward=rewards[0][2], **kwargs)
+    return comparison, comparison.ranking(measure)
+
+
+def compare_training(robots, episodes, evaluation_episodes=200000, seed=2016):
+    """
+    Trains every robot from scratch for each number of episodes and prints a table of the
+    greedy win rate, greedy mean reward and mse to the optimal Q values
+    :param robots: list of (name, function which creates a new robot)
+    :param episodes: list of numbers of training episodes
+    :param evaluation_episodes: number of games every greedy policy is evaluated with
+    :param seed: seed of python's random module before every training run
+    :return: list with one list of (EvaluationResult, mse) per robot for every number of episodes
+    """
+    # the training loop builds on the robots, it is only needed here
+    from runner import train
+
+    print("greedy winning rate, greedy mean reward and mse to the optimal Q values")
+    print("%8s  %s" % ('episodes', '  '.join('%26s' % name for name, create in robots)))
+    rows = []
+    for n in episodes:
+        row = []
+        columns = []
+        for name, create in robots:
+            random.seed(seed)
+            robot = create()
+            robot.reset()
+            train(robot, n, log_last=0)
+            evaluation = evaluate_robot(robot, episodes=evaluation_episodes, seed=1)
+            distance = solver.distance_to_optimal(robot.q, solver.solve_for_robot(robot))
+            row.append((evaluation, distance['mse']))
+            columns.append("%.4f %6.3f %12.1f" % (evaluation.win_rate, evaluation.mean_reward, distance['mse']))
+        print("%8d  %s" % (n, '  '.join('%26s' % column for column in columns)))
+        rows.append(row)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="evaluate the optimal policy and sticking from 17 on, "
+                                                 "or rank saved robots by playing them on the same games")
+    parser.add_argument('--episodes', type=int, default=1000000)
+    parser.add_argument('--target-half-width', type=float, default=None)
+    parser.add_argument('--seed', type=int, default=2016)
+    parser.add_argument('--rank', nargs='+', metavar='CHECKPOINT',
+                        help="rank the greedy policies of these checkpoints (.npz) or Q tables (.npy)")
+    parser.add_argument('--measure', choices=('reward', 'win'), default='reward', help="what --rank ranks by")
+    args = parser.parse_args()
+
+    if args.rank:
+        try:
+            comparison, order = rank(args.rank, args.measure, episodes=args.episodes, seed=args.seed)
+        except ValueError as error:
+            parser.error(str(error))
+        best = order[0]
+        print("%d games per policy, the same cards for all, %d%% confidence"
+              % (comparison.episodes, round(comparison.confidence * 100)))
+        for place, i in enumerate(order, 1):
+            result = comparison.results[i]
+            line = "%2d. %s: win %.4f +- %.4f, mean reward %.4f +- %.4f" % (
+                place, comparison.names[i], result.win_rate, result.win_rate_ci, result.mean_reward,
+                result.mean_reward_ci)
+            if i != best and not comparison.difference(i, best, args.measure).variance:
+                line += ", plays every game like the best"
+            elif i != best:
+                difference = comparison.difference(i, best, args.measure)
+                line += ", %s to the best %.4f +- %.4f%s (%.1fx fewer games than unpaired)" % (
+                    args.measure, difference.mean, difference.ci, '' if difference.significant() else ' (tie)',
+                    difference.variance_reduction)
+            print(line)
+        return
+
+    policies = {
+        'optimal': solver.solve().policy,
+        'stick from 17 on': np.tile((np.arange(1, PLAYER_SUMS + 1) >= 17).astype(int), (DEALER_CARDS, 1)),
+    }
+    for name, policy in policies.items():
+        print(name, evaluate_policy(policy, args.episodes, target_half_width=args.target_half_width, seed=args.seed))
+
+
+if __name__ == '__main__':
+    main()
@@ -14,18 +14,30 @@ class Card(object):
     color and value of the card
     if the color is red, value contributes negatively to the sum,
     if the color is black, value contributes positively to the sum
+    every card exists only once: Card(color, value) returns the shared instance,
+    so cards are immutable and two cards are equal only if they are the same object
     """
-    COLOR = Enum('COLOR', ('Red', 'Black'))
+    COLOR = Enum('COLOR', ('Red', 'Black'), qualname='Card.COLOR')
 
-    def __init__(self, color, value):
-        self.color = color
-        self.value = value
+    __slots__ = ('color', 'value', 'signed_value', 'index')
+    _cache = {}     # (color, value) -> Card
 
-    def __eq__(self, other):
-        return self.color == other.color and self.value == other.value
+    def __new__(cls, color, value):
+        card = cls._cache.get((color, value))
+        if card is None:
+            card = object.__new__(cls)
+            card.color = color
+            card.value = value
+            card.signed_value = -value if color == Card.COLOR.Red else value  # contribution to the sum
+            card.index = (color.value - 1) * 10 + value - 1     # 0 to 9 for red cards, 10 to 19 for black cards
+            cls._cache[(color, value)] = card
+        return card
+
+    def __reduce__(self):
+        return Card, (self.color, self.value)
 
     def __repr__(self):
-        return "%s (%d,%d)" % (self.__class__.__name__, self.color, self.value)
+        return "%s (%s,%d)" % (self.__class__.__name__, self.color.name, self.value)
 
     def __cmp__(self, other):
         if self.color == other.color:
@@ -48,28 +60,48 @@ class Card(object):
         else:
             return False
 
-    def __hash__(self):
-        return hash((self.color, self.value))
-
 
 class State(object):
     """
     dealer's initial card and robot's current sum of values
+    every state exists only once: State(dealer_card, robot_sum) returns the shared instance,
+    so states are immutable and two states are equal only if they are the same object
     """
 
-    def __init__(self, dealer_card, robot_sum):
-        self.dealer_card = dealer_card
-        self.robot_sum = robot_sum
-
-    def __eq__(self, other):
-        return self.dealer_card == other.dealer_card and self.robot_sum == other.robot_sum
+    __slots__ = ('dealer_card', 'robot_sum', 'index')
+    _cache = {}     # (dealer card index, robot's sum) -> State
+
+    def __new__(cls, dealer_card, robot_sum):
+        key = (dealer_card.index, robot_sum)
+        state = cls._cache.get(key)
+        if state is None:
+            state = object.__new__(cls)
+            state.dealer_card = dealer_card
+            state.robot_sum = robot_sum
+            # position in the 10x21 state space, -1 for states outside of it (e.g. bust)
+            if 1 <= dealer_card.value <= 10 and 1 <= robot_sum <= 21:
+                state.index = (dealer_card.value - 1) * 21 + robot_sum - 1
+            else:
+                state.index = -1
+            cls._cache[key] = state
+        return state
+
+    @staticmethod
+    def fromIndex(index):
+        """
+        inverse of State.index, the dealer's card is black
+        :param index: int, 0 to 209
+        :return: State
+        """
+        dealer_value, robot_sum = divmod(index, 21)
+        return State(Card(Card.COLOR.Black, dealer_value + 1), robot_sum + 1)
+
+    def __reduce__(self):
+        return State, (self.dealer_card, self.robot_sum)
 
     def __repr__(self):
         return "%s (dealer's initial: %d, robot's sum: %d)" % (self.__class__.__name__, self.dealer_card.value, self.robot_sum)
 
-    def __hash__(self):
-        return hash((self.dealer_card, self.robot_sum))
-
     def __cmp__(self, other):
         if self.dealer_card < other.dealer_card:
             return -1
@@ -87,4 +119,14 @@ class State(object):
         return self.dealer_card > other.dealer_card and self.robot_sum > other.robot_sum
 
 # actions the robot able to perform
-ACTION = Enum('ACTION', ('hit', 'stick'))
\ No newline at end of file
+ACTION = Enum('ACTION', ('hit', 'stick'))
+
+
+def stateActionIndex(state, action):
+    """
+    position of a state action pair in the 10x21x2 state action space
+    :param state: State inside the 10x21 state space
+    :param action: ACTION
+    :return: int, 0 to 419
+    """
+    return state.index * 2 + action.value - 1
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# copyright (C) Team Kingslayer, University of Zurich, 2017.
+"""
+@author: Te Tan, Yves Steiner, Victoria Barth, Lihua Cao
+"""
+
+import argparse
+import ctypes
+import json
+import multiprocessing
+import os
+import tempfile
+import time
+import numpy as np
+from qtable import QTable, DEALER_CARDS, PLAYER_SUMS, ACTIONS
+from runner import train, TrainingResult
+from sweep import make_robot, seed_streams
+import checkpoint
+import solver
+
+SHAPE = (DEALER_CARDS, PLAYER_SUMS, len(ACTIONS))
+
+# per worker counters in shared memory
+WORKER_COUNTERS = ('episodes', 'steps', 'wins', 'explorations', 'epsilon', 'seconds')
+
+
+def create_table(path, q=None):
+    """
+    Creates the memory-mapped Q table the workers write to, a plain .npy file
+    which checkpoint.load_checkpoint can open afterwards
+    :param path: file name, should end with .npy
+    :param q: optional QTable with the initial Q values
+    :return: memory-mapped float array of shape (10, 21, 2)
+    """
+    values = np.lib.format.open_memmap(path, mode='w+', dtype=np.float64, shape=SHAPE)
+    values[...] = 0 if q is None else q.values
+    values.flush()
+    return values
+
+
+def _worker(robot, index, seed, episodes, path, visited, counters):
+    """
+    Trains on the shared Q table without any locking, this is what every worker process runs
+    :param robot: Robot with the worker's parameters and epsilon schedule
+    :param index: number of the worker
+    :param seed: numpy SeedSequence of the worker's random streams
+    :param episodes: number of episodes to play
+    :param path: .npy file of the shared Q values
+    :param visited: RawArray of bools, visited entries of the shared Q table
+    :param counters: RawArray with one row of WORKER_COUNTERS per worker
+    """
+    start = time.perf_counter()
+    robot.environment = seed_streams(seed)
+    values = np.lib.format.open_memmap(path, mode='r+')
+    robot.q = QTable(values, np.frombuffer(visited, dtype=np.bool_).reshape(SHAPE))
+    robot.reset()
+    explorations = robot.explorations
+    result = train(robot, episodes, log_last=0)
+    values.flush()
+
+    row = np.frombuffer(counters, dtype=np.float64).reshape(-1, len(WORKER_COUNTERS))[index]
+    row[:] = (result.episodes, result.steps, result.wins, robot.explorations - explorations, robot.epsilon,
+              time.perf_counter() - start)
+
+
+def train_hogwild(robot, n, workers=None, path=None, seed=2016, epsilons=None, monitor_every=None):
+    """
+    Trains a robot with several worker processes which each play their own episodes and
+    write their Q value updates into one memory-mapped Q table, lock-free.
+    Updates of different workers may overwrite each other, which is rare as they are
+    small and spread over the table.
+    :param robot: Robot to train, its Q values are replaced by the learned ones
+    :param n: number of episodes, split among the workers
+    :param workers: number of worker processes, all cores if None
+    :param path: .npy file of the shared Q table which stays afterwards, if None a temporary
+                 file which is removed; checkpoint.save_checkpoint also keeps the robot's
+                 visited entries and parameters
+    :param seed: seed of the workers' random streams
+    :param epsilons: optional list with the initial exploration rate of every worker,
+                     otherwise all start with the robot's
+    :param monitor_every: seconds between two measurements of the distance to the optimal Q values,
+                          None to not measure
+    :return: TrainingResult (without the rewards of the single episodes), dictionary with the counters
+             of every worker, list of (seconds, mse, policy agreement) measured while training
+    """
+    workers = workers or multiprocessing.cpu_count()
+    temporary = path is None
+    if temporary:
+        handle, path = tempfile.mkstemp(suffix='.npy', prefix='hogwild-')
+        os.close(handle)
+    try:
+        return _train_hogwild(robot, n, workers, path, seed, epsilons, monitor_every)
+    finally:
+        if temporary:
+            os.remove(path)
+
+
+def _train_hogwild(robot, n, workers, path, seed, epsilons, monitor_every):
+    """train_hogwild with the number of workers and the path of the table decided"""
+    values = create_table(path, robot.q)
+    visited = multiprocessing.RawArray(ctypes.c_bool, values.size)
+    np.frombuffer(visited, dtype=np.bool_)[:] = robot.q.visited.reshape(-1)
+    counters = multiprocessing.RawArray(ctypes.c_double, workers * len(WORKER_COUNTERS))
+
+    processes = []
+    start = time.perf_counter()
+    for i, sequence in enumerate(np.random.SeedSequence(seed).spawn(workers)):
+        if epsilons is not None:
+            robot.epsilon = epsilons[i]
+        process = multiprocessing.Process(target=_worker, args=(
+            robot, i, sequence, n // workers + (i < n % workers), path, visited, counters))
+        process.start()
+        processes.append(process)
+
+    curve = []
+    if monitor_every:
+        solution = solver.solve_for_robot(robot)
+        while any(process.is_alive() for process in processes):
+            time.sleep(monitor_every)
+            distance = solver.distance_to_optimal(values, solution)
+            curve.append((time.perf_counter() - start, distance['mse'], distance['policy_agreement']))
+    for process in processes:
+        process.join()
+    seconds = time.perf_counter() - start
+
+    # continue with a private copy, the file stays as it is
+    robot.q = QTable(np.array(values), np.frombuffer(visited, dtype=np.bool_).reshape(SHAPE).copy())
+    robot.reset()
+
+    totals = np.frombuffer(counters, dtype=np.float64).reshape(workers, -1)
+    result = TrainingResult(keep_rewards=False)
+    result.episodes = int(totals[:, WORKER_COUNTERS.index('episodes')].sum())
+    result.steps = int(totals[:, WORKER_COUNTERS.index('steps')].sum())
+    result.wins = int(totals[:, WORKER_COUNTERS.index('wins')].sum())
+    robot.explorations += int(totals[:, WORKER_COUNTERS.index('explorations')].sum())
+    robot.epsilon = float(totals[:, WORKER_COUNTERS.index('epsilon')].min())
+    stats = {
+        'workers': [dict(zip(WORKER_COUNTERS, row.tolist())) for row in totals],
+        'seconds': seconds,
+        'episodes_per_second': result.episodes / seconds if seconds else 0,
+    }
+    return result, stats, curve
+
+
+def train_single(robot, n, chunk=1000, seed=2016):
+    """
+    Single process baseline of train_hogwild, measures the distance to the optimal
+    Q values after every chunk of episodes
+    :param robot: Robot to train
+    :param n: number of episodes
+    :param chunk: number of episodes between two measurements
+    :param seed: seed of the random streams
+    :return: TrainingResult, list of (seconds, mse, policy agreement)
+    """
+    robot.environment = seed_streams(np.random.SeedSequence(seed))
+    robot.reset()
+    solution = solver.solve_for_robot(robot)
+    result = TrainingResult()
+    curve = []
+    start = time.perf_counter()
+    while result.episodes < n:
+        part = train(robot, min(chunk, n - result.episodes), log_last=0)
+        result.episodes += part.episodes
+        result.steps += part.steps
+        result.wins += part.wins
+        result.reward_sum += part.reward_sum
+        result.rewards.extend(part.rewards)
+        distance = solver.distance_to_optimal(robot.q, solution)
+        curve.append((time.perf_counter() - start, distance['mse'], distance['policy_agreement']))
+    return result, curve
+
+
+def _seconds_to(curve, target_mse):
+    """first time of a curve at which the mse is at most target_mse, None if never"""
+    for seconds, mse, agreement in curve:
+        if mse <= target_mse:
+            return seconds
+    return None
+
+
+def compare_convergence(config, n, workers=None, path=None, seed=2016, target_mse=None, monitor_every=0.05):
+    """
+    Measures how fast, in wall-clock time, hogwild training gets close to the optimal
+    Q values compared to training in a single process
+    :param config: robot config, see sweep.make_robot
+    :param n: number of episodes of each run
+    :param workers: number of hogwild worker processes, all cores if None
+    :param path: .npy file of the shared Q table, see train_hogwild
+    :param seed: seed of the random streams
+    :param target_mse: mse to the optimal Q values which counts as converged,
+                       5% above the single process' final mse if None
+    :param monitor_every: seconds between two measurements of the hogwild run
+    :return: dictionary with the curves, final distances and seconds until converged of both runs
+    """
+    robot = make_robot(config)
+    single, single_curve = train_single(robot, n, seed=seed)
+    robot = make_robot(config)
+    hogwild, stats, hogwild_curve = train_hogwild(robot, n, workers, path, seed, monitor_every=monitor_every)
+    distance = solver.distance_to_optimal(robot.q, solver.solve_for_robot(robot))
+    hogwild_curve.append((stats['seconds'], distance['mse'], distance['policy_agreement']))
+
+    if target_mse is None:
+        target_mse = single_curve[-1][1] * 1.05
+    return {
+        'config': config,
+        'episodes': n,
+        'workers': len(stats['workers']),
+        'target_mse': target_mse,
+        'single': {
+            'seconds': single_curve[-1][0],
+            'mse': single_curve[-1][1],
+            'policy_agreement': single_curve[-1][2],
+            'seconds_to_target': _seconds_to(single_curve, target_mse),
+            'curve': single_curve,
+        },
+        'hogwild': {
+            'seconds': stats['seconds'],
+            'mse': distance['mse'],
+            'policy_agreement': distance['policy_agreement'],
+            'seconds_to_target': _seconds_to(hogwild_curve, target_mse),
+            'curve': hogwild_curve,
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="lock-free parallel training on a memory-mapped Q table")
+    parser.add_argument('--trials', type=int, default=100000, help="episodes of the whole run")
+    parser.add_argument('--workers', type=int, help="worker processes, all cores by default")
+    parser.add_argument('--table', metavar='NPY',
+                        help="keep the memory-mapped Q table in this .npy file, a temporary file by default")
+    parser.add_argument('--save', metavar='CHECKPOINT',
+                        help="store the trained robot with its visited entries and parameters in a checkpoint (.npz)")
+    # Q-learning (algo 1) bootstraps from terminal steps and does not approach the optimal Q values,
+    # so multi-step TD is the default, which --compare can measure the convergence of
+    parser.add_argument('--config', default='{"algo": 2, "multi_step": 5, "alpha": 0.05}',
+                        help="robot config as JSON, see sweep.make_robot; the default is multi-step TD, "
+                             "{\"algo\": 1} trains with Q-learning")
+    parser.add_argument('--seed', type=int, default=2016)
+    parser.add_argument('--compare', action='store_true',
+                        help="also train in a single process and compare the wall-clock time until converged")
+    parser.add_argument('--target-mse', type=float, help="mse to the optimal Q values which counts as converged")
+    args = parser.parse_args()
+    config = json.loads(args.config)
+
+    if args.compare and args.save:
+        parser.error("--compare trains two robots, it cannot be combined with --save")
+
+    if args.compare:
+        report = compare_convergence(config, args.trials, args.workers, args.table, args.seed, args.target_mse)
+        for run in ('single', 'hogwild'):
+            del report[run]['curve']
+        print(json.dumps(report, indent=2))
+    else:
+        robot = make_robot(config)
+        result, stats, curve = train_hogwild(robot, args.trials, args.workers, args.table, args.seed)
+        print(json.dumps(stats, indent=2))
+        print("Winning rate: " + str(result.winning_rate()))
+        if args.table:
+            print("Q table stored in " + args.table)
+        if args.save:
+            print("Robot stored in " + checkpoint.save_checkpoint(robot, args.save))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# copyright (C) Team Kingslayer, University of Zurich, 2017.
+"""
+@author: Te Tan, Yves Steiner, Victoria Barth, Lihua Cao
+"""
+
+import json
+import sys
+import time
+
+
+class Instrumentation(object):
+    """
+    Per-phase timers and counters of a training run.
+    runner.train only measures when it is given an Instrumentation, so runs without one pay
+    nothing but a few boolean checks. Snapshots and the final summary are plain dictionaries
+    which are handed to every sink.
+    """
+
+    def __init__(self, sinks=None, snapshot_every=1000):
+        """
+        :param sinks: list of callables sink(kind, data), kind is 'snapshot' or 'summary',
+                      a PrintSink if None
+        :param snapshot_every: send a snapshot every this many episodes, never if None
+        """
+        self.sinks = [PrintSink()] if sinks is None else list(sinks)
+        self.snapshot_every = snapshot_every
+        self.clock = time.perf_counter
+        self.seconds = {}   # phase -> total seconds
+        self.calls = {}     # phase -> number of timed calls
+        self.counters = {}  # name -> count
+        self.episodes = 0
+        self.start = self.clock()
+        self._explorations = None   # robot's explorations when the run started
+
+    def record(self, phase, seconds):
+        """
+        adds the duration of one call of a phase
+        :param phase: name of the phase, e.g. 'doStep'
+        :param seconds: duration of the call
+        """
+        self.seconds[phase] = self.seconds.get(phase, 0) + seconds
+        self.calls[phase] = self.calls.get(phase, 0) + 1
+
+    def count(self, name, value=1):
+        """
+        increases a counter
+        :param name: name of the counter, e.g. 'steps'
+        :param value: amount to add
+        """
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def begin(self, robot):
+        """
+        called by runner.train before the first episode
+        :param robot: Robot being trained
+        """
+        if self._explorations is None:
+            self._explorations = robot.explorations
+
+    def endEpisode(self, robot):
+        """
+        called by runner.train after every episode, sends a snapshot when one is due
+        :param robot: Robot being trained
+        """
+        self.episodes += 1
+        if self.snapshot_every and self.episodes % self.snapshot_every == 0:
+            self._emit('snapshot', robot)
+
+    def finish(self, robot):
+        """
+        called by runner.train after the last episode, sends the summary
+        :param robot: Robot being trained
+        :return: the summary
+        """
+        return self._emit('summary', robot)
+
+    def report(self, robot):
+        """
+        current state of all timers and counters
+        :param robot: Robot being trained
+        :return: dictionary which can be dumped as JSON
+        """
+        elapsed = self.clock() - self.start
+        phases = {}
+        for phase, seconds in self.seconds.items():
+            calls = self.calls[phase]
+            phases[phase] = {
+                'seconds': seconds,
+                'calls': calls,
+                'mean': seconds / calls,
+                'share': seconds / elapsed if elapsed else 0,
+            }
+        counters = dict(self.counters)
+        counters['explorations'] = robot.explorations - (self._explorations or 0)
+        if counters.get('sticks'):
+            counters['dealer_draws_per_stick'] = counters.get('dealer_draws', 0) / counters['sticks']
+        return {
+            'episodes': self.episodes,
+            'elapsed': elapsed,
+            'episodes_per_second': self.episodes / elapsed if elapsed else 0,
+            'phases': phases,
+            'counters': counters,
+            'table_size': len(robot.q),
+            'epsilon': robot.epsilon,
+        }
+
+    def _emit(self, kind, robot):
+        data = self.report(robot)
+        for sink in self.sinks:
+            sink(kind, data)
+        return data
+
+
+class PrintSink(object):
+    """writes every snapshot and summary as one JSON line to a stream"""
+
+    def __init__(self, stream=None):
+        self.stream = stream
+
+    def __call__(self, kind, data):
+        stream = self.stream or sys.stderr
+        stream.write(json.dumps({kind: data}) + '\n')
+        stream.flush()
+
+
+class JsonLinesSink(object):
+    """appends every snapshot and summary as one JSON line to a file"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def __call__(self, kind, data):
+        with open(self.path, 'a') as f:
+            f.write(json.dumps({kind: data}) + '\n')
+
+
+class MemorySink(object):
+    """keeps every snapshot and summary in a list, e.g. for notebooks"""
+
+    def __init__(self):
+        self.records = []
+
+    def __call__(self, kind, data):
+        self.records.append((kind, data))
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# copyright (C) Team Kingslayer, University of Zurich, 2017.
+"""
+@author: Te Tan, Yves Steiner, Victoria Barth, Lihua Cao
+"""
+
+try:
+    from collections.abc import Mapping
+except ImportError:  # python < 3.3
+    from collections import Mapping
+
+import numpy as np
+from helpers import *
+from qtable import DEALER_CARDS, PLAYER_SUMS, ACTIONS
+from robot import Robot
+
+# overlapping intervals of the coarse coding, bounds included
+DEALER_INTERVALS = ((1, 4), (4, 7), (7, 10))
+PLAYER_INTERVALS = ((1, 6), (4, 9), (7, 12), (10, 15), (13, 18), (16, 21))
+FEATURE_COUNT = len(DEALER_INTERVALS) * len(PLAYER_INTERVALS) * len(ACTIONS)
+
+
+def _features():
+    """
+    binary feature vectors of every state action pair, feature
+    (dealer interval i, player interval j, action a) is number (i * 6 + j) * 2 + a
+    :return: features: float array of shape (210, 2, 36), one row per State.index,
+             active: list of int arrays, the active features of State.index * 2 + action index
+    """
+    features = np.zeros((DEALER_CARDS * PLAYER_SUMS, len(ACTIONS), FEATURE_COUNT))
+    for index in range(DEALER_CARDS * PLAYER_SUMS):
+        dealer, player = index // PLAYER_SUMS + 1, index % PLAYER_SUMS + 1
+        for i, (low, high) in enumerate(DEALER_INTERVALS):
+            for j, (player_low, player_high) in enumerate(PLAYER_INTERVALS):
+                if low <= dealer <= high and player_low <= player <= player_high:
+                    for a in range(len(ACTIONS)):
+                        features[index, a, (i * len(PLAYER_INTERVALS) + j) * len(ACTIONS) + a] = 1
+    features.setflags(write=False)
+    active = [np.flatnonzero(row) for row in features.reshape(-1, FEATURE_COUNT)]
+    return features, active
+
+
+FEATURES, ACTIVE = _features()
+
+
+class LinearQ(Mapping):
+    """
+    Q values approximated by a linear function of coarse-coded binary features,
+    Q(s, a) is the sum of the weights of the features active in (s, a).
+    Memory and update cost only depend on the number of features, not on the number of states.
+    It offers the methods of QTable the robot uses, every state action pair has a value.
+    """
+
+    def __init__(self, weights=None):
+        """
+        :param weights: optional float array of length 36 to store the weights in
+        """
+        self.weights = np.zeros(FEATURE_COUNT) if weights is None else weights
+
+    def __reduce__(self):
+        return LinearQ, (self.weights,)
+
+    @property
+    def values(self):
+        """
+        approximated Q values of the whole state action space
+        :return: float array of shape (10, 21, 2), like QTable.values
+        """
+        return FEATURES.dot(self.weights).reshape(DEALER_CARDS, PLAYER_SUMS, len(ACTIONS))
+
+    @property
+    def visited(self):
+        """
+        every state action pair has a value
+        :return: bool array of shape (10, 21, 2), like QTable.visited
+        """
+        return np.ones((DEALER_CARDS, PLAYER_SUMS, len(ACTIONS)), dtype=bool)
+
+    def __array__(self, dtype=None, copy=None):
+        return self.values if dtype is None else self.values.astype(dtype)
+
+    def actionValues(self, state):
+        """
+        Q values of hit and stick in a state, 0 in terminal states
+        :param state: State
+        :return: (float, float) q value of hit, q value of stick
+        """
+        if state.index < 0:
+            return 0, 0
+        hit_q, stick_q = FEATURES[state.index].dot(self.weights)
+        return hit_q, stick_q
+
+    def maxValue(self, state):
+        """
+        biggest Q value of a state, 0 in terminal states
+        :param state: State
+        :return: float
+        """
+        return max(self.actionValues(state))
+
+    def bestAction(self, state):
+        """
+        greedy action in a state, hit wins ties
+        :param state: State
+        :return: ACTION
+        """
+        hit_q, stick_q = self.actionValues(state)
+        return ACTION.hit if hit_q >= stick_q else ACTION.stick
+
+    def greedyPolicy(self):
+        """
+        greedy action index of every state, hit wins ties
+        :return: int array of shape (10, 21), 0 is hit and 1 is stick
+        """
+        return np.argmax(self.values, axis=2)
+
+    def __getitem__(self, key):
+        state, action = key
+        if state.index < 0:
+            raise KeyError(key)
+        return float(FEATURES[state.index, action.value - 1].dot(self.weights))
+
+    def get(self, key, default=None):
+        state, action = key
+        if state.index < 0:
+            return default
+        return float(FEATURES[state.index, action.value - 1].dot(self.weights))
+
+    def __setitem__(self, key, value):
+        """
+        moves the approximation of a state action pair to the value the robot computed,
+        i.e. current + alpha * (target - current) becomes a gradient step of size alpha
+        divided by the number of active features (normalised least mean squares)
+        """
+        state, action = key
+        if state.index < 0:
+            raise KeyError(key)
+        active = ACTIVE[state.index * len(ACTIONS) + action.value - 1]
+        current = self.weights[active].sum()
+        self.weights[active] += (value - current) / active.size
+
+    def __iter__(self):
+        for index in range(DEALER_CARDS * PLAYER_SUMS):
+            for action in ACTIONS:
+                yield State.fromIndex(index), action
+
+    def __len__(self):
+        return DEALER_CARDS * PLAYER_SUMS * len(ACTIONS)
+
+    def __repr__(self):
+        return "%s(%r)" % (self.__class__.__name__, self.weights.tolist())
+
+    def clear(self):
+        self.weights[...] = 0
+
+
+class LinearRobot(Robot):
+    """
+    Robot which learns a linear approximation of the Q values instead of a table,
+    with the same Q-learning, SARSA and multi-step updates
+    """
+
+    def __init__(self, algo=1, multi_step=1, environment=None):
+        if algo in (3, 4):
+            raise ValueError("SARSA(lambda) and Q(lambda) (algo 3 and 4) need a Q table")
+        super(LinearRobot, self).__init__(algo=algo, multi_step=multi_step, environment=environment)
+        self.q = LinearQ()  # weights of the coarse-coded features
+        self.alpha = 0.01   # a weight is shared by many states, big steps make it oscillate
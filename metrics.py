@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# copyright (C) Team Kingslayer, University of Zurich, 2017.
+"""
+@author: Te Tan, Yves Steiner, Victoria Barth, Lihua Cao
+"""
+
+import json
+import os
+import numpy as np
+
+# quantities tracked per episode, each also as rolling mean and exponentially weighted mean
+SERIES = ('win', 'reward', 'length', 'exploration_ratio', 'q_change')
+
+RECORD = np.dtype([('episode', '<i8')] +
+                  [(name, '<f4') for name in SERIES] +
+                  [('rolling_' + name, '<f4') for name in SERIES] +
+                  [('ewma_' + name, '<f4') for name in SERIES])
+
+MAGIC = b'EASY21METRICS\n'
+HEADER_SIZE = 512   # magic plus the JSON description of RECORD, padded with spaces
+
+
+class MetricsLog(object):
+    """
+    Append-only binary log of episode records. Records are collected in a fixed-size chunk
+    which is written to the file whenever it is full, so memory use does not grow with the run.
+    """
+
+    def __init__(self, path, chunk_size=4096):
+        """
+        :param path: log file, records are appended if it already exists
+        :param chunk_size: number of records kept in memory before they are written
+        """
+        self.path = path
+        self.chunk = np.zeros(chunk_size, dtype=RECORD)
+        self.size = 0   # records in the chunk
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            header = MAGIC + json.dumps(RECORD.descr).encode()
+            with open(path, 'wb') as f:
+                f.write(header.ljust(HEADER_SIZE - 1) + b'\n')
+        elif _read_dtype(path) != RECORD:
+            raise ValueError("%s is a metrics log with different fields" % path)
+        self.count = (os.path.getsize(path) - HEADER_SIZE) // RECORD.itemsize   # records in the file
+
+    def append(self, record):
+        """
+        adds one record, writes the chunk if it is full
+        :param record: tuple in the field order of RECORD
+        """
+        self.chunk[self.size] = record
+        self.size += 1
+        if self.size == self.chunk.size:
+            self.flush()
+
+    def flush(self):
+        """writes the records collected so far"""
+        if self.size:
+            with open(self.path, 'ab') as f:
+                f.write(self.chunk[:self.size].tobytes())
+            self.count += self.size
+            self.size = 0
+
+    def close(self):
+        self.flush()
+
+
+def _read_dtype(path):
+    with open(path, 'rb') as f:
+        header = f.read(HEADER_SIZE)
+    if not header.startswith(MAGIC):
+        raise ValueError("%s is not a metrics log" % path)
+    return np.dtype([tuple(field) for field in json.loads(header[len(MAGIC):].decode())])
+
+
+def read_metrics_log(path):
+    """
+    Opens a metrics log without reading it into memory
+    :param path: file written by MetricsLog
+    :return: structured array (memory-mapped) with one RECORD per episode
+    """
+    dtype = _read_dtype(path)
+    count = (os.path.getsize(path) - HEADER_SIZE) // dtype.itemsize
+    if count == 0:
+        return np.zeros(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode='r', offset=HEADER_SIZE, shape=(count,))
+
+
+class StreamingMetrics(object):
+    """
+    Learning-curve metrics updated in O(1) per episode: rolling means over the last window
+    episodes and exponentially weighted means of win, reward, episode length, exploration ratio
+    and the change of the Q table during the episode.
+    """
+
+    def __init__(self, window=1000, ewma_weight=0.01, log=None):
+        """
+        :param window: number of episodes of the rolling means
+        :param ewma_weight: weight of the newest episode in the exponentially weighted means
+        :param log: optional MetricsLog every episode is appended to, episode numbers
+                    continue after the records already in it
+        """
+        self.window = window
+        self.ewma_weight = ewma_weight
+        self.log = log
+        self.episodes = 0
+        self.first_episode = 1 if log is None else log.count + 1
+        self._history = np.zeros((window, len(SERIES)))   # ring buffer of the last window episodes
+        self._sums = np.zeros(len(SERIES))
+        self.rolling = np.zeros(len(SERIES))
+        self.ewma = np.zeros(len(SERIES))
+        self._q = None              # Q values at the end of the previous episode
+        self._explorations = None   # robot's explorations at the end of the previous episode
+
+    def endEpisode(self, robot, reward, steps):
+        """
+        called by runner.train after every episode
+        :param robot: Robot being trained
+        :param reward: final reward of the episode
+        :param steps: number of actions in the episode
+        :return: nothing
+        """
+        values = robot.q.values
+        if self._q is None:
+            self._q = np.zeros_like(values)
+            self._explorations = 0
+        q_change = np.sqrt(np.square(values - self._q).sum())
+        self._q[...] = values
+        explorations = robot.explorations - self._explorations
+        self._explorations = robot.explorations
+
+        current = np.array([reward == 1, reward, steps, explorations / steps if steps else 0, q_change], dtype=float)
+        slot = self.episodes % self.window
+        self._sums += current - self._history[slot]
+        self._history[slot] = current
+        self.episodes += 1
+        self.rolling = self._sums / min(self.episodes, self.window)
+        if self.episodes == 1:
+            self.ewma = current.copy()
+        else:
+            self.ewma += self.ewma_weight * (current - self.ewma)
+
+        if self.log is not None:
+            self.log.append((self.first_episode + self.episodes - 1,) + tuple(current) + tuple(self.rolling) + tuple(self.ewma))
+
+    def summary(self):
+        """
+        :return: dictionary with the rolling and exponentially weighted means of every series
+        """
+        data = {'episodes': self.episodes}
+        for i, name in enumerate(SERIES):
+            data['rolling_' + name] = float(self.rolling[i])
+            data['ewma_' + name] = float(self.ewma[i])
+        return data
+
+    def close(self):
+        if self.log is not None:
+            self.log.close()
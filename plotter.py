@@ -6,7 +6,15 @@
 @author: Te Tan, Yves Steiner, Victoria Barth, Lihua Cao
 """
 
+import argparse
+import contextlib
+import io
+import multiprocessing
+import os
 import helpers
+import checkpoint
+import metrics
+from qtable import QTable
 import matplotlib.pyplot as plt
 import matplotlib.ticker as tic
 from matplotlib import cm
@@ -34,16 +42,8 @@ def removebyaction(d, a):
           :return: d: new dictionary with removed entry
           :return: str: name of action taken
           """
-    # itterates over dictionary and calls function removebykey if action is e.g. stick
-    for key in d:
-        # tmp = {(key[0], ACTION.hit): robot.q.get((key[0], ACTION.hit), 0),
-        #     (key[0], ACTION.stick): robot.q.get((key[0], ACTION.stick), 0)}
-        # minkey = min(tmp.keys(), key=(lambda key: tmp[key]))
-        # if minkey in plotq:
-        #     plotq = removekey(plotq,minkey)
-        if key[1] == a:
-            d = removebykey(d, key)
-    return d, 'removed_'+a.name
+    # one pass over the dictionary, keeping every entry whose action is not e.g. stick
+    return dict((key, value) for key, value in d.items() if key[1] != a), 'removed_'+a.name
 
 def removeminqval(d):
     """
@@ -52,30 +52,15 @@ def removeminqval(d):
           :return: d: new dictionary with removed entries
           :return: str: name of action taken
           """
-    # itterates over dictionary and calls function removebykey if action is e.g. stick
-    for key in d:
-        tmp = {(key[0], helpers.ACTION.hit): d.get((key[0], helpers.ACTION.hit), 0),
-               (key[0], helpers.ACTION.stick): d.get((key[0], helpers.ACTION.stick), 0)}
-        minkey = min(tmp.keys(), key=(lambda key: tmp[key]))
-        if minkey in d:
-            d = removebykey(d, minkey)
-    return d, 'removed_q_min'
-
-def removeminqval(d):
-    """
-          Removes smaller q value of either: hit or stick.
-          :param d: dictionary
-          :return: d: new dictionary with removed entries
-          :return: str: name of action taken
-          """
-    # itterates over dictionary and calls function removebykey if action is e.g. stick
-    for key in d:
-        tmp = {(key[0], helpers.ACTION.hit): d.get((key[0], helpers.ACTION.hit), 0),
-               (key[0], helpers.ACTION.stick): d.get((key[0], helpers.ACTION.stick), 0)}
-        minkey = min(tmp.keys(), key=(lambda key: tmp[key]))
-        if minkey in d:
-            d = removebykey(d, minkey)
-    return d, 'removed_q_min'
+    # one pass over the dictionary, a missing action counts as q value 0 and hit is removed on ties
+    r = {}
+    for key, value in d.items():
+        hit = d.get((key[0], helpers.ACTION.hit), 0)
+        stick = d.get((key[0], helpers.ACTION.stick), 0)
+        minaction = helpers.ACTION.hit if hit <= stick else helpers.ACTION.stick
+        if key[1] != minaction:
+            r[key] = value
+    return r, 'removed_q_min'
 
 def subtractactions(d):
     """
@@ -91,6 +76,48 @@ def subtractactions(d):
             tdir[(key[0], helpers.ACTION.hit)] = new_q
     return tdir, 'subtracted_hit_stick'
 
+def qgrids(q):
+    """
+          Converts Q values into grids indexed by [dealer's initial card, player sum], in one vectorized step.
+          Row and column 0 stay 0 so that the grids line up with the plot axes, missing entries are 0.
+          :param q: QTable, dictionary {(State, ACTION): q value} or array of shape (10, 21, 2)
+          :return: dictionary of arrays of shape (11, 22):
+                   'hit' and 'stick' (the q values of one action, what removebyaction leaves),
+                   'subtracted_hit_stick' (hit minus stick, see subtractactions),
+                   'removed_q_min' (the bigger q value of each state, see removeminqval)
+          """
+    if isinstance(q, QTable):
+        values = q.values
+    elif isinstance(q, np.ndarray):
+        values = q
+    else:
+        table = QTable()
+        for key, value in q.items():
+            table[key] = value
+        values = table.values
+    grids = {}
+    for name, grid in (('hit', values[:, :, 0]), ('stick', values[:, :, 1]),
+                       ('subtracted_hit_stick', values[:, :, 0] - values[:, :, 1]),
+                       ('removed_q_min', values.max(axis=2))):
+        grids[name] = np.zeros((11, 22))
+        grids[name][1:, 1:] = grid
+    return grids
+
+# 3d plot variants: name used in the file name -> grid of qgrids
+VARIANTS = {
+    'removed_stick': 'hit',
+    'removed_hit': 'stick',
+    'removed_q_min': 'removed_q_min',
+    'subtracted_hit_stick': 'subtracted_hit_stick',
+}
+
+def headless():
+    """
+          Switches matplotlib to the Agg backend, figures are only written to files and no display is needed.
+          :return: nothing
+          """
+    plt.switch_backend('Agg')
+
 def getalgoname(a, ms):
     '''
     Returns the algorithms name.
@@ -102,43 +129,33 @@ def getalgoname(a, ms):
         t = 'Q-Learning'
     elif a == 2 and ms == 1:
         t = 'SALASA'
+    elif a == 3:
+        t = 'SALASA-lambda'
+    elif a == 4:
+        t = 'Q-lambda'
     else:
         t = 'Multistep'
     return t
 
-def createplot(robot):
+def createplot(robot, valuehandling='subtracted_hit_stick', outdir='output'):
     """
        Creates a 3d plot of the q-value dictionary compiled by the learning function of the robot.
        The dealer's initial state on the x-axis, the robot/player's sum on the y-axis
        and the q-value of the corresponding situation on the z-axis
        :param robot: robot compiled by the reinforcement learning algorithm
-       :return: nothing - image is stored in the output directory
+       :param valuehandling: which values to plot, one of VARIANTS
+       :param outdir: directory the image is stored in
+       :return: path of the stored image
        """
-    #plotq = robot.q
-
-    #plotq, valuehandling = removebyaction(robot.q, helpers.ACTION.stick)
-    #plotq, valuehandling = removeminqval(robot.q)
-    plotq, valuehandling = subtractactions(robot.q)
-
     # initializing arrays for the axis
     X = np.arange(0, 11, 1)
     Y = np.arange(0, 22, 1)
-    Z = np.zeros((11, 22))
-
-    # extracting the q-values from the dictionary and store it
-    # in the two dimensional array for the z-axis
-    zmax = -10
-    for key in plotq:
-        i = key[0].dealer_card.value
-        j = key[0].robot_sum
-        qval = plotq[key]
-        Z[i][j] = qval
-        zmax = max(zmax, qval)
-
-    # defining the mesh
+    # the q-values for the z-axis, indexed by [dealer, player sum]
+    Z = qgrids(robot.q)[VARIANTS[valuehandling]]
+
+    # defining the mesh, meshgrid puts the player sum on the first axis
     X, Y = np.meshgrid(X, Y)
-    zs = np.array(Z)
-    Z = zs.reshape(X.shape)
+    Z = Z.T
 
     # retreiving the name of the algorithm
     title = getalgoname(robot.algo, robot.multi_step)
@@ -162,40 +179,28 @@ def createplot(robot):
 
     #plt.show()
     # stores the figure as png in the output directory
-    plt.savefig('output/'+title+'_'+ valuehandling+'.png')
+    path = os.path.join(outdir, title+'_'+ valuehandling+'.png')
+    plt.savefig(path)
+    plt.close(fig)
     print('Figure for '+title+' has been stored in the output directory.')
+    return path
 
-def create2dplot(robot, dealerval):
+def create2dplot(robot, dealerval, outdir='output'):
     """
        Creates a 2d plot of the q-value dictionary compiled by the learning function of the robot.
        One dealer initial state is picked, all the robot/player's sums and q-values corresponding
        to that initial state are printed
        :param robot: robot compiled by the reinforcement learning algorithm
        :param dealerval: the value of the dealer to be used for printing
-       :return: nothing - image is stored in the output directory
+       :param outdir: directory the image is stored in
+       :return: path of the stored image
        """
+    grids = qgrids(robot.q)
 
-    plotq = robot.q
-
-    # defining the y-axis
+    # defining the x-axis and the q-values of hit and stick for the y-axis
     X = np.arange(0, 22, 1)
-    Yh = np.zeros(22)
-    Ys = np.zeros(22)
-
-    zmax = -10
-    # extracting the q-values and store it in a y-axis array for hit or stick
-    for key in plotq:
-        if key[0].dealer_card.value == dealerval:
-            j = key[0].robot_sum
-            qval = plotq[key]
-            if key[1] == helpers.ACTION.hit:
-                Yh[j] = qval
-            else:
-                Ys[j] = qval
-            zmax = max(zmax, qval)
-
-    Yh = np.array(Yh)
-    Ys = np.array(Ys)
+    Yh = grids['hit'][dealerval]
+    Ys = grids['stick'][dealerval]
 
     # retreiving the name of the algorithm
     title = getalgoname(robot.algo, robot.multi_step)
@@ -222,5 +227,107 @@ def create2dplot(robot, dealerval):
 
     #plt.show()
     # stores the figure as png in the output directory
-    plt.savefig('output/' + title + '_' + valuehandling + '.png')
-    print('Figure for ' + title + ' has been stored in the output directory.')
\ No newline at end of file
+    path = os.path.join(outdir, title + '_' + valuehandling + '.png')
+    plt.savefig(path)
+    plt.close(fig)
+    print('Figure for ' + title + ' has been stored in the output directory.')
+    return path
+
+
+def _renderfigure(task):
+    """
+       Renders one figure of a checkpoint, this is what every worker of render_all runs.
+       :param task: (checkpoint path, output directory, 3d variant name or dealer value of a 2d plot)
+       :return: path of the stored image
+       """
+    path, outdir, figure = task
+    robot = checkpoint.load_checkpoint(path, restore_rng=False)
+    with contextlib.redirect_stdout(io.StringIO()):
+        if figure in VARIANTS:
+            return createplot(robot, figure, outdir)
+        return create2dplot(robot, figure, outdir)
+
+
+def render_all(checkpoints, outdir='output', processes=None):
+    """
+       Renders every 3d variant and the 2d plot of every dealer card for many checkpoints,
+       headless and in parallel worker processes.
+       The figures of a checkpoint go to a sub directory named after the checkpoint file.
+       :param checkpoints: list of checkpoint files (.npz) written by checkpoint.save_checkpoint
+       :param outdir: directory the sub directories are created in
+       :param processes: number of worker processes, all cores if None
+       :return: list of the paths of the stored images
+       """
+    tasks = []
+    for path in checkpoints:
+        directory = os.path.join(outdir, os.path.splitext(os.path.basename(path))[0])
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        tasks.extend((path, directory, figure) for figure in list(VARIANTS) + list(range(1, 11)))
+    pool = multiprocessing.Pool(processes, initializer=headless)
+    try:
+        return pool.map(_renderfigure, tasks)
+    finally:
+        pool.close()
+        pool.join()
+
+
+def plotcheckpoint(path, dealerval=10, plot3d=False):
+    """
+       Creates the plots of a robot stored in a checkpoint, without training it.
+       :param path: checkpoint file (.npz) written by checkpoint.save_checkpoint
+       :param dealerval: the value of the dealer to be used for the 2d plot
+       :param plot3d: also create the 3d plot
+       :return: nothing - images are stored in the output directory
+       """
+    robot = checkpoint.load_checkpoint(path, restore_rng=False)
+    if plot3d:
+        createplot(robot)
+    create2dplot(robot, dealerval)
+
+
+def createlearningcurve(path, title='Learning curve'):
+    """
+       Plots the rolling and exponentially weighted win rate and mean reward of a metrics log.
+       :param path: log file written by metrics.MetricsLog
+       :param title: title of the figure, also used as file name
+       :return: nothing - image is stored in the output directory
+       """
+    log = metrics.read_metrics_log(path)
+    # plot at most about 10000 points, the log may hold millions of episodes
+    step = max(1, log.size // 10000)
+    records = log[::step]
+
+    fig = plt.figure()
+    fig.suptitle(title, fontsize=14, fontweight='bold')
+    ax = fig.add_subplot(211)
+    ax.plot(records['episode'], records['rolling_win'], label='rolling', color='lightblue')
+    ax.plot(records['episode'], records['ewma_win'], label='exponentially weighted', color='red')
+    ax.set_ylabel('Winning rate')
+    ax.legend()
+    ax = fig.add_subplot(212)
+    ax.plot(records['episode'], records['rolling_reward'], label='rolling', color='lightblue')
+    ax.plot(records['episode'], records['ewma_reward'], label='exponentially weighted', color='red')
+    ax.set_xlabel('Episode')
+    ax.set_ylabel('Mean reward')
+
+    plt.savefig('output/' + title.replace(' ', '_') + '.png')
+    plt.close(fig)
+    print('Figure for ' + title + ' has been stored in the output directory.')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="plot the Q values of robots stored in checkpoints")
+    parser.add_argument('checkpoints', nargs='+', metavar='checkpoint')
+    parser.add_argument('--dealer', type=int, default=10, help="dealer's initial card of the 2d plot")
+    parser.add_argument('--3d', dest='plot3d', action='store_true', help="also create the 3d plot")
+    parser.add_argument('--all', dest='render_all', action='store_true',
+                        help="render every figure of every checkpoint headless in parallel, see render_all")
+    parser.add_argument('--processes', type=int, help="worker processes of --all, all cores by default")
+    args = parser.parse_args()
+    if args.render_all:
+        paths = render_all(args.checkpoints, processes=args.processes)
+        print('%d figures have been stored in the output directory.' % len(paths))
+    else:
+        for path in args.checkpoints:
+            plotcheckpoint(path, args.dealer, args.plot3d)
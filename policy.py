@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# copyright (C) Team Kingslayer, University of Zurich, 2017.
+"""
+@author: Te Tan, Yves Steiner, Victoria Barth, Lihua Cao
+"""
+
+import argparse
+import json
+import queue
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+from qtable import QTable, DEALER_CARDS, PLAYER_SUMS, ACTIONS
+import checkpoint
+
+# version of the file format written by CompiledPolicy.save
+FORMAT_VERSION = 1
+
+
+class CompiledPolicy(object):
+    """
+    Frozen greedy policy of a trained robot: a 10x21 action bitmap and the Q values it was
+    taken from, both read-only. Looking up actions has no side effects, unlike Robot.doAction
+    it never explores, touches no random number generator and changes no counters.
+    Ties, e.g. of states the robot has never seen, go to hit like in QTable.greedyPolicy.
+    """
+
+    def __init__(self, values, actions=None):
+        """
+        :param values: float array of shape (10, 21, 2), the Q values
+        :param actions: optional array of shape (10, 21), 0 is hit and 1 is stick,
+                        the greedy actions of the Q values if None
+        """
+        values = np.array(values, dtype=np.float64)
+        if values.shape != (DEALER_CARDS, PLAYER_SUMS, len(ACTIONS)):
+            raise ValueError("Q values must have shape (%d, %d, %d), got %s"
+                             % (DEALER_CARDS, PLAYER_SUMS, len(ACTIONS), values.shape))
+        actions = np.argmax(values, axis=2) if actions is None else np.asarray(actions)
+        if actions.shape != (DEALER_CARDS, PLAYER_SUMS):
+            raise ValueError("actions must have shape (%d, %d), got %s" % (DEALER_CARDS, PLAYER_SUMS, actions.shape))
+        self.values = values
+        self.actions = actions.astype(np.uint8)
+        # one row per State.index, what act_batch looks up
+        self._flat_actions = self.actions.reshape(-1)
+        self._flat_values = self.values.reshape(-1, len(ACTIONS))
+        for array in (self.values, self.actions):
+            array.setflags(write=False)
+
+    @classmethod
+    def fromRobot(cls, robot):
+        """
+        :param robot: Robot, or a QTable
+        :return: CompiledPolicy of the robot's greedy policy
+        """
+        q = getattr(robot, 'q', robot)
+        if not isinstance(q, QTable):
+            raise ValueError("only robots with a Q table can be compiled")
+        return cls(q.values, q.greedyPolicy())
+
+    def _indices(self, dealer_cards, player_sums):
+        """
+        State.index of every query
+        :param dealer_cards: int array, dealer's first card, 1 to 10
+        :param player_sums: int array, player's sum, 1 to 21
+        :return: int array
+        """
+        dealer_cards = np.asarray(dealer_cards, dtype=np.intp)
+        player_sums = np.asarray(player_sums, dtype=np.intp)
+        if ((dealer_cards < 1) | (dealer_cards > DEALER_CARDS) | (player_sums < 1) | (player_sums > PLAYER_SUMS)).any():
+            raise ValueError("dealer cards must be 1 to %d and player sums 1 to %d" % (DEALER_CARDS, PLAYER_SUMS))
+        return (dealer_cards - 1) * PLAYER_SUMS + player_sums - 1
+
+    def act_batch(self, dealer_cards, player_sums):
+        """
+        greedy actions of many states at once
+        :param dealer_cards: int array, dealer's first card, 1 to 10
+        :param player_sums: int array of the same shape, player's sum, 1 to 21
+        :return: uint8 array, 0 is hit and 1 is stick
+        """
+        return self._flat_actions[self._indices(dealer_cards, player_sums)]
+
+    def values_batch(self, dealer_cards, player_sums):
+        """
+        Q values of many states at once
+        :param dealer_cards: int array, dealer's first card, 1 to 10
+        :param player_sums: int array of the same shape, player's sum, 1 to 21
+        :return: float array with a last axis of length 2, Q values of hit and stick
+        """
+        return self._flat_values[self._indices(dealer_cards, player_sums)]
+
+    def act(self, state):
+        """
+        :param state: State
+        :return: ACTION, the greedy action of the state
+        """
+        return ACTIONS[self._flat_actions[self._indices(state.dealer_card.value, state.robot_sum)]]
+
+    def save(self, path):
+        """
+        Stores the policy as bitmap and Q values in an .npz file
+        :param path: file name, should end with .npz
+        """
+        np.savez(path, version=FORMAT_VERSION, bitmap=np.packbits(self.actions.reshape(-1)), values=self.values)
+
+    @classmethod
+    def load(cls, path):
+        """
+        :param path: .npz file written by save
+        :return: CompiledPolicy
+        """
+        with np.load(path) as arrays:
+            if arrays['version'].item() != FORMAT_VERSION:
+                raise ValueError("unknown policy format %s in %s" % (arrays['version'].item(), path))
+            bitmap = np.unpackbits(arrays['bitmap'], count=DEALER_CARDS * PLAYER_SUMS)
+            return cls(arrays['values'], bitmap.reshape(DEALER_CARDS, PLAYER_SUMS))
+
+
+class MicroBatcher(object):
+    """
+    Answers queries of many threads with one act_batch call: a worker thread collects the
+    queries which arrive within max_delay seconds of the first one, up to max_batch states.
+    """
+
+    def __init__(self, policy, max_batch=65536, max_delay=0.001):
+        """
+        :param policy: CompiledPolicy
+        :param max_batch: number of states after which a batch is answered right away
+        :param max_delay: seconds a batch waits for more queries
+        """
+        self.policy = policy
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.queue = queue.Queue()
+        self.batches = 0    # number of act_batch calls
+        self.queries = 0    # number of queries answered
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.queue.put(None)
+        self._thread.join()
+
+    def act(self, dealer_cards, player_sums):
+        """
+        greedy actions of some states, blocks until the batch they are part of is answered
+        :param dealer_cards: int array, dealer's first card, 1 to 10
+        :param player_sums: int array, player's sum, 1 to 21
+        :return: uint8 array, 0 is hit and 1 is stick
+        """
+        # dealer cards, player sums, answered, actions, error of the batch
+        query = [np.asarray(dealer_cards, dtype=np.intp).reshape(-1), np.asarray(player_sums, dtype=np.intp).reshape(-1),
+                 threading.Event(), None, None]
+        if query[0].shape != query[1].shape:
+            raise ValueError("dealer cards and player sums must have the same length")
+        self.policy._indices(query[0], query[1])   # invalid states fail here instead of failing the whole batch
+        self.queue.put(query)
+        query[2].wait()
+        if query[4] is not None:
+            raise query[4]
+        return query[3]
+
+    def _run(self):
+        while True:
+            query = self.queue.get()
+            if query is None:
+                return
+            batch = [query]
+            size = query[0].size
+            deadline = time.perf_counter() + self.max_delay
+            while size < self.max_batch:
+                try:
+                    query = self.queue.get(timeout=max(0, deadline - time.perf_counter()))
+                except queue.Empty:
+                    break
+                if query is None:
+                    self.queue.put(None)
+                    break
+                batch.append(query)
+                size += query[0].size
+
+            try:
+                actions = self.policy.act_batch(np.concatenate([query[0] for query in batch]),
+                                                np.concatenate([query[1] for query in batch]))
+                start = 0
+                for query in batch:
+                    query[3] = actions[start:start + query[0].size]
+                    start += query[0].size
+            except Exception as error:
+                # every query of the batch fails, the thread keeps answering later ones
+                for query in batch:
+                    query[4] = error
+            self.batches += 1
+            self.queries += len(batch)
+            for query in batch:
+                query[2].set()
+
+
+class PolicyRequestHandler(BaseHTTPRequestHandler):
+    """
+    POST /act with {"dealer_cards": [...], "player_sums": [...]} answers {"actions": [...]},
+    0 is hit and 1 is stick. GET /stats answers the batcher's counters.
+    """
+
+    def _reply(self, status, data):
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        if self.path != '/act':
+            return self._reply(404, {'error': 'unknown path %s' % self.path})
+        try:
+            query = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+            actions = self.server.batcher.act(query['dealer_cards'], query['player_sums'])
+        except (ValueError, KeyError, TypeError) as error:
+            return self._reply(400, {'error': str(error)})
+        except Exception as error:
+            return self._reply(500, {'error': str(error)})
+        self._reply(200, {'actions': actions.tolist()})
+
+    def do_GET(self):
+        if self.path != '/stats':
+            return self._reply(404, {'error': 'unknown path %s' % self.path})
+        batcher = self.server.batcher
+        self._reply(200, {'batches': batcher.batches, 'queries': batcher.queries})
+
+    def log_message(self, format, *args):
+        pass    # one line per request would cost more than answering it
+
+
+class PolicyServer(ThreadingHTTPServer):
+    """HTTP server with one thread per connection, see serve"""
+    daemon_threads = True
+    request_queue_size = 128    # connections waiting to be accepted, many clients connect at once
+
+
+def serve(policy, host='127.0.0.1', port=8021, max_batch=65536, max_delay=0.001):
+    """
+    Creates an HTTP server which answers queries of a policy, one thread per connection
+    and one micro-batcher for all of them
+    :param policy: CompiledPolicy
+    :param host: address to listen on
+    :param port: port to listen on, 0 picks a free one
+    :param max_batch: see MicroBatcher
+    :param max_delay: see MicroBatcher
+    :return: PolicyServer, call serve_forever to start answering
+    """
+    server = PolicyServer((host, port), PolicyRequestHandler)
+    server.batcher = MicroBatcher(policy, max_batch, max_delay).start()
+    return server
+
+
+def benchmark(policy, queries=1000000, seed=2016):
+    """
+    Measures how many random states act_batch answers per second
+    :param policy: CompiledPolicy
+    :param queries: number of states in one call
+    :param seed: seed of the states
+    :return: dictionary with the queries and the seconds they took
+    """
+    rng = np.random.default_rng(seed)
+    dealer_cards = rng.integers(1, DEALER_CARDS + 1, queries)
+    player_sums = rng.integers(1, PLAYER_SUMS + 1, queries)
+    start = time.perf_counter()
+    policy.act_batch(dealer_cards, player_sums)
+    seconds = time.perf_counter() - start
+    return {'queries': queries, 'seconds': seconds, 'queries_per_second': queries / seconds}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="freeze a trained robot into a compiled greedy policy and serve it")
+    parser.add_argument('policy', help="compiled policy (.npz)")
+    parser.add_argument('--compile', metavar='CHECKPOINT',
+                        help="compile the robot of this checkpoint (.npz) or Q table (.npy) into the policy file first")
+    parser.add_argument('--benchmark', type=int, nargs='?', const=1000000, metavar='QUERIES',
+                        help="measure the queries per second of act_batch")
+    parser.add_argument('--serve', type=int, nargs='?', const=8021, metavar='PORT',
+                        help="answer POST /act requests over HTTP")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--max-delay', type=float, default=0.001, help="seconds a batch waits for more requests")
+    args = parser.parse_args()
+
+    if args.compile:
+        CompiledPolicy.fromRobot(checkpoint.load_checkpoint(args.compile, restore_rng=False)).save(args.policy)
+        print("Policy of %s stored in %s" % (args.compile, args.policy))
+    policy = CompiledPolicy.load(args.policy)
+    if args.benchmark:
+        print(json.dumps(benchmark(policy, args.benchmark), indent=2))
+    if args.serve is not None:
+        server = serve(policy, args.host, args.serve, max_delay=args.max_delay)
+        print("Serving %s on http://%s:%d/act" % (args.policy, args.host, server.server_address[1]))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            server.batcher.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# copyright (C) Team Kingslayer, University of Zurich, 2017.
+"""
+@author: Te Tan, Yves Steiner, Victoria Barth, Lihua Cao
+"""
+
+import argparse
+import json
+import time
+import numpy as np
+from environment import CardStreams, StreamsEnvironment
+from qtable import QTable, DEALER_CARDS, PLAYER_SUMS, ACTIONS
+from sweep import expand_grid, make_robot, run_config
+import solver
+
+SHAPE = (DEALER_CARDS, PLAYER_SUMS, len(ACTIONS))
+
+# robot attributes which every agent of a population has its own value of
+AGENT_PARAMETERS = ('alpha', 'gamma', 'epsilon', 'exploration_threshold', 'epsilon_decrement',
+                    'bust_penalty_below', 'bust_penalty_above', 'dealer_bust_reward')
+
+
+def agent_seeds(seed, i):
+    """
+    seeds of the random streams of an agent of a population, they only depend on the seed and i
+    :param seed: int seed of the population
+    :param i: number of the agent
+    :return: numpy SeedSequence of the agent's cards, numpy SeedSequence of its exploration
+    """
+    cards, exploration = np.random.SeedSequence(seed, spawn_key=(i,)).spawn(2)
+    return cards, exploration
+
+
+class Population(object):
+    """
+    P robots trained at the same time: their Q tables are one (P, 10, 21, 2) array, each plays
+    its own game of a batch environment and all of them take their actions and update their
+    Q values in lockstep, with one vectorized operation per phase of runner.train.
+    Every agent follows the same rules as a Robot with its config: Q-learning (algo 1) or
+    multi-step TD (algo 2) with its own multi_step, epsilon decline and rewards.
+    Every agent has random streams of its own, one for its cards and one for its exploration,
+    so it plays and learns exactly like runner.train would with those streams, whatever the
+    other agents do.
+    """
+
+    def __init__(self, configs, seed=None, dealer_from_table=False, block_size=1024):
+        """
+        :param configs: list of sweep configs, see sweep.make_robot, only algo 1 and 2 of tabular robots
+        :param seed: seed of the population, agent i draws from the streams of agent_seeds(seed, i)
+        :param dealer_from_table: sample the outcome of stick from the dealer outcome table,
+                                  saves most of the environment's work per step
+        :param block_size: number of random numbers of every stream generated at once
+        """
+        robots = [make_robot(config) for config in configs]
+        for config, robot in zip(configs, robots):
+            if config.get('linear') or robot.algo not in (1, 2):
+                raise ValueError("a population only holds tabular Q-learning and TD robots: %s" % config)
+        self.configs = configs
+        self.size = len(robots)
+        self.algo = np.array([robot.algo for robot in robots])
+        self.multi_step = np.array([robot.multi_step for robot in robots])
+        for name in AGENT_PARAMETERS:
+            setattr(self, name, np.array([getattr(robot, name) for robot in robots], dtype=float))
+        self.explorations = np.zeros(self.size, dtype=np.int64)
+
+        self.values = np.zeros((self.size,) + SHAPE)
+        self.visited = np.zeros((self.size,) + SHAPE, dtype=bool)
+        self.seed = np.random.SeedSequence(seed).entropy     # the same for every agent, also if seed is None
+        seeds = [agent_seeds(self.seed, i) for i in range(self.size)]
+        self.exploration = CardStreams([exploration for cards, exploration in seeds], block_size)
+        self.env = StreamsEnvironment([cards for cards, exploration in seeds], self.bust_penalty_below,
+                                      self.bust_penalty_above, self.dealer_bust_reward, dealer_from_table,
+                                      block_size)
+
+    def robot(self, i):
+        """
+        :param i: number of the agent
+        :return: Robot with the agent's config and a copy of its Q values
+        """
+        robot = make_robot(self.configs[i])
+        robot.q = QTable(self.values[i].copy(), self.visited[i].copy())
+        robot.epsilon = float(self.epsilon[i])
+        robot.explorations = int(self.explorations[i])
+        return robot
+
+    def _rows(self, agents, dealer_cards, robot_sums):
+        """
+        (P*210, 2) row of every agent's state, -1 for states outside of the state space
+        """
+        inside = (robot_sums >= 1) & (robot_sums <= PLAYER_SUMS)
+        return np.where(inside, (agents * DEALER_CARDS + dealer_cards - 1) * PLAYER_SUMS + robot_sums - 1, -1)
+
+    def _doActions(self, agents, rows):
+        """
+        epsilon-greedy actions like Robot.doAction, ties are broken randomly: every agent draws
+        a number of its exploration stream, and a second one if it picks its action at random,
+        which is stick if the number is at least 0.5
+        :param agents: int array of the agents which act
+        :param rows: int array, their state rows
+        :return: int array of action indices
+        """
+        values = self.values.reshape(-1, len(ACTIONS))[np.maximum(rows, 0)]
+        values[rows < 0] = 0
+        explore = self.exploration.uniform(agents) < self.epsilon[agents]
+        declining = (self.explorations[agents] > self.exploration_threshold[agents]) & (self.epsilon[agents] > 0)
+        self.epsilon[agents[declining]] -= self.epsilon_decrement[agents[declining]]
+        self.explorations[agents[explore]] += 1
+        actions = np.where(values[:, 0] > values[:, 1], 0, 1)
+        random = explore | (values[:, 0] == values[:, 1])
+        actions[random] = self.exploration.uniform(agents[random]) >= 0.5
+        return actions
+
+    def train(self, n, epsilon_schedules=None):
+        """
+        Lets every agent play n trials, see runner.train
+        :param n: number of trials per agent
+        :param epsilon_schedules: optional list with an EpsilonSchedule or None for every agent
+        :return: dictionary of arrays with one entry per agent: episodes, steps, wins, rewards (P, n)
+        """
+        P = self.size
+        agents = np.arange(P)
+        length = int(self.multi_step.max()) + 1     # ring buffer of the last steps of every agent
+        rows = np.zeros((P, length), dtype=np.int64)    # state rows, see _rows
+        actions = np.zeros((P, length), dtype=np.int64)
+        rewards = np.zeros((P, length))
+        gamma_powers = self.gamma[:, None] ** np.arange(length)
+        q_flat = self.values.reshape(-1)
+        visited_flat = self.visited.reshape(-1)
+        visited_rows = self.visited.reshape(-1, len(ACTIONS))
+        value_rows = self.values.reshape(-1, len(ACTIONS))
+
+        t = np.zeros(P, dtype=np.int64)
+        T = np.full(P, np.iinfo(np.int64).max)      # steps of the running episode, unknown while it runs
+        episodes = np.zeros(P, dtype=np.int64)
+        steps = np.zeros(P, dtype=np.int64)
+        wins = np.zeros(P, dtype=np.int64)
+        final_rewards = np.zeros((P, n))
+
+        def startEpisodes(started):
+            if epsilon_schedules is not None:
+                for i in started:
+                    if epsilon_schedules[i] is not None:
+                        self.epsilon[i] = epsilon_schedules[i].value(epsilon_schedules[i].episode)
+                        epsilon_schedules[i].episode += 1
+            mask = np.zeros(P, dtype=bool)
+            mask[started] = True
+            dealer_cards, robot_sums = self.env.reset(mask)
+            t[started] = 0
+            T[started] = np.iinfo(np.int64).max
+            rows[started, 0] = self._rows(started, dealer_cards[started], robot_sums[started])
+            actions[started, 0] = self._doActions(started, rows[started, 0])
+
+        def updateTD(td, target_step):
+            # sum of the discounted rewards up to multi_step steps later, plus the discounted
+            # Q value of the action taken then if the episode had not ended by then
+            multi_step = self.multi_step[td]
+            later = target_step[:, None] + offsets
+            counted = (offsets < multi_step[:, None]) & (later < T[td, None])
+            q_value = (np.where(counted, rewards[td[:, None], later % length], 0) * gamma_powers[td]).sum(axis=1)
+            bootstrap = target_step + multi_step < T[td]
+            later_slot = (target_step + multi_step) % length
+            later_q = q_flat[np.where(bootstrap, rows[td, later_slot] * len(ACTIONS) + actions[td, later_slot], 0)]
+            q_value += np.where(bootstrap, gamma_powers[td, multi_step] * later_q, 0)
+            target_slot = target_step % length
+            index = rows[td, target_slot] * len(ACTIONS) + actions[td, target_slot]
+            current_q = q_flat[index]
+            q_flat[index] = current_q + self.alpha[td] * (q_value - current_q)
+            visited_flat[index] = True
+
+        # like EpsilonSchedule.begin, agents with a schedule do not lower epsilon per action meanwhile
+        decrements = self.epsilon_decrement.copy()
+        if epsilon_schedules is not None:
+            self.epsilon_decrement[[schedule is not None for schedule in epsilon_schedules]] = 0
+        try:
+            self.env.terminated[:] = True
+            active = agents if n > 0 else agents[:0]
+            if active.size:
+                startEpisodes(active)
+            step_actions = np.zeros(P, dtype=np.int64)
+            offsets = np.arange(length)
+            while active.size:
+                # every agent takes its action
+                slot = t[active] % length
+                step_actions[active] = actions[active, slot]
+                dealer_cards, robot_sums, step_rewards, terminate, dealer_sums = self.env.doStep(step_actions)
+                rewards[active, slot] = step_rewards[active]
+                next_rows = self._rows(active, dealer_cards[active], robot_sums[active])
+                ended = terminate[active]
+                going = active[~ended]
+                next_slot = (t[going] + 1) % length
+                rows[going, next_slot] = next_rows[~ended]
+                actions[going, next_slot] = self._doActions(going, next_rows[~ended])
+                finished = active[ended]
+                T[finished] = t[finished] + 1
+
+                # Q-learning updates the step just taken, from the biggest visited Q value of the new state
+                learning = self.algo[active] == 1
+                if learning.any():
+                    q_agents = active[learning]
+                    q_slot = slot[learning]
+                    targets = np.maximum(next_rows[learning], 0)
+                    seen = visited_rows[targets] & (next_rows[learning] >= 0)[:, None]
+                    next_q = np.where(seen, value_rows[targets], -np.inf).max(axis=1)
+                    next_q = np.where(seen.any(axis=1), next_q, 0)
+                    index = rows[q_agents, q_slot] * len(ACTIONS) + actions[q_agents, q_slot]
+                    current_q = q_flat[index]
+                    q_flat[index] = current_q + self.alpha[q_agents] * (
+                        rewards[q_agents, q_slot] + self.gamma[q_agents] * next_q - current_q)
+                    visited_flat[index] = True
+
+                # TD updates the step multi_step - 1 steps back, at the end of an episode the updates
+                # of the steps after it follow right away, all in one batch
+                td = active[~learning]
+                if td.size:
+                    target_step = t[td] - self.multi_step[td] + 1
+                    ready = target_step >= 0
+                    done = td[ended[~learning]]
+                    extras = np.arange(1, length - 1)
+                    later_steps = t[done, None] - self.multi_step[done, None] + 1 + extras
+                    later = (extras < self.multi_step[done, None]) & (later_steps >= 0)
+                    td = np.concatenate((td[ready], np.broadcast_to(done[:, None], later.shape)[later]))
+                    target_step = np.concatenate((target_step[ready], later_steps[later]))
+                    index = rows[td, target_step % length] * len(ACTIONS) + actions[td, target_step % length]
+                    # a state action pair updated twice gets its updates one after the other,
+                    # in waves of the first, second, ... update of every pair
+                    order = np.argsort(index, kind='stable')
+                    positions = np.arange(index.size)
+                    first = np.ones(index.size, dtype=bool)
+                    first[1:] = index[order][1:] != index[order][:-1]
+                    waves = np.empty(index.size, dtype=np.int64)
+                    waves[order] = positions - np.maximum.accumulate(np.where(first, positions, 0))
+                    for wave in range(waves.max() + 1 if index.size else 0):
+                        selected = waves == wave
+                        updateTD(td[selected], target_step[selected])
+
+                t[active] += 1
+                if finished.size:
+                    final_rewards[finished, episodes[finished]] = step_rewards[finished]
+                    wins[finished] += step_rewards[finished] == 1
+                    steps[finished] += T[finished]
+                    episodes[finished] += 1
+                    restart = finished[episodes[finished] < n]
+                    if restart.size:
+                        startEpisodes(restart)
+                    active = active[episodes[active] < n]
+        finally:
+            self.epsilon_decrement[...] = decrements
+        return {'episodes': episodes, 'steps': steps, 'wins': wins, 'rewards': final_rewards}
+
+
+def population_sweep(configs, trials=3000, seed=2016, output=None, dealer_from_table=False):
+    """
+    Trains one robot for every config as one population, the results have the layout of sweep.sweep
+    :param configs: list of configs, see sweep.expand_grid, only algo 1 and 2 of tabular robots
+    :param trials: number of trials of every robot, the same for all
+    :param seed: seed of the population
+    :param output: path of the .npz file the results are written to, nothing is written if None
+    :param dealer_from_table: sample the outcome of stick from the dealer outcome table
+    :return: dictionary of arrays with one entry per config
+    """
+    if any('trials' in config for config in configs):
+        raise ValueError("all robots of a population play the same number of trials")
+    start = time.time()
+    population = Population(configs, seed, dealer_from_table)
+    trained = population.train(trials)
+    seconds = time.time() - start
+
+    solutions = {}
+    mse = np.zeros(population.size)
+    agreement = np.zeros(population.size)
+    for i in range(population.size):
+        # robots with the same rewards share the optimal Q values
+        key = (population.bust_penalty_below[i], population.bust_penalty_above[i],
+               population.dealer_bust_reward[i], population.gamma[i])
+        if key not in solutions:
+            solutions[key] = solver.solve(*key)
+        distance = solver.distance_to_optimal(population.values[i], solutions[key])
+        mse[i], agreement[i] = distance['mse'], distance['policy_agreement']
+
+    results = {
+        'configs': np.array([json.dumps(config, sort_keys=True) for config in configs]),
+        'seeds': np.full(population.size, seed),
+        'q': population.values,
+        'visited': population.visited,
+        'rewards': trained['rewards'].astype(np.float32),
+        'winning_rate': trained['wins'] / np.maximum(trained['episodes'], 1),
+        'steps': trained['steps'],
+        'mse': mse,
+        'policy_agreement': agreement,
+        # the population is trained as a whole, every robot gets an equal share of the time
+        'seconds': np.full(population.size, seconds / max(population.size, 1)),
+    }
+    if output is not None:
+        np.savez(output, **results)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="train a robot for every config at the same time, as one population")
+    parser.add_argument('--grid', default='{"algo": [2], "multi_step": [1, 2, 3, 5, 8], '
+                                          '"alpha": [0.05, 0.1, 0.3, 0.6, 0.9], "dealer_bust_reward": [1, 5, 10, 20]}',
+                        help="JSON dictionary {parameter: list of values}, or a list of them, see sweep.py")
+    parser.add_argument('--seed', type=int, default=2016)
+    parser.add_argument('--trials', type=int, default=3000)
+    parser.add_argument('--dealer-from-table', action='store_true',
+                        help="sample the outcome of stick from the dealer outcome table")
+    parser.add_argument('--output', default='output/population.npz')
+    parser.add_argument('--compare', type=int, default=0, metavar='CONFIGS',
+                        help="also train this many of the configs one after the other and extrapolate their time")
+    args = parser.parse_args()
+
+    configs = expand_grid(json.loads(args.grid))
+    start = time.time()
+    results = population_sweep(configs, args.trials, args.seed, args.output, args.dealer_from_table)
+    elapsed = time.time() - start
+    for config, rate, agreement in zip(results['configs'], results['winning_rate'], results['policy_agreement']):
+        print("%s: winning rate %.3f, policy agreement %.3f" % (config, rate, agreement))
+    print("%d robots in %.1fs, results stored in %s" % (len(configs), elapsed, args.output))
+
+    if args.compare:
+        start = time.time()
+        for config in configs[:args.compare]:
+            run_config(config, args.seed, args.trials)
+        sequential = (time.time() - start) / min(args.compare, len(configs)) * len(configs)
+        print("one after the other: about %.1fs (%.1fx the time of the population)" % (sequential, sequential / elapsed))
+
+
+if __name__ == '__main__':
+    main()
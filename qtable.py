@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# copyright (C) Team Kingslayer, University of Zurich, 2017.
+"""
+@author: Te Tan, Yves Steiner, Victoria Barth, Lihua Cao
+"""
+
+try:
+    from collections.abc import MutableMapping
+except ImportError:  # python < 3.3
+    from collections import MutableMapping
+
+import numpy as np
+from helpers import *
+
+# dimensions of the Easy21 state-action space
+DEALER_CARDS = 10   # dealer's initial card, 1 to 10
+PLAYER_SUMS = 21    # robot's sum, 1 to 21
+ACTIONS = (ACTION.hit, ACTION.stick)
+
+
+def actionindex(action):
+    """
+    position of an action on the last axis of the Q-table
+    :param action: ACTION.hit or ACTION.stick
+    :return: int, 0 for hit and 1 for stick
+    """
+    return action.value - 1
+
+
+class QTable(MutableMapping):
+    """
+    Q values stored in a dense array indexed by (dealer card, robot's sum, action).
+    It behaves like the dictionary {(State, ACTION): q value} the robot used before,
+    so plotting and printing code keeps working, but lookup, argmax and update are O(1).
+    Only entries which have been written are part of the dictionary view,
+    unwritten entries read as 0.
+    """
+
+    def __init__(self, values=None, visited=None):
+        """
+        :param values: optional float array of shape (10, 21, 2) to store the Q values in
+        :param visited: optional bool array of shape (10, 21, 2) marking written entries
+        """
+        shape = (DEALER_CARDS, PLAYER_SUMS, len(ACTIONS))
+        self.values = np.zeros(shape) if values is None else values
+        self.visited = np.zeros(shape, dtype=bool) if visited is None else visited
+        # views with one row per State.index
+        self._value_rows = self.values.reshape(DEALER_CARDS * PLAYER_SUMS, len(ACTIONS))
+        self._visited_rows = self.visited.reshape(DEALER_CARDS * PLAYER_SUMS, len(ACTIONS))
+
+    def __reduce__(self):
+        return QTable, (self.values, self.visited)
+
+    def actionValues(self, state):
+        """
+        Q values of hit and stick in a state, unwritten entries are 0
+        :param state: State
+        :return: (float, float) q value of hit, q value of stick
+        """
+        if state.index < 0:
+            return 0, 0
+        row = self._value_rows[state.index]
+        return row[0], row[1]
+
+    def maxValue(self, state):
+        """
+        biggest written Q value of a state, 0 if none of its actions have been written
+        :param state: State
+        :return: float
+        """
+        if state.index < 0:
+            return 0
+        row = self._value_rows[state.index]
+        seen = self._visited_rows[state.index]
+        if seen[0] and seen[1]:
+            return max(row[0], row[1])
+        elif seen[0]:
+            return row[0]
+        elif seen[1]:
+            return row[1]
+        return 0
+
+    def bestAction(self, state):
+        """
+        greedy action in a state, hit wins ties
+        :param state: State
+        :return: ACTION
+        """
+        hit_q, stick_q = self.actionValues(state)
+        return ACTION.hit if hit_q >= stick_q else ACTION.stick
+
+    def greedyPolicy(self):
+        """
+        greedy action index of every state, hit wins ties
+        :return: int array of shape (10, 21), 0 is hit and 1 is stick
+        """
+        return np.argmax(self.values, axis=2)
+
+    def __getitem__(self, key):
+        state, action = key
+        if state.index < 0 or not self._visited_rows[state.index, action.value - 1]:
+            raise KeyError(key)
+        return float(self._value_rows[state.index, action.value - 1])
+
+    def get(self, key, default=None):
+        state, action = key
+        if state.index < 0 or not self._visited_rows[state.index, action.value - 1]:
+            return default
+        return float(self._value_rows[state.index, action.value - 1])
+
+    def __setitem__(self, key, value):
+        state, action = key
+        if state.index < 0:
+            raise KeyError(key)
+        self._value_rows[state.index, action.value - 1] = value
+        self._visited_rows[state.index, action.value - 1] = True
+
+    def __delitem__(self, key):
+        state, action = key
+        if state.index < 0 or not self._visited_rows[state.index, action.value - 1]:
+            raise KeyError(key)
+        self._value_rows[state.index, action.value - 1] = 0
+        self._visited_rows[state.index, action.value - 1] = False
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def __iter__(self):
+        for index, a in zip(*np.nonzero(self._visited_rows)):
+            yield State.fromIndex(int(index)), ACTIONS[a]
+
+    def __len__(self):
+        return int(np.count_nonzero(self.visited))
+
+    def __repr__(self):
+        return repr(dict(self.items()))
+
+    def clear(self):
+        self.values[...] = 0
+        self.visited[...] = False
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# copyright (C) Team Kingslayer, University of Zurich, 2017.
+"""
+@author: Te Tan, Yves Steiner, Victoria Barth, Lihua Cao
+"""
+
+import argparse
+import math
+import numpy as np
+from helpers import *
+from qtable import DEALER_CARDS, PLAYER_SUMS, ACTIONS, actionindex
+from robot import Robot
+import evaluator
+
+
+class ReplayBuffer(object):
+    """
+    Transitions of a fixed number of steps in preallocated columns, the oldest
+    ones are overwritten when the buffer is full.
+    Sampling is uniform or proportional to a priority (e.g. the last TD error) of every transition.
+    """
+
+    def __init__(self, capacity=100000, prioritized=False, priority_exponent=0.6, importance_exponent=0.4,
+                 seed=None):
+        """
+        :param capacity: number of transitions kept
+        :param prioritized: sample proportional to priority ** priority_exponent instead of uniformly
+        :param priority_exponent: 0 samples uniformly, 1 proportional to the priorities
+        :param importance_exponent: how much the importance sampling weights of prioritized
+                                    sampling correct its bias, 0 not at all, 1 fully
+        :param seed: seed of the random number generator used for sampling
+        """
+        self.capacity = capacity
+        self.prioritized = prioritized
+        self.priority_exponent = priority_exponent
+        self.importance_exponent = importance_exponent
+        self.rng = np.random.default_rng(seed)
+        self.states = np.zeros(capacity, dtype=np.int64)        # State.index
+        self.actions = np.zeros(capacity, dtype=np.int64)       # 0 is hit, 1 is stick
+        self.rewards = np.zeros(capacity)
+        self.next_states = np.zeros(capacity, dtype=np.int64)   # State.index, -1 outside of the state space
+        self.done = np.zeros(capacity, dtype=bool)
+        self.priorities = np.zeros(capacity)
+        self.max_priority = 1.0     # priority of new transitions
+        self.size = 0       # number of stored transitions
+        self.position = 0   # where the next transition is stored
+
+    def __len__(self):
+        return self.size
+
+    def add(self, state_index, action_index, reward, next_state_index, done):
+        """
+        stores a transition, new transitions get the biggest priority so far
+        :param state_index: State.index of the state the action was taken in
+        :param action_index: 0 for hit, 1 for stick
+        :param reward: reward of the action
+        :param next_state_index: State.index of the state after the action
+        :param done: whether the episode ended with the action
+        """
+        i = self.position
+        self.states[i] = state_index
+        self.actions[i] = action_index
+        self.rewards[i] = reward
+        self.next_states[i] = next_state_index
+        self.done[i] = done
+        self.priorities[i] = self.max_priority
+        self.position = (i + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def sample(self, batch_size):
+        """
+        draws transitions with replacement
+        :param batch_size: number of transitions
+        :return: indices: int array of the drawn transitions, weights: float array of their
+                 importance sampling weights (all 1 for uniform sampling)
+        """
+        if not self.prioritized:
+            return self.rng.integers(0, self.size, batch_size), np.ones(batch_size)
+        scaled = self.priorities[:self.size] ** self.priority_exponent
+        probabilities = scaled / scaled.sum()
+        indices = np.minimum(np.searchsorted(np.cumsum(probabilities), self.rng.random(batch_size)), self.size - 1)
+        weights = (self.size * probabilities[indices]) ** -self.importance_exponent
+        return indices, weights / weights.max()
+
+    def updatePriorities(self, indices, errors):
+        """
+        :param indices: int array of transitions
+        :param errors: float array, their new TD errors
+        """
+        priorities = np.abs(errors) + 1e-6
+        self.priorities[indices] = priorities
+        self.max_priority = max(self.max_priority, priorities.max())
+
+
+class ReplayRobot(Robot):
+    """
+    Q-learning robot which stores every transition in a replay buffer and learns from
+    mini-batches of stored transitions, so each transition is used many times
+    """
+
+    def __init__(self, algo=1, multi_step=1, capacity=100000, batch_size=8, prioritized=False, seed=None,
+                 environment=None):
+        """
+        :param algo: must be 1, Q-learning
+        :param multi_step: must be 1
+        :param capacity: number of transitions kept in the replay buffer
+        :param batch_size: number of transitions learned from after every step
+        :param prioritized: sample transitions with big TD errors more often
+        :param seed: seed of the replay buffer's random number generator
+        :param environment: Environment the robot plays in, see Robot
+        """
+        if algo != 1 or multi_step != 1:
+            raise ValueError("experience replay is only implemented for Q-learning (algo 1, multi_step 1)")
+        super(ReplayRobot, self).__init__(algo=algo, multi_step=multi_step, environment=environment)
+        self.alpha = 0.01   # every transition is learned from many times
+        self.batch_size = batch_size
+        self.replay = ReplayBuffer(capacity, prioritized, seed=seed)
+
+    def updateQ(self, target_step, T, new_action):
+        """
+        Stores the last transition and updates the q values of a mini-batch of stored ones.
+        Unlike plain Q-learning, the value of the state after the last action of an episode is 0.
+        """
+        state, action, reward = self.previous_states.pop()
+        self.replay.add(state.index, actionindex(action), reward, self.state.index, T != math.inf)
+        if len(self.replay) >= self.batch_size:
+            self.learnBatch()
+
+    def learnBatch(self):
+        """
+        One vectorized Q-learning update of a mini-batch of stored transitions
+        :return: float array, TD errors of the batch
+        """
+        buffer = self.replay
+        indices, weights = buffer.sample(self.batch_size)
+        values = self.q.values.reshape(DEALER_CARDS * PLAYER_SUMS, len(ACTIONS))
+        visited = self.q.visited.reshape(DEALER_CARDS * PLAYER_SUMS, len(ACTIONS))
+
+        # biggest visited q value of every next state, 0 if none is visited, the episode ended
+        # or the state is outside of the state space, like QTable.maxValue
+        next_states = buffer.next_states[indices]
+        inside = (next_states >= 0) & ~buffer.done[indices]
+        rows = np.where(inside, next_states, 0)
+        seen = visited[rows]
+        next_q = np.where(seen, values[rows], -np.inf).max(axis=1)
+        next_q = np.where(inside & seen.any(axis=1), next_q, 0)
+
+        states = buffer.states[indices]
+        actions = buffer.actions[indices]
+        errors = buffer.rewards[indices] + self.gamma * next_q - values[states, actions]
+        # transitions drawn more than once add up their updates
+        np.add.at(values, (states, actions), self.alpha * weights * errors)
+        visited[states, actions] = True
+        if buffer.prioritized:
+            buffer.updatePriorities(indices, errors)
+        return errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="compare Q-learning with and without experience replay")
+    parser.add_argument('--episodes', type=int, nargs='+', default=[500, 1000, 2000, 5000, 10000],
+                        help="training episodes after which the robots are compared")
+    parser.add_argument('--batch-size', type=int, default=8)
+    parser.add_argument('--evaluation-episodes', type=int, default=200000)
+    args = parser.parse_args()
+
+    robots = (('q-learning', lambda: Robot()),
+              ('replay', lambda: ReplayRobot(batch_size=args.batch_size, seed=2016)),
+              ('prioritized replay', lambda: ReplayRobot(batch_size=args.batch_size, prioritized=True, seed=2016)))
+    evaluator.compare_training(robots, args.episodes, args.evaluation_episodes)
+
+
+if __name__ == '__main__':
+    main()
@@ -6,36 +6,57 @@
 @author: Te Tan, Yves Steiner, Victoria Barth, Lihua Cao
 """
 
+import math
 import random
+import numpy as np
 from helpers import *
 from environment import Environment
+from qtable import QTable, DEALER_CARDS, PLAYER_SUMS, ACTIONS, actionindex
+from trajectory import Trajectory
+
+# eligibility traces below this are dropped, they would hardly change the Q values
+TRACE_THRESHOLD = 1e-4
 
 
 class Robot(object):
     """Robot Class"""
 
-    def __init__(self, algo=1, multi_step=1):
-        dealer_card, robot_card = Environment.dealCards()
-        self.state = State(dealer_card, robot_card.value)
+    def __init__(self, algo=1, multi_step=1, environment=None, state=None):
+        # Environment the robot plays in, with its own card stream if any
+        self.environment = Environment() if environment is None else environment
+        if state is None:
+            dealer_card, robot_card = self.environment.dealCards()
+            state = State(dealer_card, robot_card.value)
+        self.state = state  # without a given state, the environment deals the first game
         """
         the algorithm robot uses to update Q value
-        1 represents Q-learning(default), 2 represents Temporal-Different (SARSA or Multi-step)
+        1 represents Q-learning(default), 2 represents Temporal-Different (SARSA or Multi-step),
+        3 represents SARSA(lambda), 4 represents Watkins's Q(lambda), both with multi_step 1
         """
         self.algo = algo
         self.multi_step = multi_step # if the algo is TD, how many steps should be taken into account, 1 is SARSA
-        self.q = {}  # stores Q values
-        self.previous_states = []   # store previous states robot passed
+        self.q = QTable()  # stores Q values
 
         self.alpha = 0.9  # learning rate
         self.gamma = 1  # discount factor
         self.epsilon = 0.9999  # exploration rate
         self.explorations = 0  # counts number of explorations
         self.exploration_threshold = 3000   # exploration rate only decline after robot's exploration reach the threshold
+        self.epsilon_decrement = 0.01   # decline of the exploration rate per action, 0 if an epsilon schedule sets it
+        self.trace_decay = 0.9  # lambda of SARSA(lambda) and Q(lambda)
 
         self.bust_penalty_below = -10  # penalty of bust below 1
         self.bust_penalty_above = -1   # penalty of bust above 21
         self.dealer_bust_reward = 10    # reward of dealer bust
 
+        # store the last previous states robot passed, enough of them for the multi-step update
+        self.previous_states = Trajectory(max(1, self.multi_step), self.gamma)
+
+        # eligibility traces of SARSA(lambda) and Q(lambda), one per state action pair like the Q values,
+        # and the positions of the nonzero ones so that only those are decayed and reset
+        self.traces = np.zeros((DEALER_CARDS, PLAYER_SUMS, len(ACTIONS)))
+        self.touched = []   # positions in the flattened arrays, see stateActionIndex
+
     def __repr__(self):
         return "%s is @ %s. " % (self.__class__.__name__, self.state)
 
@@ -43,44 +64,25 @@ class Robot(object):
         """ Let the robot perform his card play
         :return Action
         """
-        # initialize possible action with q value 0
-        available_qs = {
-            (self.state, ACTION.hit): 0,
-            (self.state, ACTION.stick): 0,
-        }
-        # search if there are q values for state action pair
-        for state_action_pair in self.q:
-            if self.state == state_action_pair[0]:
-                available_qs[state_action_pair] = self.q[state_action_pair]
-
-        biggest_reward = list(available_qs.values())[0]  # value for best possible options
-        for reward in available_qs.values():
-            if reward > biggest_reward:
-                biggest_reward = reward
+        # q values of both actions, 0 if the state action pair has not been seen yet
+        hit_q, stick_q = self.q.actionValues(self.state)
 
         go_on_exploration = random.uniform(0, 1) < self.epsilon  # determines whether the robot should explore or not
         # the exploration rate will only be decrease when the robot was already exploring for some time
         if self.explorations > self.exploration_threshold and not explore:
             if self.epsilon > 0:
-                self.epsilon -= 0.01
+                self.epsilon -= self.epsilon_decrement
 
-        feasible_actions = []  # holds actions which the robot can choose from
         if not go_on_exploration:
-            # robot does not explore
-            for state_action_pair, reward in available_qs.items():
-                if reward == biggest_reward:
-                    feasible_actions.append(state_action_pair[1])
+            # robot does not explore, take the action with the biggest q value if there is only one
+            if hit_q != stick_q:
+                return ACTION.hit if hit_q > stick_q else ACTION.stick
         else:
             # robot is going on randomly play
             self.explorations += 1
-            for state_action_pair, reward in available_qs.items():
-                    feasible_actions.append(state_action_pair[1])
 
-        if len(feasible_actions) == 1:  # if the is only one, take it
-            return feasible_actions[0]
-        else:  # if there are multiple good actions to take the robot chooses randomly which to take
-            choice = random.randint(0, len(feasible_actions) - 1)
-            return feasible_actions[choice]
+        # if there are multiple good actions to take the robot chooses randomly which to take
+        return (ACTION.hit, ACTION.stick)[random.randint(0, 1)]
 
     def update(self, new_state, action, reward):
         """
@@ -89,39 +91,34 @@ class Robot(object):
         :param action: (Position, Movement) what the robot chose to do
         :return: nothing
         """
-        self.previous_states.append((self.state, action, reward))
+        self.previous_states.append(self.state, action, reward)
         self.state = new_state
 
     def updateQ(self, target_step, T, new_action):
         """
         Updates q values
         """
+        # SARSA(lambda) or Q(lambda), one update per step
+        if self.algo in (3, 4):
+            if target_step >= 0:
+                self.updateTraces(T, new_action)
         # Q-learning update
-        if self.algo == 1:
+        elif self.algo == 1:
             state, action, reward = self.previous_states.pop()
             current_q = self.q.get((state, action), 0)
-            value_list = []
-            for state_action_pair, value in self.q.items():
-                if self.state == state_action_pair[0]:
-                    value_list.append(value)
-            next_q = max(value_list) if value_list else 0
+            next_q = self.q.maxValue(self.state)
 
             new_q = current_q + self.alpha * (reward + self.gamma * next_q - current_q)
             self.q[(state, action)] = new_q
         else:
             # SARSA or Multi-step TD
             if target_step >= 0:
-                target_state, target_action, reward = self.previous_states[target_step]
+                # the oldest stored step is the target step, the stored steps after it are
+                # the ones up to target_step + multi_step - 1 or the terminal step
+                target_state, target_action, reward = self.previous_states[0]
                 current_q = self.q.get((target_state, target_action), 0)
-                q_value = 0
-                i = target_step
-                upper = target_step + self.multi_step - 1 if (target_step + self.multi_step <= T) else T-1
-                while i <= upper:
-                    state, action, reward = self.previous_states[i]
-                    # compute sum of discounted reward over steps
-                    discount = i - target_step
-                    q_value += self.gamma ** discount * reward
-                    i += 1
+                # sum of discounted reward over steps
+                q_value = self.previous_states.discounted_return
 
                 # add prospective Q value if not terminate
                 if target_step + self.multi_step < T:
@@ -131,12 +128,78 @@ class Robot(object):
                 new_q = current_q + self.alpha * (q_value - current_q)
 
                 self.q[(target_state, target_action)] = new_q
+                self.previous_states.popleft()
+
+    def updateTraces(self, T, new_action):
+        """
+        Updates q values of SARSA(lambda) (algo 3) or Watkins's Q(lambda) (algo 4):
+        one backward update of every state action pair with a nonzero eligibility trace
+        :param T: number of steps of the episode, infinite while it is running
+        :param new_action: action the robot takes in its current state
+        """
+        state, action, reward = self.previous_states.pop()
+        values = self.q.values.reshape(-1)
+        traces = self.traces.reshape(-1)
+        index = stateActionIndex(state, action)
+        terminal = T != math.inf
+
+        q_value = reward
+        greedy = True
+        if not terminal:
+            if self.algo == 3:
+                q_value += self.gamma * self.q.get((self.state, new_action), 0)
+            else:
+                hit_q, stick_q = self.q.actionValues(self.state)
+                greedy = (hit_q, stick_q)[actionindex(new_action)] >= max(hit_q, stick_q)
+                q_value += self.gamma * self.q.maxValue(self.state)
+        delta = q_value - values[index]
+
+        # accumulating trace of the pair just visited
+        if traces[index] == 0:
+            self.touched.append(index)
+        traces[index] += 1
+        touched = np.array(self.touched)
+        values[touched] += self.alpha * delta * traces[touched]
+        self.q.visited.reshape(-1)[index] = True
+
+        if greedy:
+            traces[touched] *= self.gamma * self.trace_decay
+            # only the recently visited pairs are kept, the cost per step follows the length of the traces
+            faded = traces[touched] < TRACE_THRESHOLD
+            if faded.any():
+                traces[touched[faded]] = 0
+                self.touched = touched[~faded].tolist()
+        else:
+            # Q(lambda) only follows credit along greedy actions
+            self.resetTraces()
+
+    def resetTraces(self):
+        """
+        Sets the eligibility traces to 0, only the ones which are nonzero are touched
+        """
+        if self.touched:
+            self.traces.reshape(-1)[self.touched] = 0
+            del self.touched[:]
 
     def reset(self):
-        """Resets the robot to start without erasing the q values"""
-        dealer_card, robot_card = Environment.dealCards()
+        """
+        Resets the robot to start without erasing the q values,
+        changes of multi_step or gamma take effect from here on
+        """
+        dealer_card, robot_card = self.environment.dealCards()
         self.state = State(dealer_card, robot_card.value)
-        self.previous_states = []
+        self.resetEpisode()
+
+    def resetEpisode(self):
+        """
+        Forgets the steps and traces of the current episode but keeps the state, no cards are dealt,
+        changes of multi_step or gamma take effect from here on
+        """
+        if self.previous_states.capacity != max(1, self.multi_step) or self.previous_states.gamma != self.gamma:
+            self.previous_states = Trajectory(max(1, self.multi_step), self.gamma)
+        else:
+            self.previous_states.clear()
+        self.resetTraces()
 
     def evaluate_robot(self):
         self.reset()
@@ -150,7 +213,7 @@ class Robot(object):
             terminate = False
             while not terminate:
                 action = self.doAction(explore=True)
-                newState, reward, terminate, dealer_final = Environment.doStep(self, action)
+                newState, reward, terminate, dealer_final = self.environment.doStep(self, action)
                 self.update(new_state=newState, action=action, reward=reward)
             if reward >= 1:
                 wins += 1
@@ -166,7 +229,7 @@ class Robot(object):
             terminate = False
             while not terminate:
                 action = self.doAction()
-                newState, reward, terminate, dealer_final = Environment.doStep(self, action)
+                newState, reward, terminate, dealer_final = self.environment.doStep(self, action)
                 self.update(new_state=newState, action=action, reward=reward)
             if reward >= 1:
                 wins += 1
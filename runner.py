@@ -8,61 +8,314 @@
 
 from robot import *
 from environment import Environment
+import argparse
 import random
 import math
-import plotter
 
-def main():
-    # algo: 1 is Q-learning, 2 is TD
-    # multi-step: when algo=2, if multi-step=1, then it's SARSA
-    robot = Robot(algo=2, multi_step=5)
+class TrainingResult(object):
+    """
+    outcome of a training run
+    """
+
+    def __init__(self, keep_rewards=True):
+        """
+        :param keep_rewards: keep the final reward of every trial, their list grows with the run
+        """
+        self.episodes = 0   # number of trials played
+        self.steps = 0      # number of actions taken
+        self.wins = 0       # number of trials with reward 1
+        self.reward_sum = 0                         # sum of the final rewards
+        self.rewards = [] if keep_rewards else None # final reward of every trial, None if not kept
+
+    def addEpisode(self, reward, steps):
+        """
+        counts a finished trial
+        :param reward: final reward of the trial
+        :param steps: number of actions of the trial
+        """
+        self.episodes += 1
+        self.steps += steps
+        self.reward_sum += reward
+        if reward == 1:
+            self.wins += 1
+        if self.rewards is not None:
+            self.rewards.append(reward)
+
+    def winning_rate(self):
+        return self.wins / self.episodes if self.episodes else 0
+
+    def mean_reward(self):
+        return self.reward_sum / self.episodes if self.episodes else 0
+
+
+def train(robot, n, log_last=50, instrumentation=None, metrics=None, epsilon_schedule=None, stopping=None,
+          keep_rewards=None):
+    """
+    Lets the robot play n trials and update its Q values after every step
+    :param robot: Robot to train
+    :param n: number of trials
+    :param log_last: print a line for each of the last log_last trials
+    :param instrumentation: optional Instrumentation which times the phases of the loop
+    :param metrics: optional StreamingMetrics which are updated after every trial
+    :param epsilon_schedule: optional EpsilonSchedule which sets the exploration rate of every trial
+    :param stopping: optional StoppingController which ends training early once the Q values converged
+    :param keep_rewards: keep the final reward of every trial in the result, by default only
+                         without metrics, which summarize the rewards in constant memory
+    :return: TrainingResult
+    """
+    if keep_rewards is None:
+        keep_rewards = metrics is None
+    result = TrainingResult(keep_rewards)
+    environment = robot.environment
+    i = 1
+    instrumented = instrumentation is not None
+    if instrumented:
+        clock = instrumentation.clock
+        record = instrumentation.record
+        instrumentation.begin(robot)
+    if stopping is not None:
+        stopping.begin(robot, n)
+
+    if epsilon_schedule is not None:
+        epsilon_schedule.begin(robot)
+    try:
+        while i <= n:
+            if epsilon_schedule is not None:
+                epsilon_schedule.startEpisode(robot)
+            t = 0
+            T = math.inf    # record how many steps until terminate
+
+            if instrumented:
+                start = clock()
+            action = robot.doAction()
+            if instrumented:
+                record('doAction', clock() - start)
+            while True:
+                if t < T:
+                    if instrumented:
+                        start = clock()
+                    newState, reward, terminate, dealer_final = environment.doStep(robot, action)
+                    if instrumented:
+                        record('doStep', clock() - start)
+                        instrumentation.count('steps')
+                        if action == ACTION.stick:
+                            instrumentation.count('sticks')
+                            instrumentation.count('dealer_draws', environment.last_dealer_draws)
+                        start = clock()
+                    robot.update(new_state=newState, action=action, reward=reward)      # update robot state immediately
+                    if instrumented:
+                        record('update', clock() - start)
+                    if terminate:
+                        T = t + 1
+                    else:
+                        if instrumented:
+                            start = clock()
+                        action = robot.doAction()   # update action for next step
+                        if instrumented:
+                            record('doAction', clock() - start)
+
+                updated_step = t - robot.multi_step + 1     # this is the step whose Q-value will be updated in TD algorithm
+
+                # update Q value of the robot
+                if instrumented:
+                    start = clock()
+                robot.updateQ(target_step=updated_step, T=T, new_action=action)
+                if instrumented:
+                    record('updateQ', clock() - start)
+                    if updated_step >= 0:
+                        instrumentation.count('q_updates')
+
+                if updated_step == T - 1:
+                    break
+                t += 1
+
+            result.addEpisode(reward, T)
+            if metrics is not None:
+                metrics.endEpisode(robot, reward, T)
+
+            # pretty output that helps
+            if n-i < log_last:
+                if instrumented:
+                    start = clock()
+                print("Trial %s: # steps: %d - %s. dealer's final: %d, Reward is: %d" % (i, T, robot, dealer_final, reward))
+                if instrumented:
+                    record('print', clock() - start)
+
+            if instrumented:
+                start = clock()
+            robot.reset()
+            if instrumented:
+                record('reset', clock() - start)
+                instrumentation.endEpisode(robot)
+            if stopping is not None and stopping.endEpisode(robot):
+                break
+            i += 1
+    finally:
+        if epsilon_schedule is not None:
+            epsilon_schedule.finish(robot)
+    if instrumented:
+        instrumentation.finish(robot)
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="train a robot to play Easy21")
+    parser.add_argument('--trials', type=int, default=3000, help="trials we want to run")
+    parser.add_argument('--resume', metavar='CHECKPOINT', help="continue training the robot stored in a checkpoint")
+    parser.add_argument('--save', metavar='CHECKPOINT', help="store the trained robot in a checkpoint (.npz)")
+    parser.add_argument('--profile', nargs='?', const='-', metavar='JSONL',
+                        help="time the phases of the training loop, write the snapshots to a file or stderr")
+    parser.add_argument('--profile-every', type=int, default=1000, metavar='EPISODES',
+                        help="episodes between two profile snapshots")
+    parser.add_argument('--metrics', metavar='LOG', help="append learning-curve metrics of every trial to a log file")
+    parser.add_argument('--algo', type=int, choices=(1, 2, 3, 4),
+                        help="1 Q-learning, 2 TD (SARSA or multi-step), 3 SARSA(lambda), 4 Q(lambda), "
+                             "2 if not given; a resumed robot keeps the algorithm of its checkpoint")
+    parser.add_argument('--multi-step', type=int,
+                        help="steps of the TD update of algo 2, 5 if not given; a resumed robot keeps its own")
+    parser.add_argument('--alpha', type=float,
+                        help="learning rate, the robot's default or the one of its checkpoint if not given")
+    parser.add_argument('--replay', choices=('uniform', 'prioritized'),
+                        help="Q-learning from mini-batches of an experience replay buffer")
+    parser.add_argument('--dyna', nargs='?', const='known', choices=('known', 'learned'),
+                        help="Q-learning with Dyna planning with the known card distribution, the default, or a "
+                             "learned model, which stays behind plain Q-learning")
+    parser.add_argument('--planning-steps', type=int, default=50, help="planning backups per step of --dyna")
+    parser.add_argument('--linear', action='store_true',
+                        help="train a LinearRobot, which approximates the Q values with coarse-coded features")
+    parser.add_argument('--stop', action='store_true',
+                        help="end training early once the Q values and the greedy policy stopped changing")
+    parser.add_argument('--stop-window', type=int, default=1000, metavar='EPISODES',
+                        help="episodes between two convergence checks")
+    parser.add_argument('--stop-max-delta', type=float, default=1.0, metavar='DELTA',
+                        help="tolerance of the biggest change of a Q value within a window")
+    parser.add_argument('--stop-mean-delta', type=float, default=0.05, metavar='DELTA',
+                        help="tolerance of the mean change of the Q values within a window")
+    parser.add_argument('--stop-policy-changes', type=int, default=0, metavar='STATES',
+                        help="tolerance of the number of greedy actions which changed within a window")
+    parser.add_argument('--stop-patience', type=int, default=3, metavar='WINDOWS',
+                        help="windows in a row which must be within the tolerances")
+    parser.add_argument('--epsilon-schedule', nargs=3, type=float, metavar=('START', 'END', 'EPISODES'),
+                        help="set the exploration rate per trial instead of lowering it per action")
+    parser.add_argument('--epsilon-decay', choices=('linear', 'exponential'), default='linear',
+                        help="shape of the epsilon schedule")
+    parser.add_argument('--actors', type=int, default=0,
+                        help="play in this many actor processes and learn in this one, 0 trains in a single process")
+    parser.add_argument('--max-staleness', type=int, default=50, metavar='EPISODES',
+                        help="learned episodes an actor's copy of the Q values may lag behind the learner, "
+                             "episodes played with an older copy are dropped and played again")
+    parser.add_argument('--train-only', action='store_true',
+                        help="only train (and --save), no table dump, evaluation or plots, matplotlib is not imported; "
+                             "plot a saved robot later with plotter.py")
+    parser.add_argument('--card-stream', nargs='?', const=2016, type=int, metavar='SEED',
+                        help="draw the cards from a pre-generated numpy card stream instead of python's random module, "
+                             "a resumed robot continues with the stream of its checkpoint if it has one")
+    args = parser.parse_args(argv)
+    if args.linear and (args.resume or args.save):
+        parser.error("checkpoints only store tabular robots")
+    if args.linear and args.algo in (3, 4):
+        parser.error("SARSA(lambda) and Q(lambda) need a Q table")
+    if args.actors and (args.linear or args.profile or args.metrics or args.stop or args.epsilon_schedule):
+        parser.error("--actors cannot be combined with --linear, --profile, --metrics, --stop or --epsilon-schedule")
+    if args.replay and (args.linear or args.algo != 1):
+        parser.error("--replay needs tabular Q-learning (--algo 1)")
+    if args.dyna and (args.linear or args.replay or args.algo != 1):
+        parser.error("--dyna needs tabular Q-learning (--algo 1) without --replay")
+    if args.replay and (args.resume or args.save):
+        parser.error("checkpoints do not store the replay buffer, --replay cannot be combined with --resume or --save")
+    if args.dyna and (args.resume or args.save):
+        parser.error("checkpoints do not store the Dyna model, --dyna cannot be combined with --resume or --save")
+    algo = 2 if args.algo is None else args.algo
+    multi_step = (5 if args.multi_step is None else args.multi_step) if algo == 2 else 1
+
+    environment = Environment(args.card_stream)
+    # the modules of the optional features are imported where their flag is handled,
+    # a plain training run only loads what it uses
+    if args.resume:
+        import checkpoint
+        # the checkpoint also restores the random number generator and the card stream
+        robot = checkpoint.load_checkpoint(args.resume)
+        if args.algo is not None and args.algo != robot.algo:
+            parser.error("--algo %d conflicts with algo %d of the checkpoint" % (args.algo, robot.algo))
+        if args.multi_step is not None and robot.algo == 2 and args.multi_step != robot.multi_step:
+            parser.error("--multi-step %d conflicts with multi-step %d of the checkpoint"
+                         % (args.multi_step, robot.multi_step))
+        if robot.environment.card_stream is None:
+            robot.environment = environment
+    else:
+        # algo: 1 is Q-learning, 2 is TD, 3 is SARSA(lambda), 4 is Q(lambda)
+        # multi-step: when algo=2, if multi-step=1, then it's SARSA
+        if args.replay:
+            from replay import ReplayRobot
+            robot = ReplayRobot(prioritized=args.replay == 'prioritized', seed=2016, environment=environment)
+        elif args.dyna:
+            from dyna import DynaRobot
+            robot = DynaRobot(planning_steps=args.planning_steps, model=args.dyna, seed=2016, environment=environment)
+        elif args.linear:
+            from linear import LinearRobot
+            robot = LinearRobot(algo=algo, multi_step=multi_step, environment=environment)
+        else:
+            robot = Robot(algo=algo, multi_step=multi_step, environment=environment)
+        random.seed(2016)
+    if args.alpha is not None:
+        robot.alpha = args.alpha
     # dealer's initial card value for plotting
     # pick a value in the range 1 to 10
     dealers_init_val = 10
-    i = 1
-    n = 3000   # trials we want to run
-    wins = 0
-    random.seed(2016)
-
-    while i <= n:
-        t = 0
-        T = math.inf    # record how many steps until terminate
-
-        action = robot.doAction()
-        while True:
-            if t < T:
-                newState, reward, terminate, dealer_final = Environment.doStep(robot, action)
-                robot.update(new_state=newState, action=action, reward=reward)      # update robot state immediately
-                if terminate:
-                    T = t + 1
-                    if reward == 1:
-                        wins += 1
-                else:
-                    action = robot.doAction()   # update action for next step
-
-            updated_step = t - robot.multi_step + 1     # this is the step whose Q-value will be updated in TD algorithm
-
-            # update Q value of the robot
-            robot.updateQ(target_step=updated_step, T=T, new_action=action)
-
-            if updated_step == T - 1:
-                break
-            t += 1
+    n = args.trials
+
+    instrumentation = None
+    if args.profile:
+        from instrumentation import Instrumentation, JsonLinesSink, PrintSink
+        sink = PrintSink() if args.profile == '-' else JsonLinesSink(args.profile)
+        instrumentation = Instrumentation([sink], args.profile_every)
 
-        # pretty output that helps
-        if n-i < 50:
-            print("Trial %s: # steps: %d - %s. dealer's final: %d, Reward is: %d" % (i, T, robot, dealer_final, reward))
+    metrics = None
+    if args.metrics:
+        from metrics import MetricsLog, StreamingMetrics
+        metrics = StreamingMetrics(log=MetricsLog(args.metrics))
 
-        robot.reset()
-        i += 1
+    if args.actors:
+        # imported here, the actor-learner module itself builds on this one
+        from actorlearner import train_actor_learner
+        result, stats = train_actor_learner(robot, n, args.actors, args.max_staleness, keep_rewards=False)
+        print("Actor-learner throughput: " + str(stats))
+    else:
+        epsilon_schedule = None
+        if args.epsilon_schedule:
+            from stopping import EpsilonSchedule
+            start, end, episodes = args.epsilon_schedule
+            epsilon_schedule = EpsilonSchedule(start, end, int(episodes), args.epsilon_decay)
+        stopping = None
+        if args.stop:
+            from stopping import StoppingController
+            stopping = StoppingController(args.stop_window, args.stop_max_delta, args.stop_mean_delta,
+                                          args.stop_policy_changes, args.stop_patience)
+        result = train(robot, n, log_last=0 if args.train_only else 50, instrumentation=instrumentation,
+                       metrics=metrics, epsilon_schedule=epsilon_schedule, stopping=stopping, keep_rewards=False)
+        if stopping is not None:
+            print("Early stopping: " + str(stopping.report()))
+    if metrics is not None:
+        metrics.close()
+        print("Learning-curve metrics: " + str(metrics.summary()))
+    if args.save:
+        import checkpoint
+        path = checkpoint.save_checkpoint(robot, args.save)
+        print("Robot stored in " + path)
     print("size of robot's Q value dictionary: " + str(len(robot.q)))
     print("random exploration times: " + str(robot.explorations) + ", " + str(robot.epsilon))
-    print("Winning rate: " + str(wins/n))
+    print("Winning rate: " + str(result.winning_rate()))
+    if args.train_only:
+        if args.save:
+            print("Plot it with: python plotter.py " + path)
+        return
     print(robot.q)
 
     """Next evaluate robot's performance"""
     robot.evaluate_robot()
 
+    # matplotlib takes longer to import than a short training run, so only here
+    import plotter
     #plotter.createplot(robot)
     plotter.create2dplot(robot, dealers_init_val)
 
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# copyright (C) Team Kingslayer, University of Zurich, 2017.
+"""
+@author: Te Tan, Yves Steiner, Victoria Barth, Lihua Cao
+"""
+
+import numpy as np
+from helpers import *
+from environment import Environment
+from qtable import QTable, DEALER_CARDS, PLAYER_SUMS, actionindex
+
+
+class Solution(object):
+    """
+    optimal Q values, state values and policy of Easy21
+    """
+
+    def __init__(self, q, iterations):
+        """
+        :param q: float array of shape (10, 21, 2), optimal Q value of every state action pair
+        :param iterations: number of value iteration sweeps needed
+        """
+        self.q = q
+        self.v = q.max(axis=2)              # optimal value of every state
+        self.policy = q.argmax(axis=2)      # optimal action index of every state, 0 is hit and 1 is stick
+        self.iterations = iterations
+
+    def __repr__(self):
+        return "%s (converged after %d iterations)" % (self.__class__.__name__, self.iterations)
+
+
+def _hit_model(bust_penalty_below, bust_penalty_above):
+    """
+    transition matrix and expected immediate reward of hitting, they do not depend on the dealer's card
+    :param bust_penalty_below: penalty of bust below 1
+    :param bust_penalty_above: penalty of bust above 21
+    :return: transitions: float array of shape (21, 21), entry [s - 1, s' - 1] is the probability to go
+             from sum s to sum s', rewards: float array of shape (21,)
+    """
+    transitions = np.zeros((PLAYER_SUMS, PLAYER_SUMS))
+    rewards = np.zeros(PLAYER_SUMS)
+    for s in range(1, PLAYER_SUMS + 1):
+        for value, p in Environment.cardDistribution():
+            new_sum = s + value
+            if new_sum < 1:
+                rewards[s - 1] += p * bust_penalty_below
+            elif new_sum > PLAYER_SUMS:
+                rewards[s - 1] += p * bust_penalty_above
+            else:
+                transitions[s - 1, new_sum - 1] += p
+    return transitions, rewards
+
+
+def solve(bust_penalty_below=-10, bust_penalty_above=-1, dealer_bust_reward=10, gamma=1,
+          tolerance=1e-10, max_iterations=10000):
+    """
+    computes the optimal Q values by value iteration over the 10x21 states
+    :param bust_penalty_below: penalty of bust below 1
+    :param bust_penalty_above: penalty of bust above 21
+    :param dealer_bust_reward: reward of dealer bust
+    :param gamma: discount factor
+    :param tolerance: stop once no state value changes by more than this
+    :param max_iterations: upper bound of value iteration sweeps
+    :return: Solution
+    """
+    transitions, hit_rewards = _hit_model(bust_penalty_below, bust_penalty_above)
+    stick_q = Environment.stickRewardTable(dealer_bust_reward)
+
+    q = np.zeros((DEALER_CARDS, PLAYER_SUMS, 2))
+    q[:, :, actionindex(ACTION.stick)] = stick_q
+    v = stick_q.copy()
+    iterations = 0
+    while iterations < max_iterations:
+        iterations += 1
+        q[:, :, actionindex(ACTION.hit)] = hit_rewards + gamma * v.dot(transitions.T)
+        new_v = q.max(axis=2)
+        change = np.abs(new_v - v).max()
+        v = new_v
+        if change < tolerance:
+            break
+    return Solution(q, iterations)
+
+
+def solve_for_robot(robot):
+    """
+    computes the optimal Q values for the reward parameters and discount factor of a robot
+    :param robot: Robot
+    :return: Solution
+    """
+    return solve(robot.bust_penalty_below, robot.bust_penalty_above, robot.dealer_bust_reward, robot.gamma)
+
+
+def _as_array(q):
+    """
+    Q values as an array of shape (10, 21, 2), unknown entries are 0
+    :param q: QTable, array or dictionary {(State, ACTION): q value}
+    :return: float array
+    """
+    if isinstance(q, QTable):
+        return q.values
+    if isinstance(q, np.ndarray):
+        return q
+    table = QTable()
+    for key, value in q.items():
+        table[key] = value
+    return table.values
+
+
+def distance_to_optimal(q, solution):
+    """
+    compares learned Q values with the optimal ones
+    :param q: QTable, array of shape (10, 21, 2) or dictionary {(State, ACTION): q value}
+    :param solution: Solution
+    :return: dictionary with the mean squared error of the Q values ('mse') and the fraction of
+             states in which the greedy policy picks the optimal action ('policy_agreement')
+    """
+    values = _as_array(q)
+    return {
+        'mse': float(np.mean((values - solution.q) ** 2)),
+        'policy_agreement': float(np.mean(values.argmax(axis=2) == solution.policy)),
+    }
+
+
+if __name__ == '__main__':
+    solution = solve()
+    print(solution)
+    print("optimal policy (H = hit, S = stick), one row per dealer's initial card:")
+    for d in range(DEALER_CARDS):
+        print("%2d %s" % (d + 1, ''.join('H' if a == actionindex(ACTION.hit) else 'S' for a in solution.policy[d])))
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# copyright (C) Team Kingslayer, University of Zurich, 2017.
+"""
+@author: Te Tan, Yves Steiner, Victoria Barth, Lihua Cao
+"""
+
+import time
+import numpy as np
+
+
+class EpsilonSchedule(object):
+    """
+    Exploration rate as a function of the number of episodes played, replaces the robot's
+    decline of epsilon per action while training with it
+    """
+
+    def __init__(self, start=1.0, end=0.05, episodes=10000, decay='linear'):
+        """
+        :param start: exploration rate of the first episode
+        :param end: exploration rate from episode 'episodes' on
+        :param episodes: number of episodes until the exploration rate reaches end
+        :param decay: 'linear' or 'exponential' (needs start and end above 0)
+        """
+        if decay not in ('linear', 'exponential'):
+            raise ValueError("unknown decay: %s" % decay)
+        if decay == 'exponential' and (start <= 0 or end <= 0):
+            raise ValueError("exponential decay needs start and end above 0")
+        self.start = start
+        self.end = end
+        self.episodes = episodes
+        self.decay = decay
+        self.episode = 0    # episodes started so far
+        self._decrement = None  # the robot's epsilon_decrement while the schedule replaces it
+
+    def value(self, episode):
+        """
+        :param episode: number of episodes played before
+        :return: float, exploration rate of the episode
+        """
+        progress = min(1.0, episode / self.episodes) if self.episodes else 1.0
+        if self.decay == 'linear':
+            return self.start + (self.end - self.start) * progress
+        return self.start * (self.end / self.start) ** progress
+
+    def begin(self, robot):
+        """
+        called by runner.train before the first episode, turns off the robot's own decline of epsilon
+        :param robot: Robot being trained
+        """
+        self._decrement = robot.epsilon_decrement
+        robot.epsilon_decrement = 0
+
+    def startEpisode(self, robot):
+        """
+        called by runner.train before every episode, sets the robot's exploration rate
+        :param robot: Robot being trained
+        """
+        robot.epsilon = self.value(self.episode)
+        self.episode += 1
+
+    def finish(self, robot):
+        """
+        called by runner.train after training, also if it failed, gives the robot its decline of epsilon back
+        :param robot: Robot being trained
+        """
+        if self._decrement is not None:
+            robot.epsilon_decrement = self._decrement
+            self._decrement = None
+
+
+class StoppingController(object):
+    """
+    Ends training once the Q values have converged. After every window of episodes it compares
+    the Q values and the greedy policy with the ones at the end of the previous window;
+    training stops when the biggest and the mean absolute change of the Q values and the number
+    of states whose greedy action changed stayed within their tolerances for patience windows in a row.
+    """
+
+    def __init__(self, window=1000, max_delta=1.0, mean_delta=0.05, max_policy_changes=0, patience=3,
+                 min_episodes=0):
+        """
+        :param window: number of episodes between two comparisons
+        :param max_delta: tolerance of the biggest absolute change of a Q value within a window
+        :param mean_delta: tolerance of the mean absolute change of the Q values within a window
+        :param max_policy_changes: tolerance of the number of states whose greedy action changed within a window
+        :param patience: number of windows in a row which must be within the tolerances
+        :param min_episodes: never stop before this many episodes
+        """
+        self.window = window
+        self.max_delta = max_delta
+        self.mean_delta = mean_delta
+        self.max_policy_changes = max_policy_changes
+        self.patience = patience
+        self.min_episodes = min_episodes
+        self.clock = time.perf_counter
+        self.episodes = 0
+        self.planned = None     # episodes the training run was started with
+        self.calm = 0           # windows in a row within the tolerances
+        self.stopped = False
+        self.history = []       # (episodes, max change, mean change, policy changes) of every window
+        self._q = None          # Q values at the end of the previous window
+        self._policy = None     # greedy policy at the end of the previous window
+        self._start = None
+
+    def begin(self, robot, n):
+        """
+        called by runner.train before the first episode
+        :param robot: Robot being trained
+        :param n: number of episodes the training run would play without stopping
+        """
+        self.planned = self.episodes + n
+        self.stopped = False
+        if self._start is None:
+            self._start = self.clock()
+            self._q = np.array(robot.q.values)
+            self._policy = robot.q.greedyPolicy()
+
+    def endEpisode(self, robot):
+        """
+        called by runner.train after every episode
+        :param robot: Robot being trained
+        :return: True if training should stop
+        """
+        self.episodes += 1
+        if self.episodes % self.window:
+            return False
+
+        values = robot.q.values
+        delta = np.abs(values - self._q)
+        policy = robot.q.greedyPolicy()
+        changes = int(np.count_nonzero(policy != self._policy))
+        self._q[...] = values
+        self._policy = policy
+        self.history.append((self.episodes, float(delta.max()), float(delta.mean()), changes))
+
+        if delta.max() <= self.max_delta and delta.mean() <= self.mean_delta and changes <= self.max_policy_changes:
+            self.calm += 1
+        else:
+            self.calm = 0
+        self.stopped = self.calm >= self.patience and self.episodes >= self.min_episodes
+        return self.stopped
+
+    def report(self):
+        """
+        :return: dictionary with the episodes played and the episodes and estimated seconds saved by stopping early
+        """
+        seconds = self.clock() - self._start if self._start is not None else 0
+        per_episode = seconds / self.episodes if self.episodes else 0
+        saved = max(0, self.planned - self.episodes) if self.stopped else 0
+        data = {
+            'stopped': self.stopped,
+            'episodes': self.episodes,
+            'planned_episodes': self.planned,
+            'episodes_saved': saved,
+            'seconds': seconds,
+            'seconds_saved': saved * per_episode,
+        }
+        if self.history:
+            data['last_window'] = dict(zip(('episodes', 'max_delta', 'mean_delta', 'policy_changes'), self.history[-1]))
+        return data
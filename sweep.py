@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# copyright (C) Team Kingslayer, University of Zurich, 2017.
+"""
+@author: Te Tan, Yves Steiner, Victoria Barth, Lihua Cao
+"""
+
+import argparse
+import itertools
+import json
+import multiprocessing
+import random
+import time
+import numpy as np
+from environment import CardStream, Environment
+from robot import Robot
+from linear import LinearRobot
+from runner import train
+import checkpoint
+import solver
+
+# robot attributes a sweep config may set, besides algo and multi_step which go to the constructor
+ROBOT_PARAMETERS = ('alpha', 'gamma', 'epsilon', 'exploration_threshold', 'epsilon_decrement', 'trace_decay',
+                    'bust_penalty_below', 'bust_penalty_above', 'dealer_bust_reward')
+
+
+def expand_grid(grid):
+    """
+    Builds every combination of the values in a parameter grid
+    :param grid: dictionary {parameter name: list of values}, or a list of such dictionaries
+    :return: list of configs, each a dictionary {parameter name: value}
+    """
+    if isinstance(grid, list):
+        return [config for part in grid for config in expand_grid(part)]
+    names = sorted(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+
+def seed_streams(seed):
+    """
+    Seeds python's random number generator of the current process with an independent
+    stream derived from the seed and creates a card stream of its own for the cards
+    :param seed: int or numpy SeedSequence
+    :return: Environment which draws the cards from the card stream
+    """
+    sequence = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+    words = sequence.generate_state(4, np.uint32)
+    random.seed(int(sum(int(w) << (32 * i) for i, w in enumerate(words))))
+    cards, = sequence.spawn(1)
+    return Environment(CardStream(cards))
+
+
+def make_robot(config, environment=None):
+    """
+    Creates a robot as described by a sweep config
+    :param config: dictionary with algo, multi_step and any of ROBOT_PARAMETERS,
+                   'linear': True creates a LinearRobot
+    :param environment: Environment the robot plays in, see Robot
+    :return: Robot
+    """
+    unknown = set(config) - set(ROBOT_PARAMETERS) - {'algo', 'multi_step', 'trials', 'linear'}
+    if unknown:
+        raise ValueError("unknown parameters in config: %s" % ', '.join(sorted(unknown)))
+    if config.get('algo', 1) != 2 and config.get('multi_step', 1) != 1:
+        raise ValueError("only TD (algo 2) supports multi_step other than 1: %s" % config)
+    if config.get('linear') and config.get('algo', 1) in (3, 4):
+        raise ValueError("SARSA(lambda) and Q(lambda) (algo 3 and 4) need a Q table: %s" % config)
+    robot = (LinearRobot if config.get('linear') else Robot)(algo=config.get('algo', 1),
+                                                            multi_step=config.get('multi_step', 1),
+                                                            environment=environment)
+    for name in ROBOT_PARAMETERS:
+        if name in config:
+            setattr(robot, name, config[name])
+    robot.reset()   # start over with the configured discount factor
+    return robot
+
+
+def run_config(config, seed, trials=3000):
+    """
+    Trains one robot, this is what every worker of the pool runs
+    :param config: dictionary with algo, multi_step and any of ROBOT_PARAMETERS,
+                   a 'trials' entry overrides the trials argument
+    :param seed: seed of the run's random stream
+    :param trials: number of trials to train
+    :return: dictionary with the final Q values, winning rate, learning curve and run time
+    """
+    start = time.time()
+    robot = make_robot(config, seed_streams(seed))
+    result = train(robot, config.get('trials', trials), log_last=0)
+    distance = solver.distance_to_optimal(robot.q, solver.solve_for_robot(robot))
+    return {
+        'q': robot.q.values,
+        'visited': robot.q.visited,
+        'winning_rate': result.winning_rate(),
+        'rewards': np.array(result.rewards, dtype=np.float32),
+        'steps': result.steps,
+        'mse': distance['mse'],
+        'policy_agreement': distance['policy_agreement'],
+        'seconds': time.time() - start,
+    }
+
+
+def _run_task(task):
+    index, config, seed, trials = task
+    return index, run_config(config, seed, trials)
+
+
+def sweep(configs, seeds, trials=3000, processes=None, output=None):
+    """
+    Trains one robot for every combination of config and seed on a process pool
+    :param configs: list of configs, see expand_grid
+    :param seeds: list of ints, every config is run once with each seed
+    :param trials: number of trials per run, unless a config has its own 'trials'
+    :param processes: number of worker processes, all cores if None
+    :param output: path of the .npz file the aggregated results are written to, nothing is written if None
+    :return: dictionary of arrays with one entry per run, ordered by config and then seed
+    """
+    tasks = [(i, config, seed, trials) for i, (config, seed) in enumerate(itertools.product(configs, seeds))]
+    runs = [None] * len(tasks)
+    pool = multiprocessing.Pool(processes)
+    try:
+        for index, run in pool.imap_unordered(_run_task, tasks):
+            runs[index] = run
+    finally:
+        pool.close()
+        pool.join()
+
+    # learning curves of runs with fewer trials are padded with nan
+    length = max(run['rewards'].size for run in runs)
+    rewards = np.full((len(runs), length), np.nan, dtype=np.float32)
+    for i, run in enumerate(runs):
+        rewards[i, :run['rewards'].size] = run['rewards']
+
+    results = {
+        'configs': np.array([json.dumps(task[1], sort_keys=True) for task in tasks]),
+        'seeds': np.array([task[2] for task in tasks]),
+        'q': np.stack([run['q'] for run in runs]),
+        'visited': np.stack([run['visited'] for run in runs]),
+        'rewards': rewards,
+    }
+    for name in ('winning_rate', 'steps', 'mse', 'policy_agreement', 'seconds'):
+        results[name] = np.array([run[name] for run in runs])
+    if output is not None:
+        np.savez(output, **results)
+    return results
+
+
+def load_sweep(path):
+    """
+    Reads the aggregated results of a sweep, the arrays are memory-mapped
+    :param path: .npz file written by sweep
+    :return: dictionary of arrays, 'configs' decoded back into dictionaries
+    """
+    results = checkpoint.load_arrays(path)
+    results['configs'] = [json.loads(config) for config in results['configs']]
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="train robots for every combination of configs and seeds")
+    parser.add_argument('--grid', default='[{"algo": [1]}, {"algo": [2], "multi_step": [1, 5]}]',
+                        help="JSON dictionary {parameter: list of values}, or a list of them")
+    parser.add_argument('--seeds', type=int, nargs='+', default=[2016])
+    parser.add_argument('--trials', type=int, default=3000)
+    parser.add_argument('--processes', type=int, default=None)
+    parser.add_argument('--output', default='output/sweep.npz')
+    args = parser.parse_args()
+
+    configs = expand_grid(json.loads(args.grid))
+    start = time.time()
+    results = sweep(configs, args.seeds, args.trials, args.processes, args.output)
+    elapsed = time.time() - start
+    for config, seed, rate, agreement in zip(results['configs'], results['seeds'],
+                                             results['winning_rate'], results['policy_agreement']):
+        print("%s seed %d: winning rate %.3f, policy agreement %.3f" % (config, seed, rate, agreement))
+    # the runs' total over the elapsed time is not a speedup for short sweeps, starting the pool dominates them
+    print("%d runs in %.1fs on %s processes (%.1fs of training), results stored in %s"
+          % (len(results['seeds']), elapsed, args.processes or multiprocessing.cpu_count(),
+             results['seconds'].sum(), args.output))
+
+
+if __name__ == '__main__':
+    main()
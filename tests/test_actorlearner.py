@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# copyright (C) Team Kingslayer, University of Zurich, 2017.
+"""
+@author: Te Tan, Yves Steiner, Victoria Barth, Lihua Cao
+"""
+
+import pytest
+from actorlearner import train_actor_learner
+from robot import Robot
+
+
+class CrashingRobot(Robot):
+    """robot whose actors fail in their first step"""
+
+    def doAction(self):
+        raise ValueError("crashed")
+
+
+def test_learns_the_episodes_the_actors_play():
+    robot = Robot(1)
+    result, stats = train_actor_learner(robot, 301, actors=2, batch_episodes=16, poll_seconds=0.1)
+    assert result.episodes == stats['learner']['episodes'] == 301
+    assert stats['actor']['episodes'] >= 301
+    assert len(result.rewards) == 301
+    assert result.reward_sum == pytest.approx(sum(result.rewards))
+    assert robot.q.visited.any()
+
+
+def test_fails_instead_of_waiting_for_a_dead_actor():
+    with pytest.raises(RuntimeError):
+        train_actor_learner(CrashingRobot(1), 100, actors=2, poll_seconds=0.1)
+
+
+@pytest.mark.parametrize('max_staleness, actors', [(50, 2), (10, 3), (0, 2)])
+def test_no_episode_is_learned_with_staler_q_values_than_the_bound(max_staleness, actors):
+    result, stats = train_actor_learner(Robot(1), 2000, actors, max_staleness, poll_seconds=0.1)
+    assert result.episodes == 2000
+    assert stats['learner']['max_staleness'] <= max_staleness
+    # the episodes which were played are learned, dropped by the learner or not sent by their actor
+    assert stats['actor']['episodes'] == result.episodes + stats['learner']['dropped'] + stats['actor']['discarded']
+
+
+def test_explicit_batches_larger_than_the_bound_are_dropped_not_learned():
+    result, stats = train_actor_learner(Robot(1), 500, 2, 5, batch_episodes=32, poll_seconds=0.1)
+    assert result.episodes == 500
+    assert stats['learner']['max_staleness'] <= 5
+    assert stats['learner']['dropped'] + stats['actor']['discarded'] > 0
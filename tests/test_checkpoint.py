@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# copyright (C) Team Kingslayer, University of Zurich, 2017.
+"""
+@author: Te Tan, Yves Steiner, Victoria Barth, Lihua Cao
+"""
+
+import random
+import numpy as np
+import pytest
+import checkpoint
+from environment import CardStream, Environment
+from robot import Robot
+from runner import train
+
+
+@pytest.mark.parametrize('card_stream', (None, 7))
+def test_resumed_training_continues_exactly(tmp_path, card_stream):
+    random.seed(1)
+    straight = Robot(algo=2, multi_step=5, environment=Environment(card_stream))
+    straight.alpha = 0.3
+    train(straight, 3000, log_last=0)
+
+    random.seed(1)
+    first = Robot(algo=2, multi_step=5, environment=Environment(card_stream))
+    first.alpha = 0.3
+    train(first, 2000, log_last=0)
+    path = str(tmp_path / 'robot.npz')
+    checkpoint.save_checkpoint(first, path)
+    random.seed(99)     # the checkpoint restores the random number generator
+    resumed = checkpoint.load_checkpoint(path)
+    assert resumed.alpha == 0.3
+    train(resumed, 1000, log_last=0)
+
+    assert np.array_equal(resumed.q.values, straight.q.values)
+    assert np.array_equal(resumed.q.visited, straight.q.visited)
+    assert resumed.state == straight.state
+    assert resumed.explorations == straight.explorations
+    assert resumed.epsilon == straight.epsilon
+
+
+def test_round_trip_keeps_the_robot(tmp_path):
+    random.seed(5)
+    robot = Robot(algo=2, multi_step=3, environment=Environment(CardStream(9)))
+    robot.gamma = 0.9
+    train(robot, 500, log_last=0)
+    path = str(tmp_path / 'robot.npz')
+    checkpoint.save_checkpoint(robot, path)
+
+    for mmap in (True, False):
+        loaded = checkpoint.load_checkpoint(path, mmap=mmap)
+        assert np.array_equal(loaded.q.values, robot.q.values)
+        assert np.array_equal(loaded.q.visited, robot.q.visited)
+        assert loaded.state == robot.state
+        assert loaded.previous_states.gamma == 0.9
+        for name in checkpoint.SCALARS:
+            assert getattr(loaded, name) == getattr(robot, name), name
+        copy = CardStream.fromState(robot.environment.card_stream.getState())
+        assert [loaded.environment.card_stream.draw() for _ in range(100)] == [copy.draw() for _ in range(100)]
+
+
+def test_loading_without_the_rng_leaves_python_random_alone(tmp_path):
+    path = str(tmp_path / 'robot.npz')
+    checkpoint.save_checkpoint(Robot(), path)
+    random.seed(3)
+    state = random.getstate()
+    checkpoint.load_checkpoint(path, restore_rng=False)
+    assert random.getstate() == state
+
+
+def test_memory_mapped_values_stay_untouched(tmp_path):
+    robot = Robot()
+    robot.q.values[...] = 1
+    path = str(tmp_path / 'robot.npz')
+    checkpoint.save_checkpoint(robot, path)
+    loaded = checkpoint.load_checkpoint(path)
+    loaded.q.values[...] = 2
+    assert (checkpoint.load_checkpoint(path).q.values == 1).all()
+
+
+def test_checkpoints_are_found_by_the_name_they_were_saved_under(tmp_path):
+    name = str(tmp_path / 'robot')
+    path = checkpoint.save_checkpoint(Robot(algo=1), name)
+    assert path == name + '.npz'
+    assert checkpoint.load_checkpoint(name).algo == 1
+    assert checkpoint.save_checkpoint(Robot(), path) == path
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# copyright (C) Team Kingslayer, University of Zurich, 2017.
+"""
+@author: Te Tan, Yves Steiner, Victoria Barth, Lihua Cao
+"""
+
+import numpy as np
+import pytest
+from helpers import *
+from dyna import DynaRobot, Model, STATES
+from environment import Environment
+import solver
+
+
+def test_known_model_follows_the_card_distribution():
+    model = Model.fromCards(-10, -1, 10)
+    hit, stick = model.transitions[0::2], model.transitions[1::2]
+    assert (stick == 0).all()
+    # a hit busts with the probability the transitions leave out
+    sums = np.arange(STATES) % 21 + 1
+    bust_below = np.array([sum(p for value, p in Environment.cardDistribution() if s + value < 1) for s in sums])
+    bust_above = np.array([sum(p for value, p in Environment.cardDistribution() if s + value > 21) for s in sums])
+    assert hit.sum(axis=1) == pytest.approx(1 - bust_below - bust_above)
+    assert model.reward_sum[0::2] == pytest.approx(-10 * bust_below - bust_above)
+    assert model.reward_sum[1::2] == pytest.approx(Environment.stickRewardTable(10).reshape(-1))
+
+
+def test_learned_model_averages_what_it_observed():
+    model = Model()
+    state = State(Card(Card.COLOR.Black, 3), 12)
+    pair = stateActionIndex(state, ACTION.hit)
+    next_state = State(Card(Card.COLOR.Black, 3), 15)
+    model.observe(pair, 0, next_state.index)
+    model.observe(pair, -1, -1)
+    next_values = np.zeros(STATES)
+    next_values[next_state.index] = 4
+    assert model.expectedTargets(np.array([pair]), next_values, 1) == pytest.approx([1.5])
+
+
+def test_planning_with_the_known_model_finds_the_optimal_q_values():
+    robot = DynaRobot(seed=1)
+    robot.model = Model.fromCards(robot.bust_penalty_below, robot.bust_penalty_above, robot.dealer_bust_reward)
+    robot.q.visited[...] = True
+    robot.alpha = 0.5
+    for i in range(2000):
+        robot.plan(1000)
+    assert robot.q.values == pytest.approx(solver.solve_for_robot(robot).q, abs=1e-6)
+
+
+def test_planning_only_backs_up_visited_pairs():
+    robot = DynaRobot(seed=1)
+    robot.model = Model.fromCards(robot.bust_penalty_below, robot.bust_penalty_above, robot.dealer_bust_reward)
+    state = State(Card(Card.COLOR.Black, 10), 20)
+    robot.q[(state, ACTION.stick)] = 0
+    robot.plan(50)
+    written = np.flatnonzero(robot.q.values.reshape(-1))
+    assert list(written) == [stateActionIndex(state, ACTION.stick)]
+
+
+def test_known_model_is_the_default():
+    assert not DynaRobot().learn_model
+    with pytest.raises(ValueError):
+        DynaRobot(model='guessed')
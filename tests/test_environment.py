@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# copyright (C) Team Kingslayer, University of Zurich, 2017.
+"""
+@author: Te Tan, Yves Steiner, Victoria Barth, Lihua Cao
+"""
+
+import random
+import numpy as np
+import pytest
+from helpers import *
+from environment import BatchEnvironment, CardStream, CommonCardsEnvironment, Environment, DEALER_FINAL_MIN
+from robot import Robot
+
+
+def test_batch_environment_ends_every_game():
+    env = BatchEnvironment(1000, seed=1)
+    dealer_cards, robot_sums = env.reset()
+    assert ((dealer_cards >= 1) & (dealer_cards <= 10) & (robot_sums >= 1) & (robot_sums <= 10)).all()
+    sticks = np.ones(1000, dtype=np.int64)
+    dealer_cards, robot_sums, rewards, terminated, dealer_sums = env.doStep(sticks)
+    assert terminated.all()
+    bust = (dealer_sums < 1) | (dealer_sums > 21)
+    assert (rewards[bust] == 10).all()
+    assert (rewards[~bust] == np.sign(robot_sums - dealer_sums)[~bust]).all()
+
+
+def test_finished_games_are_left_alone():
+    env = BatchEnvironment(1000, bust_penalty_below=-7, bust_penalty_above=-3, seed=2)
+    hits = np.zeros(1000, dtype=np.int64)
+    while not env.terminated.all():
+        running = ~env.terminated
+        before = env.robot_sums.copy()
+        dealer_cards, robot_sums, rewards, terminated, dealer_sums = env.doStep(hits)
+        assert np.array_equal(robot_sums[~running], before[~running])
+        assert (rewards[~running] == 0).all()
+        assert (rewards[running & (robot_sums < 1)] == -7).all()
+        assert (rewards[running & (robot_sums > 21)] == -3).all()
+
+
+def test_dealer_outcomes_are_distributions():
+    outcomes = Environment.dealerOutcomes()
+    assert outcomes.shape == (10, 36)
+    assert np.allclose(outcomes.sum(axis=1), 1)
+    # the dealer never stops below 17 unless bust
+    assert outcomes[:, 1 - DEALER_FINAL_MIN:17 - DEALER_FINAL_MIN].sum() < 1e-12
+
+
+def test_dealer_outcomes_match_the_dealer_drawing_card_by_card():
+    environment = Environment(CardStream(2016))
+    robot = Robot(environment=environment)
+    robot.state = State(Card(Card.COLOR.Black, 7), 15)
+    finals = np.array([environment.doStep(robot, ACTION.stick)[3] for _ in range(100000)])
+    frequencies = np.bincount(finals - DEALER_FINAL_MIN, minlength=36) / finals.size
+    assert np.abs(frequencies - Environment.dealerOutcomes()[6]).max() < 0.01
+
+
+def test_stick_rewards_of_the_table_are_the_expected_ones():
+    robot = Robot()
+    table = Environment.stickRewardTable(robot.dealer_bust_reward)
+    for index in (0, 16, 100, 209):
+        state = State.fromIndex(index)
+        assert table.reshape(-1)[index] == pytest.approx(Environment.expectedStickReward(robot, state), abs=1e-12)
+
+
+def test_batch_dealers_sampled_from_the_table_follow_it():
+    env = BatchEnvironment(100000, seed=3, dealer_from_table=True)
+    env.dealer_cards[:] = 4
+    dealer_sums = env.doStep(np.ones(env.n, dtype=np.int64))[4]
+    frequencies = np.bincount(dealer_sums - DEALER_FINAL_MIN, minlength=36) / env.n
+    assert np.abs(frequencies - Environment.dealerOutcomes()[3]).max() < 0.01
+
+
+def test_card_streams_repeat_and_resume():
+    first, second = CardStream(7, block_size=100), CardStream(7, block_size=100)
+    assert [first.draw() for _ in range(250)] == [second.draw() for _ in range(250)]
+    first.drawBlack()
+    first.uniform()
+    resumed = CardStream.fromState(first.getState())
+    assert [first.draw() for _ in range(250)] == [resumed.draw() for _ in range(250)]
+    assert [first.drawBlack() for _ in range(250)] == [resumed.drawBlack() for _ in range(250)]
+    assert [first.uniform() for _ in range(250)] == [resumed.uniform() for _ in range(250)]
+
+
+def test_card_streams_draw_cards_like_python_random():
+    stream = CardStream(1)
+    cards = np.array([stream.draw() for _ in range(60000)])
+    assert np.count_nonzero(cards == 0) == 0 and np.abs(cards).max() == 10
+    assert abs(np.count_nonzero(cards < 0) / cards.size - 1 / 3) < 0.01
+    assert set(stream.drawBlack() for _ in range(1000)) == set(range(1, 11))
+
+
+def test_environments_have_their_own_streams():
+    state = random.getstate()
+    alone = Environment(CardStream(3))
+    cards = [alone.drawOneCard().signed_value for _ in range(50)]
+    # another environment drawing in between changes neither these cards nor python's random module
+    shared, other = Environment(CardStream(3)), Environment(CardStream(4))
+    interleaved = []
+    for _ in range(50):
+        interleaved.append(shared.drawOneCard().signed_value)
+        other.drawOneCard()
+    assert interleaved == cards
+    assert random.getstate() == state
+
+
+def test_common_cards_are_paired_whatever_is_played():
+    games = 500
+    hitting, sticking = CommonCardsEnvironment(games, seed=11), CommonCardsEnvironment(games, seed=11)
+    assert np.array_equal(hitting.dealer_cards, sticking.dealer_cards)
+    assert np.array_equal(hitting.robot_sums, sticking.robot_sums)
+    start = hitting.robot_sums.copy()
+
+    # one environment hits once before it sticks, the other sticks right away:
+    # the dealers of the games which did not go bust draw the same cards
+    dealer_cards, robot_sums, rewards, busted, dealer_sums = hitting.doStep(np.zeros(games, dtype=np.int64))
+    hit_finals = hitting.doStep(np.ones(games, dtype=np.int64))[4]
+    stick_finals = sticking.doStep(np.ones(games, dtype=np.int64))[4]
+    assert np.array_equal(hit_finals[~busted], stick_finals[~busted])
+    assert not np.array_equal(robot_sums, start)
+
+    # the next set of games is the same in both environments, and differs from the first one
+    assert np.array_equal(hitting.reset()[1], sticking.reset()[1])
+    assert not np.array_equal(hitting.robot_sums, start)
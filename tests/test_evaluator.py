@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# copyright (C) Team Kingslayer, University of Zurich, 2017.
+"""
+@author: Te Tan, Yves Steiner, Victoria Barth, Lihua Cao
+"""
+
+import math
+import numpy as np
+import evaluator
+import solver
+from evaluator import compare_policies, evaluate_policy
+from robot import Robot
+
+
+def test_optimal_policy_earns_its_expected_reward():
+    solution = solver.solve()
+    # the games start with a black card for the dealer and one for the robot, all equally likely
+    expected = solution.v[:, :10].mean()
+    result = evaluate_policy(solution.policy, 200000, seed=1, confidence=0.999)
+    assert abs(result.mean_reward - expected) < result.mean_reward_ci
+    assert abs(result.win_rate + result.draw_rate + result.loss_rate - 1) < 1e-12
+
+
+def test_early_stop_plays_about_as_many_games_as_the_interval_needs():
+    policy = solver.solve().policy
+    for half_width in (0.01, 0.004):
+        result = evaluate_policy(policy, target_half_width=half_width, seed=2)
+        assert result.win_rate_ci <= half_width
+        # games of the widest interval, win rate 0.5
+        worst_case = math.ceil(1.96 ** 2 * 0.25 / half_width ** 2)
+        assert result.episodes <= worst_case + evaluator.MIN_ROUND
+    assert evaluate_policy(policy, 5000, target_half_width=0.001, seed=2).episodes == 5000
+
+
+def test_common_cards_tell_close_policies_apart():
+    solution = solver.solve()
+    worse = solution.policy.copy()
+    worse[:, 5] = 1 - worse[:, 5]       # the other action at sum 6
+    comparison = compare_policies([solution.policy, worse], episodes=100000, seed=3)
+    difference = comparison.difference(0, 1)
+    assert difference.significant() and difference.mean > 0
+    # only games which reach a sum of 6 can end differently, the others are the same for both policies
+    assert difference.variance_reduction > 5
+    assert comparison.ranking() == [0, 1]
+
+
+def test_greedy_policy_of_a_robot_is_its_argmax():
+    values = np.random.default_rng(0).normal(size=(10, 21, 2))
+    assert np.array_equal(evaluator.greedy_policy(values), values.argmax(axis=2))
+
+
+def test_evaluating_a_robot_leaves_it_alone():
+    robot = Robot()
+    robot.q.values[...] = solver.solve().q
+    state, epsilon = robot.state, robot.epsilon
+    result = evaluator.evaluate_robot(robot, episodes=10000, seed=3)
+    assert result.episodes == 10000
+    assert (robot.state, robot.epsilon) == (state, epsilon)
+
+
+def test_training_comparison_prints_a_row_per_number_of_episodes(capsys):
+    rows = evaluator.compare_training([('q-learning', lambda: Robot(1)), ('td', lambda: Robot(2, 5))], [20, 50],
+                                      evaluation_episodes=1000)
+    lines = capsys.readouterr().out.splitlines()
+    assert [line.split()[0] for line in lines[2:]] == ['20', '50']
+    assert [len(row) for row in rows] == [2, 2]
+    # every run starts from the same seed, so the same robot trained as long gives the same result
+    again = evaluator.compare_training([('q-learning', lambda: Robot(1))], [20], evaluation_episodes=1000)
+    assert again[0][0][1] == rows[0][0][1]
@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# copyright (C) Team Kingslayer, University of Zurich, 2017.
+"""
+@author: Te Tan, Yves Steiner, Victoria Barth, Lihua Cao
+"""
+
+import pickle
+from helpers import *
+
+
+def test_states_are_interned_and_indexed():
+    state = State(Card(Card.COLOR.Black, 4), 17)
+    assert State(Card(Card.COLOR.Black, 4), 17) is state
+    assert State.fromIndex(state.index) is state
+    assert stateActionIndex(state, ACTION.stick) == 2 * state.index + 1
+
+
+def test_states_outside_the_table_have_no_index():
+    assert State(Card(Card.COLOR.Black, 4), 0).index == -1
+    assert State(Card(Card.COLOR.Black, 4), 22).index == -1
+
+
+def test_cards_know_their_signed_value():
+    red, black = Card(Card.COLOR.Red, 6), Card(Card.COLOR.Black, 6)
+    assert (red.signed_value, black.signed_value) == (-6, 6)
+    assert red.index != black.index and black > red
+
+
+def test_pickling_keeps_the_shared_instances():
+    state = State(Card(Card.COLOR.Red, 2), 9)
+    assert pickle.loads(pickle.dumps(state)) is state
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# copyright (C) Team Kingslayer, University of Zurich, 2017.
+"""
+@author: Te Tan, Yves Steiner, Victoria Barth, Lihua Cao
+"""
+
+import multiprocessing
+import os
+import tempfile
+import numpy as np
+import pytest
+import checkpoint
+import hogwild
+from sweep import make_robot
+
+# multi-step TD approaches the optimal Q values, which the convergence is measured against
+CONFIG = {'algo': 2, 'multi_step': 5, 'alpha': 0.05}
+
+
+@pytest.mark.skipif(multiprocessing.cpu_count() < 2, reason="hogwild workers need cores of their own")
+def test_converges_no_slower_than_a_single_process():
+    report = hogwild.compare_convergence(CONFIG, 20000, 2)
+    single, parallel = report['single'], report['hogwild']
+    assert single['seconds_to_target'] is not None
+    assert parallel['seconds_to_target'] is not None, "hogwild never got within 5%% of the single process' mse: %s" % report
+    # every worker plays its share of the episodes on its own core
+    assert parallel['seconds_to_target'] <= single['seconds_to_target'], report
+    assert parallel['policy_agreement'] >= 0.7
+
+
+def test_temporary_table_is_removed(monkeypatch, tmp_path):
+    monkeypatch.setattr(tempfile, 'tempdir', str(tmp_path))
+    hogwild.train_hogwild(make_robot(CONFIG), 500, 1)
+    assert os.listdir(str(tmp_path)) == []
+
+
+def test_checkpoint_keeps_visited_entries_and_parameters(tmp_path):
+    table = str(tmp_path / 'table.npy')
+    robot = make_robot(dict(CONFIG, epsilon=0.5))
+    hogwild.train_hogwild(robot, 2000, 1, table)
+    assert np.array_equal(np.load(table), robot.q.values)
+
+    path = str(tmp_path / 'robot.npz')
+    checkpoint.save_checkpoint(robot, path)
+    loaded = checkpoint.load_checkpoint(path, restore_rng=False)
+    assert np.array_equal(loaded.q.values, robot.q.values)
+    assert np.array_equal(loaded.q.visited, robot.q.visited)
+    for name in checkpoint.SCALARS:
+        assert getattr(loaded, name) == getattr(robot, name), name
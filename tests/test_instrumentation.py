@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# copyright (C) Team Kingslayer, University of Zurich, 2017.
+"""
+@author: Te Tan, Yves Steiner, Victoria Barth, Lihua Cao
+"""
+
+import io
+import json
+import random
+import numpy as np
+from instrumentation import Instrumentation, JsonLinesSink, MemorySink, PrintSink
+from robot import Robot
+from runner import train
+
+
+def _train(instrumentation=None):
+    random.seed(4)
+    robot = Robot(algo=2, multi_step=5)
+    robot.reset()
+    return robot, train(robot, 250, log_last=0, instrumentation=instrumentation)
+
+
+def test_counters_follow_the_training_loop():
+    sink = MemorySink()
+    robot, result = _train(Instrumentation([sink], snapshot_every=100))
+    kinds = [kind for kind, data in sink.records]
+    assert kinds == ['snapshot', 'snapshot', 'summary']
+    summary = sink.records[-1][1]
+    counters, phases = summary['counters'], summary['phases']
+    assert summary['episodes'] == 250
+    assert counters['steps'] == phases['doStep']['calls'] == phases['update']['calls'] == result.steps
+    # every step but the last multi_step - 1 of an episode updates right away, the rest at its end
+    assert counters['q_updates'] == result.steps
+    assert phases['reset']['calls'] == 250
+    assert 0 < counters['sticks'] <= 250
+    assert counters['dealer_draws_per_stick'] == counters['dealer_draws'] / counters['sticks']
+    assert counters['explorations'] == robot.explorations
+    assert summary['table_size'] == len(robot.q)
+
+
+def test_instrumented_training_learns_the_same():
+    plain, plain_result = _train()
+    measured, measured_result = _train(Instrumentation([MemorySink()]))
+    assert np.array_equal(plain.q.values, measured.q.values)
+    assert plain_result.rewards == measured_result.rewards
+
+
+def test_sinks_write_one_json_line_per_record(tmp_path):
+    stream = io.StringIO()
+    path = str(tmp_path / 'profile.jsonl')
+    _train(Instrumentation([PrintSink(stream), JsonLinesSink(path)], snapshot_every=125))
+    with open(path) as f:
+        lines = [json.loads(line) for line in f]
+    assert [json.loads(line) for line in stream.getvalue().splitlines()] == lines
+    assert [list(line) for line in lines] == [['snapshot'], ['snapshot'], ['summary']]
+    assert lines[0]['snapshot']['episodes'] == 125
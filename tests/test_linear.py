@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# copyright (C) Team Kingslayer, University of Zurich, 2017.
+"""
+@author: Te Tan, Yves Steiner, Victoria Barth, Lihua Cao
+"""
+
+import random
+import numpy as np
+import pytest
+import evaluator
+import solver
+from helpers import *
+from environment import Environment
+from linear import ACTIVE, FEATURES, FEATURE_COUNT, LinearQ, LinearRobot
+from runner import train
+
+
+def test_every_pair_has_one_to_four_features_of_its_action():
+    counts = FEATURES.sum(axis=2)
+    assert counts.min() == 1 and counts.max() == 4
+    # hit and stick never share a feature
+    assert not (FEATURES[:, 0] * FEATURES[:, 1]).any()
+    assert all(np.array_equal(np.flatnonzero(FEATURES.reshape(-1, FEATURE_COUNT)[i]), active)
+               for i, active in enumerate(ACTIVE))
+
+
+def test_writing_a_value_moves_the_approximation_onto_it():
+    q = LinearQ()
+    state = State(Card(Card.COLOR.Black, 4), 7)
+    q[(state, ACTION.hit)] = 3.0
+    assert q[(state, ACTION.hit)] == pytest.approx(3.0)
+    assert q[(state, ACTION.stick)] == 0
+    assert q.values[3, 6, 0] == pytest.approx(3.0)
+    assert q.get((State(state.dealer_card, 22), ACTION.hit), 'bust') == 'bust'
+
+
+@pytest.mark.parametrize('algo, multi_step', ((1, 1), (2, 1), (2, 5)))
+def test_learns_a_policy_close_to_the_optimal_one(algo, multi_step):
+    solution = solver.solve()
+    random.seed(1)
+    robot = LinearRobot(algo, multi_step, Environment(3))
+    untrained = solver.distance_to_optimal(robot.q.values, solution)
+    train(robot, 10000, log_last=0)
+    assert robot.q.weights.shape == (FEATURE_COUNT,)
+    learned = solver.distance_to_optimal(robot.q.values, solution)
+    assert learned['policy_agreement'] > 0.9 > untrained['policy_agreement']
+    if algo == 2:
+        # Q-learning bootstraps on the last step of an episode and overestimates, TD does not
+        assert learned['mse'] < untrained['mse'] / 2
+    optimal = solution.v[:, :10].mean()
+    assert evaluator.evaluate_robot(robot, episodes=100000, seed=1).mean_reward > optimal - 0.2
+
+
+
+@pytest.mark.parametrize('algo', (3, 4))
+def test_linear_robot_rejects_traces(algo):
+    with pytest.raises(ValueError):
+        LinearRobot(algo=algo)
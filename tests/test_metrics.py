@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# copyright (C) Team Kingslayer, University of Zurich, 2017.
+"""
+@author: Te Tan, Yves Steiner, Victoria Barth, Lihua Cao
+"""
+
+import random
+import tracemalloc
+import numpy as np
+import pytest
+from metrics import MetricsLog, StreamingMetrics, read_metrics_log
+from robot import Robot
+from runner import TrainingResult, train
+
+
+def _robot():
+    random.seed(6)
+    robot = Robot(algo=2, multi_step=5)
+    robot.reset()
+    return robot
+
+
+def test_log_reads_back_what_training_wrote(tmp_path):
+    path = str(tmp_path / 'metrics.log')
+    robot = _robot()
+    metrics = StreamingMetrics(window=50, log=MetricsLog(path, chunk_size=64))
+    result = train(robot, 300, log_last=0, metrics=metrics, keep_rewards=True)
+    metrics.close()
+
+    records = read_metrics_log(path)
+    assert list(records['episode']) == list(range(1, 301))
+    assert list(records['reward']) == result.rewards
+    assert records['rolling_reward'][-1] == pytest.approx(np.mean(result.rewards[-50:]), rel=1e-6)
+    assert metrics.summary()['rolling_reward'] == pytest.approx(records['rolling_reward'][-1], rel=1e-6)
+
+    # a second run continues the episode numbers of the log
+    metrics = StreamingMetrics(window=50, log=MetricsLog(path, chunk_size=64))
+    train(robot, 100, log_last=0, metrics=metrics)
+    metrics.close()
+    assert list(read_metrics_log(path)['episode']) == list(range(1, 401))
+
+
+def test_other_files_are_not_taken_for_logs(tmp_path):
+    path = tmp_path / 'other.log'
+    path.write_bytes(b'x' * 600)
+    with pytest.raises(ValueError):
+        MetricsLog(str(path))
+
+
+def test_memory_does_not_grow_with_the_episodes(tmp_path):
+    robot = _robot()
+    metrics = StreamingMetrics(window=100, log=MetricsLog(str(tmp_path / 'metrics.log'), chunk_size=256))
+    train(robot, 5000, log_last=0, metrics=metrics)     # meets most states, they are created once
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        result = train(robot, 5000, log_last=0, metrics=metrics)
+        grown = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+    metrics.close()
+    # with metrics the result keeps no reward per trial
+    assert result.rewards is None and result.episodes == 5000
+    # a reward per trial would take 40 KiB
+    assert grown < 8 * 1024
+
+
+def test_rewards_are_only_kept_on_request():
+    robot = _robot()
+    kept = train(robot, 200, log_last=0)
+    assert len(kept.rewards) == 200
+    assert kept.mean_reward() == pytest.approx(sum(kept.rewards) / 200)
+    assert train(robot, 200, log_last=0, keep_rewards=False).rewards is None
+
+
+def test_training_result_without_rewards_keeps_the_totals():
+    result = TrainingResult(keep_rewards=False)
+    for reward in (1, -1, 10, 0):
+        result.addEpisode(reward, 2)
+    assert result.rewards is None
+    assert (result.episodes, result.steps, result.reward_sum, result.wins) == (4, 8, 10, 1)
+    assert result.mean_reward() == 2.5
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# copyright (C) Team Kingslayer, University of Zurich, 2017.
+"""
+@author: Te Tan, Yves Steiner, Victoria Barth, Lihua Cao
+"""
+
+import os
+import random
+import numpy as np
+import checkpoint
+import plotter
+from helpers import *
+from robot import Robot
+from runner import train
+
+
+def _trained_robot():
+    random.seed(8)
+    robot = Robot(algo=2, multi_step=5)
+    train(robot, 500, log_last=0)
+    return robot
+
+
+def test_grids_agree_with_the_dictionary_functions():
+    robot = _trained_robot()
+    d = dict(robot.q.items())
+    grids = plotter.qgrids(robot.q)
+    for function, grid in ((lambda d: plotter.removebyaction(d, ACTION.stick), 'hit'),
+                           (lambda d: plotter.removebyaction(d, ACTION.hit), 'stick'),
+                           (plotter.subtractactions, 'subtracted_hit_stick'),
+                           (plotter.removeminqval, 'removed_q_min')):
+        expected = np.zeros((11, 22))
+        for (state, action), value in function(d)[0].items():
+            expected[state.dealer_card.value, state.robot_sum] = value
+        assert np.allclose(grids[grid], expected), grid
+    assert all(np.array_equal(grids[name], plotter.qgrids(d)[name]) for name in grids)
+    assert all(np.array_equal(grids[name], plotter.qgrids(robot.q.values)[name]) for name in grids)
+
+
+def test_every_figure_of_every_checkpoint_is_rendered(tmp_path):
+    robot = _trained_robot()
+    path = checkpoint.save_checkpoint(robot, str(tmp_path / 'robot'))
+    figures = plotter.render_all([path], str(tmp_path / 'figures'), processes=1)
+    assert len(figures) == len(plotter.VARIANTS) + 10 == len(set(figures))
+    for figure in figures:
+        assert os.path.dirname(figure) == str(tmp_path / 'figures' / 'robot')
+        assert os.path.getsize(figure) > 0
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# copyright (C) Team Kingslayer, University of Zurich, 2017.
+"""
+@author: Te Tan, Yves Steiner, Victoria Barth, Lihua Cao
+"""
+
+import threading
+import numpy as np
+import pytest
+from helpers import *
+from policy import CompiledPolicy, MicroBatcher
+from qtable import DEALER_CARDS, PLAYER_SUMS, ACTIONS
+
+
+@pytest.fixture
+def policy():
+    values = np.random.default_rng(2016).normal(size=(DEALER_CARDS, PLAYER_SUMS, len(ACTIONS)))
+    return CompiledPolicy(values)
+
+
+def test_act_agrees_with_act_batch(policy):
+    dealers, sums = np.meshgrid(np.arange(1, 11), np.arange(1, 22), indexing='ij')
+    batch = policy.act_batch(dealers.reshape(-1), sums.reshape(-1))
+    for dealer, total, action in zip(dealers.reshape(-1), sums.reshape(-1), batch):
+        assert policy.act(State(Card(Card.COLOR.Black, int(dealer)), int(total))) == ACTIONS[action]
+    assert np.array_equal(batch.reshape(DEALER_CARDS, PLAYER_SUMS), policy.values.argmax(axis=2))
+
+
+@pytest.mark.parametrize('dealer, total', ((0, 5), (11, 5), (3, 0), (3, 22), (3, -4)))
+def test_states_outside_the_table_are_rejected(policy, dealer, total):
+    with pytest.raises(ValueError):
+        policy.act_batch([dealer], [total])
+    with pytest.raises(ValueError):
+        policy.act(State(Card(Card.COLOR.Black, dealer), total))
+
+
+def test_save_and_load_keep_the_policy(policy, tmp_path):
+    path = str(tmp_path / 'policy.npz')
+    policy.save(path)
+    loaded = CompiledPolicy.load(path)
+    assert np.array_equal(loaded.actions, policy.actions)
+    assert np.array_equal(loaded.values, policy.values)
+
+
+def test_micro_batcher_answers_every_thread(policy):
+    batcher = MicroBatcher(policy, max_delay=0.005).start()
+    rng = np.random.default_rng(1)
+    queries = [(rng.integers(1, 11, 50), rng.integers(1, 22, 50)) for _ in range(20)]
+    answers = [None] * len(queries)
+
+    def ask(i):
+        answers[i] = batcher.act(*queries[i])
+
+    threads = [threading.Thread(target=ask, args=(i,)) for i in range(len(queries))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    batcher.stop()
+    for (dealers, sums), answer in zip(queries, answers):
+        assert np.array_equal(answer, policy.act_batch(dealers, sums))
+    assert batcher.queries == len(queries) and batcher.batches <= len(queries)
+
+
+def test_micro_batcher_survives_a_failing_batch(policy, monkeypatch):
+    batcher = MicroBatcher(policy).start()
+    with pytest.raises(ValueError):
+        batcher.act([12], [3])
+    monkeypatch.setattr(policy, 'act_batch', lambda dealers, sums: 1 / 0)
+    with pytest.raises(ZeroDivisionError):
+        batcher.act([2], [3])
+    monkeypatch.undo()
+    assert batcher.act([2], [3]).tolist() == policy.act_batch([2], [3]).tolist()
+    batcher.stop()
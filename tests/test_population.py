@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# copyright (C) Team Kingslayer, University of Zurich, 2017.
+"""
+@author: Te Tan, Yves Steiner, Victoria Barth, Lihua Cao
+"""
+
+import numpy as np
+import pytest
+import robot as robot_module
+from environment import CardStream, Environment
+from population import Population, agent_seeds, population_sweep
+from runner import train
+from stopping import EpsilonSchedule
+from sweep import make_robot
+
+# Q-learning and TD with different rewards, learning rates and declines of epsilon
+CONFIGS = [
+    {'algo': 1, 'exploration_threshold': 20},
+    {'algo': 1, 'alpha': 0.3, 'dealer_bust_reward': 5, 'bust_penalty_below': -3},
+    {'algo': 2, 'multi_step': 1, 'alpha': 0.5, 'exploration_threshold': 50, 'epsilon_decrement': 0.001},
+    {'algo': 2, 'multi_step': 3, 'bust_penalty_above': -2},
+    {'algo': 2, 'multi_step': 5, 'alpha': 0.1, 'epsilon': 0.5, 'exploration_threshold': 0},
+    {'algo': 2, 'multi_step': 8, 'dealer_bust_reward': 1},
+]
+BLOCK_SIZE = 64
+
+
+class StreamRandom(object):
+    """stands in for python's random module in robot, draws from the uniform numbers of a card stream"""
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def uniform(self, a, b):
+        return a + (b - a) * self.stream.uniform()
+
+    def randint(self, a, b):
+        return a + int(self.stream.uniform() * (b - a + 1))
+
+
+def _train_alone(monkeypatch, config, seed, i, n, dealer_from_table, epsilon_schedule=None):
+    """trains agent i of a population by itself with runner.train and its random streams"""
+    cards, exploration = agent_seeds(seed, i)
+    monkeypatch.setattr(robot_module, 'random', StreamRandom(CardStream(exploration, BLOCK_SIZE)))
+    robot = make_robot(config, Environment(CardStream(cards, BLOCK_SIZE), dealer_from_table))
+    return robot, train(robot, n, log_last=0, epsilon_schedule=epsilon_schedule)
+
+
+@pytest.mark.parametrize('dealer_from_table', (False, True))
+def test_every_agent_learns_like_runner_train(monkeypatch, dealer_from_table):
+    population = Population(CONFIGS, 7, dealer_from_table, BLOCK_SIZE)
+    trained = population.train(300)
+    for i, config in enumerate(CONFIGS):
+        robot, result = _train_alone(monkeypatch, config, 7, i, 300, dealer_from_table)
+        assert list(trained['rewards'][i]) == result.rewards, config
+        assert (trained['steps'][i], trained['wins'][i]) == (result.steps, result.wins)
+        assert np.array_equal(population.visited[i], robot.q.visited)
+        assert np.array_equal(population.values[i], robot.q.values), config
+        assert (population.epsilon[i], population.explorations[i]) == (robot.epsilon, robot.explorations)
+
+
+def test_scheduled_agents_get_their_decline_of_epsilon_back(monkeypatch):
+    configs = CONFIGS[:3]
+    population = Population(configs, 3, block_size=BLOCK_SIZE)
+    population.train(200, [None, EpsilonSchedule(1.0, 0.1, 100), None])
+    robot, result = _train_alone(monkeypatch, configs[1], 3, 1, 200, False, EpsilonSchedule(1.0, 0.1, 100))
+    assert np.array_equal(population.values[1], robot.q.values)
+    assert population.epsilon[1] == robot.epsilon
+    assert list(population.epsilon_decrement) == [0.01, 0.01, 0.001]
+
+
+def test_agents_do_not_depend_on_the_others():
+    first = Population(CONFIGS[:1], 11, block_size=BLOCK_SIZE)
+    first.train(100)
+    together = Population(CONFIGS, 11, block_size=BLOCK_SIZE)
+    together.train(100)
+    assert np.array_equal(first.values[0], together.values[0])
+
+
+def test_sweep_has_the_layout_of_sweep_py(tmp_path):
+    output = str(tmp_path / 'population.npz')
+    results = population_sweep(CONFIGS, 50, output=output)
+    stored = np.load(output)
+    assert stored['q'].shape == (len(CONFIGS), 10, 21, 2)
+    assert stored['rewards'].shape == (len(CONFIGS), 50)
+    assert np.array_equal(stored['winning_rate'], results['winning_rate'])
+    with pytest.raises(ValueError):
+        Population([{'algo': 3}])
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# copyright (C) Team Kingslayer, University of Zurich, 2017.
+"""
+@author: Te Tan, Yves Steiner, Victoria Barth, Lihua Cao
+"""
+
+import numpy as np
+import pytest
+from helpers import *
+from qtable import QTable, actionindex
+
+
+def test_behaves_like_the_dictionary_it_replaced():
+    q = QTable()
+    state = State(Card(Card.COLOR.Black, 3), 12)
+    assert len(q) == 0 and q.get((state, ACTION.hit)) is None
+    q[(state, ACTION.stick)] = 0.5
+    q[(state, ACTION.hit)] = 0.0
+    assert len(q) == 2
+    assert dict(q.items()) == {(state, ACTION.stick): 0.5, (state, ACTION.hit): 0.0}
+    assert q.values[2, 11, actionindex(ACTION.stick)] == 0.5
+    del q[(state, ACTION.stick)]
+    assert (state, ACTION.stick) not in q and q.values[2, 11, 1] == 0
+
+
+def test_max_value_and_best_action_only_count_written_entries():
+    q = QTable()
+    state = State(Card(Card.COLOR.Black, 10), 20)
+    q[(state, ACTION.hit)] = -1.0
+    assert q.maxValue(state) == -1.0
+    # unwritten entries read 0 everywhere else
+    assert q.actionValues(state) == (-1.0, 0)
+    assert q.bestAction(state) == ACTION.stick
+    q[(state, ACTION.stick)] = 2.0
+    assert q.actionValues(state) == (-1.0, 2.0)
+    assert q.bestAction(state) == ACTION.stick
+    assert q.greedyPolicy()[9, 19] == 1
+
+
+def test_shares_the_arrays_it_is_given():
+    values = np.zeros((10, 21, 2))
+    q = QTable(values)
+    q[(State(Card(Card.COLOR.Black, 1), 1), ACTION.hit)] = 3.0
+    assert values[0, 0, 0] == 3.0
+    with pytest.raises(KeyError):
+        q[(State(Card(Card.COLOR.Black, 1), 2), ACTION.hit)]
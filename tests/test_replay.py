@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# copyright (C) Team Kingslayer, University of Zurich, 2017.
+"""
+@author: Te Tan, Yves Steiner, Victoria Barth, Lihua Cao
+"""
+
+import numpy as np
+import pytest
+from helpers import *
+from replay import ReplayBuffer, ReplayRobot
+
+
+def test_full_buffer_overwrites_the_oldest_transitions():
+    buffer = ReplayBuffer(3)
+    for i in range(5):
+        buffer.add(i, i % 2, i, i + 1, False)
+    assert len(buffer) == 3
+    assert list(buffer.states) == [3, 4, 2]
+    assert list(buffer.actions) == [1, 0, 0]
+
+
+def test_uniform_sampling_draws_every_stored_transition_alike():
+    buffer = ReplayBuffer(10, seed=1)
+    for i in range(4):
+        buffer.add(i, 0, 0, -1, True)
+    indices, weights = buffer.sample(40000)
+    assert np.bincount(indices, minlength=10)[4:].sum() == 0
+    assert np.bincount(indices)[:4] / 40000. == pytest.approx([0.25] * 4, abs=0.01)
+    assert (weights == 1).all()
+
+
+def test_prioritized_sampling_follows_the_priorities():
+    buffer = ReplayBuffer(10, prioritized=True, priority_exponent=1, importance_exponent=1, seed=1)
+    for i in range(2):
+        buffer.add(i, 0, 0, -1, True)
+    buffer.updatePriorities(np.array([0, 1]), np.array([-1.0, 3.0]))
+    assert buffer.max_priority == pytest.approx(3)
+    indices, weights = buffer.sample(40000)
+    assert np.bincount(indices)[1] / 40000. == pytest.approx(0.75, abs=0.01)
+    # full correction: the often drawn transition weighs a third of the other one
+    assert weights[indices == 1] == pytest.approx(1 / 3.)
+    assert weights[indices == 0] == pytest.approx(1)
+    # new transitions get the biggest priority so far
+    buffer.add(2, 0, 0, -1, True)
+    assert buffer.priorities[2] == buffer.max_priority
+
+
+def test_transitions_drawn_more_than_once_add_up_their_updates():
+    robot = ReplayRobot(batch_size=4, seed=1)
+    state = State(Card(Card.COLOR.Black, 5), 12)
+    robot.replay.add(state.index, 1, 10, -1, True)
+    errors = robot.learnBatch()
+    assert list(errors) == [10] * 4
+    assert robot.q.values.reshape(-1, 2)[state.index, 1] == pytest.approx(4 * robot.alpha * 10)
+    assert robot.q.visited.reshape(-1, 2)[state.index, 1]
+
+
+def test_bootstraps_from_the_best_visited_action_of_the_next_state():
+    robot = ReplayRobot(batch_size=1, seed=1)
+    state = State(Card(Card.COLOR.Black, 5), 12)
+    next_state = State(Card(Card.COLOR.Black, 5), 15)
+    values = robot.q.values.reshape(-1, 2)
+    visited = robot.q.visited.reshape(-1, 2)
+    values[next_state.index] = [2.0, 7.0]
+    visited[next_state.index] = [True, False]
+    robot.replay.add(state.index, 0, 0, next_state.index, False)
+    assert list(robot.learnBatch()) == [2.0]
+
+
+def test_only_q_learning_replays():
+    with pytest.raises(ValueError):
+        ReplayRobot(algo=2)
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# copyright (C) Team Kingslayer, University of Zurich, 2017.
+"""
+@author: Te Tan, Yves Steiner, Victoria Barth, Lihua Cao
+"""
+
+import math
+import random
+import numpy as np
+import pytest
+from robot import Robot, TRACE_THRESHOLD
+from runner import train
+
+# wins, explorations, size of the Q table, sum and sum of squares of the Q values and the next
+# random number after 3000 seeded trials, recorded with the dictionary robot the project started with
+BASELINE = {
+    (1, 1): (17, 3052, 407, 17647.381686640463, 1763126.1416672887, 0.799864591399644),
+    (2, 1): (24, 3056, 412, 307.5027248410984, 16175.48768703531, 0.0789804007955861),
+    (2, 5): (19, 3055, 407, 426.1296193416957, 14352.319145372694, 0.15354505468326873),
+    (2, 20): (20, 3053, 408, 398.21253737117394, 14215.758895507006, 0.7297850938329575),
+}
+
+
+def _seeded_robot(algo, multi_step, seed=2016):
+    random.seed(seed)
+    robot = Robot(algo=algo, multi_step=multi_step)
+    robot.reset()
+    random.seed(seed)
+    return robot
+
+
+@pytest.mark.parametrize('algo, multi_step', sorted(BASELINE))
+def test_seeded_training_matches_the_baseline(algo, multi_step):
+    wins, explorations, size, value_sum, square_sum, next_random = BASELINE[algo, multi_step]
+    robot = _seeded_robot(algo, multi_step)
+    result = train(robot, 3000, log_last=0)
+    values = [value for key, value in robot.q.items()]
+    assert result.wins == wins
+    assert robot.explorations == explorations
+    assert len(robot.q) == size
+    assert math.fsum(values) == pytest.approx(value_sum, rel=1e-12)
+    assert math.fsum(value * value for value in values) == pytest.approx(square_sum, rel=1e-12)
+    # the same random numbers were drawn, in the same order
+    assert random.random() == next_random
+
+
+
+def test_sarsa_lambda_without_decay_is_sarsa():
+    sarsa = _seeded_robot(2, 1, seed=3)
+    train(sarsa, 2000, log_last=0)
+    sarsa_lambda = _seeded_robot(3, 1, seed=3)
+    sarsa_lambda.trace_decay = 0
+    train(sarsa_lambda, 2000, log_last=0)
+    assert np.array_equal(sarsa.q.values, sarsa_lambda.q.values)
+    assert np.array_equal(sarsa.q.visited, sarsa_lambda.q.visited)
+
+
+@pytest.mark.parametrize('algo', (3, 4))
+def test_only_traces_above_the_threshold_are_kept(algo):
+    robot = _seeded_robot(algo, 1)
+    robot.trace_decay = 0.01    # traces fall below the threshold after three steps
+    robot.epsilon = 0.1
+    robot.exploration_threshold = math.inf
+    train(robot, 2000, log_last=0)
+    # play episodes by hand to look at the traces between the steps, see runner.train
+    for _ in range(200):
+        action = robot.doAction()
+        t, T = 0, math.inf
+        while t < T:
+            new_state, reward, terminate, dealer_final = robot.environment.doStep(robot, action)
+            robot.update(new_state=new_state, action=action, reward=reward)
+            if terminate:
+                T = t + 1
+            else:
+                action = robot.doAction()
+            robot.updateQ(target_step=t, T=T, new_action=action)
+            traces = robot.traces.reshape(-1)
+            assert (traces[robot.touched] >= TRACE_THRESHOLD).all()
+            assert np.count_nonzero(traces) == len(set(robot.touched))
+            t += 1
+        robot.reset()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# copyright (C) Team Kingslayer, University of Zurich, 2017.
+"""
+@author: Te Tan, Yves Steiner, Victoria Barth, Lihua Cao
+"""
+
+import os
+import subprocess
+import sys
+import pytest
+import checkpoint
+import runner
+
+# modules of the optional features, a plain training run loads none of them
+OPTIONAL = ('linear', 'replay', 'dyna', 'checkpoint', 'instrumentation', 'metrics', 'stopping', 'actorlearner',
+            'population', 'matplotlib')
+
+
+def _loaded_optional_modules(code):
+    """runs code after importing runner in a fresh interpreter, returns the optional modules it loaded"""
+    code = "import sys, runner; %s; print('loaded: ' + ' '.join(sorted(set(sys.modules) & set(%r))))" % (code, OPTIONAL)
+    output = subprocess.check_output([sys.executable, '-c', code], cwd=os.path.dirname(os.path.abspath(runner.__file__)))
+    return output.decode().splitlines()[-1].split()[1:]
+
+
+def test_plain_import_loads_no_optional_feature():
+    assert _loaded_optional_modules('pass') == []
+
+
+def test_training_only_loads_no_optional_feature():
+    assert _loaded_optional_modules("runner.main(['--trials', '20', '--train-only'])") == []
+
+
+def test_resume_keeps_the_robot_and_applies_the_learning_rate(tmp_path, capsys):
+    name = str(tmp_path / 'robot')
+    runner.main(['--trials', '20', '--train-only', '--algo', '1', '--save', name])
+    assert 'python plotter.py %s.npz' % name in capsys.readouterr().out
+    # the resumed robot's Q values are memory-mapped from the file it is saved to again
+    runner.main(['--trials', '20', '--train-only', '--resume', name, '--alpha', '0.1', '--save', name])
+    robot = checkpoint.load_checkpoint(name)
+    assert (robot.algo, robot.alpha) == (1, 0.1)
+
+
+@pytest.mark.parametrize('saved, resumed', [(['--algo', '1'], ['--algo', '2']),
+                                            (['--multi-step', '5'], ['--multi-step', '3'])])
+def test_resume_rejects_another_algorithm(tmp_path, saved, resumed, capsys):
+    name = str(tmp_path / 'robot')
+    runner.main(['--trials', '20', '--train-only', '--save', name] + saved)
+    with pytest.raises(SystemExit) as exit:
+        runner.main(['--trials', '20', '--train-only', '--resume', name] + resumed)
+    assert exit.value.code == 2
+    assert 'conflicts' in capsys.readouterr().err
+
+
+@pytest.mark.parametrize('argv', [
+    ['--algo', '1', '--replay', 'uniform', '--save', 'robot.npz'],
+    ['--algo', '1', '--replay', 'uniform', '--resume', 'robot.npz'],
+    ['--algo', '2', '--replay', 'uniform'],
+    ['--algo', '1', '--dyna', '--save', 'robot.npz'],
+    ['--algo', '1', '--dyna', 'learned', '--resume', 'robot.npz'],
+    ['--algo', '1', '--dyna', '--replay', 'uniform'],
+])
+def test_rejects_options_checkpoints_cannot_store(argv, capsys):
+    with pytest.raises(SystemExit) as exit:
+        runner.main(argv)
+    assert exit.value.code == 2
+    assert 'error' in capsys.readouterr().err
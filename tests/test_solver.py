@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# copyright (C) Team Kingslayer, University of Zurich, 2017.
+"""
+@author: Te Tan, Yves Steiner, Victoria Barth, Lihua Cao
+"""
+
+import numpy as np
+import pytest
+import solver
+from environment import Environment
+from qtable import QTable
+from robot import Robot
+
+
+def test_solution_is_a_fixed_point():
+    solution = solver.solve(gamma=0.9)
+    assert solver.distance_to_optimal(solution.q, solution) == {'mse': 0.0, 'policy_agreement': 1.0}
+    assert solver.solve(gamma=0.9).iterations == solution.iterations
+
+
+def test_solution_satisfies_the_bellman_equations():
+    solution = solver.solve()
+    stick = Environment.stickRewardTable(10)
+    for dealer in range(10):
+        for total in range(1, 22):
+            hit = 0
+            for value, p in Environment.cardDistribution():
+                new_total = total + value
+                if new_total < 1:
+                    hit += p * -10
+                elif new_total > 21:
+                    hit += p * -1
+                else:
+                    hit += p * solution.v[dealer, new_total - 1]
+            assert solution.q[dealer, total - 1, 0] == pytest.approx(hit, abs=1e-6)
+            assert solution.q[dealer, total - 1, 1] == pytest.approx(stick[dealer, total - 1])
+
+
+def test_robots_are_graded_against_their_own_rewards():
+    robot = Robot()
+    robot.dealer_bust_reward = 1
+    solution = solver.solve_for_robot(robot)
+    assert np.array_equal(solution.q, solver.solve(dealer_bust_reward=1).q)
+
+    q = QTable(solution.q.copy(), np.ones(solution.q.shape, dtype=bool))
+    q.values[0, 0] = solution.q[0, 0, ::-1]     # the wrong action in one state
+    distance = solver.distance_to_optimal(q, solution)
+    assert distance['policy_agreement'] == pytest.approx(209 / 210)
+    assert distance == solver.distance_to_optimal(dict(q.items()), solution)
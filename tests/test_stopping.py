@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# copyright (C) Team Kingslayer, University of Zurich, 2017.
+"""
+@author: Te Tan, Yves Steiner, Victoria Barth, Lihua Cao
+"""
+
+import random
+import pytest
+from qtable import QTable
+from robot import Robot
+from runner import train
+from stopping import EpsilonSchedule, StoppingController
+
+
+class TableHolder(object):
+    """stands in for a robot, the controller only looks at its Q table"""
+
+    def __init__(self):
+        self.q = QTable()
+
+
+def test_schedules_reach_the_end_value():
+    linear = EpsilonSchedule(1.0, 0.1, 100)
+    assert [linear.value(episode) for episode in (0, 50, 100, 1000)] == pytest.approx([1.0, 0.55, 0.1, 0.1])
+    exponential = EpsilonSchedule(1.0, 0.01, 100, 'exponential')
+    assert [exponential.value(episode) for episode in (0, 50, 100)] == pytest.approx([1.0, 0.1, 0.01])
+    with pytest.raises(ValueError):
+        EpsilonSchedule(0.0, 0.1, 100, 'exponential')
+
+
+def test_epsilon_schedule_gives_the_decrement_back():
+    random.seed(2016)
+    robot = Robot(2, 5)
+    schedule = EpsilonSchedule(1.0, 0.1, 100)
+    train(robot, 150, log_last=0, epsilon_schedule=schedule)
+    assert robot.epsilon == pytest.approx(0.1)
+    assert robot.epsilon_decrement == 0.01
+
+
+def test_stops_after_patience_calm_windows():
+    holder = TableHolder()
+    controller = StoppingController(window=10, max_delta=0.5, mean_delta=0.5, patience=3)
+    controller.begin(holder, 1000)
+    stopped = []
+    for episode in range(100):
+        if episode == 15:
+            # a change within the tolerances does not count
+            holder.q.values[0, 0, 0] = 0.4
+        if episode == 25:
+            holder.q.values[0, 0, 0] = 1.0
+        if controller.endEpisode(holder):
+            stopped.append(controller.episodes)
+            break
+    # windows 10 and 20 are calm, 30 is not, 40, 50 and 60 are
+    assert stopped == [60]
+    assert [max_delta for episodes, max_delta, mean_delta, changes in controller.history] == \
+        pytest.approx([0, 0.4, 0.6, 0, 0, 0])
+    report = controller.report()
+    assert report['stopped'] and report['episodes_saved'] == 940
+
+
+def test_training_ends_once_the_q_values_converged():
+    random.seed(2016)
+    stopping = StoppingController(window=100, max_delta=100, mean_delta=100, max_policy_changes=1000, patience=2,
+                                  min_episodes=500)
+    result = train(Robot(2, 5), 10000, log_last=0, stopping=stopping)
+    assert result.episodes == 500
+    assert stopping.report()['episodes_saved'] == 9500
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# copyright (C) Team Kingslayer, University of Zurich, 2017.
+"""
+@author: Te Tan, Yves Steiner, Victoria Barth, Lihua Cao
+"""
+
+import numpy as np
+import pytest
+import sweep
+
+
+def test_grid_expands_to_every_combination():
+    configs = sweep.expand_grid([{'algo': [2], 'multi_step': [1, 5], 'alpha': [0.1, 0.5]}, {'algo': [1]}])
+    assert len(configs) == 5
+    assert configs[0] == {'algo': 2, 'alpha': 0.1, 'multi_step': 1}
+    assert configs[-1] == {'algo': 1}
+
+
+@pytest.mark.parametrize('config', ({'algo': 1, 'multi_step': 3}, {'algo': 2, 'learning_rate': 0.1},
+                                    {'algo': 3, 'linear': True}))
+def test_invalid_configs_are_rejected(config):
+    with pytest.raises(ValueError):
+        sweep.make_robot(config)
+
+
+def test_configs_set_the_robot_parameters():
+    robot = sweep.make_robot({'algo': 2, 'multi_step': 5, 'gamma': 0.5, 'dealer_bust_reward': 1})
+    assert (robot.algo, robot.multi_step, robot.gamma, robot.dealer_bust_reward) == (2, 5, 0.5, 1)
+    assert robot.previous_states.gamma == 0.5
+
+
+def test_runs_only_depend_on_their_seed():
+    config = {'algo': 2, 'multi_step': 5}
+    first, second = sweep.run_config(config, 3, 300), sweep.run_config(config, 3, 300)
+    other = sweep.run_config(config, 4, 300)
+    assert np.array_equal(first['q'], second['q'])
+    assert np.array_equal(first['rewards'], second['rewards'])
+    assert not np.array_equal(first['q'], other['q'])
+
+
+def test_sweep_gathers_every_run(tmp_path):
+    configs = [{'algo': 1}, {'algo': 2, 'multi_step': 5, 'trials': 200}]
+    output = str(tmp_path / 'sweep.npz')
+    results = sweep.sweep(configs, [3, 4], trials=100, processes=1, output=output)
+    loaded = sweep.load_sweep(output)
+    assert loaded['configs'] == [configs[0], configs[0], configs[1], configs[1]]
+    assert list(loaded['seeds']) == [3, 4, 3, 4]
+    assert loaded['q'].shape == (4, 10, 21, 2)
+    # runs with fewer trials are padded
+    assert loaded['rewards'].shape == (4, 200)
+    assert np.isnan(loaded['rewards'][:2, 100:]).all() and not np.isnan(loaded['rewards'][2:]).any()
+    # a run of the pool is the run of its config and seed
+    run = sweep.run_config(configs[1], 4, 100)
+    assert np.array_equal(results['q'][3], run['q'])
+    assert np.array_equal(loaded['winning_rate'], results['winning_rate'])
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# copyright (C) Team Kingslayer, University of Zurich, 2017.
+"""
+@author: Te Tan, Yves Steiner, Victoria Barth, Lihua Cao
+"""
+
+import random
+import pytest
+from trajectory import Trajectory
+
+
+@pytest.mark.parametrize('gamma', (1, 0.9, 0))
+def test_running_return_is_the_discounted_sum_of_the_stored_rewards(gamma):
+    rng = random.Random(5)
+    trajectory = Trajectory(4, gamma)
+    stored = []
+    for step in range(200):
+        if stored and rng.random() < 0.3:
+            assert trajectory.popleft()[2] == stored.pop(0)
+        else:
+            reward = rng.randint(-10, 10)
+            trajectory.append(step, None, reward)
+            stored = (stored + [reward])[-4:]
+        assert len(trajectory) == len(stored)
+        assert [trajectory[i][2] for i in range(len(trajectory))] == stored
+        assert trajectory.discounted_return == pytest.approx(sum(gamma ** k * r for k, r in enumerate(stored)))
+
+
+def test_full_buffer_drops_the_oldest_transition():
+    trajectory = Trajectory(2)
+    for step in range(3):
+        trajectory.append(step, None, step)
+    assert (trajectory[0][0], trajectory[-1][0]) == (1, 2)
+    assert trajectory.pop()[0] == 2 and trajectory.discounted_return == 1
+    trajectory.clear()
+    assert len(trajectory) == 0 and trajectory.discounted_return == 0
+    with pytest.raises(IndexError):
+        trajectory[0]
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# copyright (C) Team Kingslayer, University of Zurich, 2017.
+"""
+@author: Te Tan, Yves Steiner, Victoria Barth, Lihua Cao
+"""
+
+
+class Trajectory(object):
+    """
+    Fixed-size ring buffer of the last (state, action, reward) transitions of the robot.
+    It keeps the discounted sum of the stored rewards up to date, seen from the oldest
+    transition, so the n-step TD return is available in O(1).
+    """
+
+    def __init__(self, capacity, gamma=1):
+        """
+        :param capacity: number of transitions kept, older ones are dropped
+        :param gamma: discount factor of the discounted return
+        """
+        self.capacity = capacity
+        self.gamma = gamma
+        self.states = [None] * capacity
+        self.actions = [None] * capacity
+        self.rewards = [0] * capacity
+        self.start = 0  # position of the oldest transition
+        self.size = 0   # number of stored transitions
+        self.discounted_return = 0  # sum of gamma ** k * reward of the k-th oldest transition
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, i):
+        """
+        :param i: 0 is the oldest stored transition, -1 the newest
+        :return: (State, ACTION, reward)
+        """
+        if i < 0:
+            i += self.size
+        if not 0 <= i < self.size:
+            raise IndexError("trajectory index out of range")
+        pos = (self.start + i) % self.capacity
+        return self.states[pos], self.actions[pos], self.rewards[pos]
+
+    def append(self, state, action, reward):
+        """
+        stores a transition, drops the oldest one if the buffer is full
+        """
+        if self.size == self.capacity:
+            self.popleft()
+        pos = (self.start + self.size) % self.capacity
+        self.states[pos] = state
+        self.actions[pos] = action
+        self.rewards[pos] = reward
+        self.discounted_return += self.gamma ** self.size * reward
+        self.size += 1
+
+    def popleft(self):
+        """
+        removes the oldest transition, the discounted return then starts at the next one
+        :return: (State, ACTION, reward)
+        """
+        transition = self[0]
+        reward = transition[2]
+        self.start = (self.start + 1) % self.capacity
+        self.size -= 1
+        if self.size == 0:
+            self.discounted_return = 0
+        elif self.gamma == 1:
+            self.discounted_return -= reward
+        elif self.gamma == 0:
+            self.discounted_return = self.rewards[self.start]
+        else:
+            self.discounted_return = (self.discounted_return - reward) / self.gamma
+        return transition
+
+    def pop(self):
+        """
+        removes the newest transition
+        :return: (State, ACTION, reward)
+        """
+        transition = self[-1]
+        self.size -= 1
+        if self.size == 0:
+            self.discounted_return = 0
+        else:
+            self.discounted_return -= self.gamma ** self.size * transition[2]
+        return transition
+
+    def clear(self):
+        """removes all transitions without reallocating the buffer"""
+        self.start = 0
+        self.size = 0
+        self.discounted_return = 0